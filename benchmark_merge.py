@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+benchmark_merge.py - end-to-end throughput benchmark for merge_macros.py
+
+Generates a synthetic originals/ tree in the recorder schema (same fields and
+formatting as the shipped JSON files), runs merge_macros.py on it and writes a
+JSON report (wall time, events/s, peak RSS, output bytes) so runs can be
+compared across script versions.
+
+Example:
+    python3 benchmark_merge.py --folders 20 --files-per-folder 50 \\
+        --events-per-file 1000 --versions 6 --target-minutes 35 \\
+        --report bench/v3.33.0.json
+"""
+import argparse, json, random, sys, os, time, shutil, platform, subprocess, zipfile
+from pathlib import Path
+
+import merge_macros
+from merge_macros import (EventBuffer, write_events_json, MOUSE_MOVE, DRAG_START, DRAG_END,
+                          KEY_DOWN, KEY_UP, event_type_code)
+
+SCRIPT = Path(__file__).resolve().parent / "merge_macros.py"
+MOUSE_WHEEL = event_type_code("MouseWheel")
+
+
+def synthetic_recording(rng: random.Random, n_events: int, args) -> EventBuffer:
+    """
+    One synthetic recording: mouse moves with occasional clicks (DragStart/DragEnd
+    pairs, sometimes double clicks), key presses and wheel ticks. Gaps between
+    events are log-normal around --gap-median-ms, with rare long (5-60 s) gaps.
+    """
+    events = EventBuffer()
+    t = rng.randint(50, 500)
+    x, y = rng.randint(0, 1919), rng.randint(0, 1079)
+    while len(events) < n_events:
+        if rng.random() < args.long_gap_rate:
+            t += rng.randint(5000, 60000)
+        else:
+            t += max(1, int(rng.lognormvariate(0, 1.0) * args.gap_median_ms))
+
+        roll = rng.random()
+        if roll < args.click_density:
+            clicks = 2 if rng.random() < 0.1 else 1  # Some double clicks
+            for _ in range(clicks):
+                events.append(DRAG_START, t, x, y)
+                t += rng.randint(40, 120)
+                events.append(DRAG_END, t, x, y)
+                t += rng.randint(80, 200)
+        elif roll < args.click_density + args.key_density:
+            keycode = rng.choice([32, 49, 50, 51, 65, 87])
+            events.append(KEY_DOWN, t, keycode=keycode)
+            t += rng.randint(50, 150)
+            events.append(KEY_UP, t, keycode=keycode)
+        elif roll < args.click_density + args.key_density + 0.001:
+            events.append(MOUSE_WHEEL, t, x, y, delta=rng.choice([-120, 120]))
+        else:
+            x = min(1919, max(0, x + rng.randint(-25, 25)))
+            y = min(1079, max(0, y + rng.randint(-25, 25)))
+            events.append(MOUSE_MOVE, t, x, y)
+    return events
+
+
+def generate_dataset(root: Path, args) -> dict:
+    """Write the synthetic tree under root (reused when the spec is unchanged)."""
+    spec = {key: getattr(args, key) for key in (
+        "folders", "files_per_folder", "events_per_file", "click_density", "key_density",
+        "gap_median_ms", "long_gap_rate", "inefficient_share", "chat_files", "seed")}
+    spec_path = root / "dataset.json"
+    if spec_path.exists():
+        try:
+            stored = json.loads(spec_path.read_text(encoding="utf-8"))
+            if stored.get("spec") == spec:
+                print(f"✓ Reusing synthetic dataset: {root}")
+                return stored["stats"]
+        except ValueError:
+            pass
+
+    if root.exists():
+        shutil.rmtree(root)
+    rng = random.Random(args.seed)
+    originals = root / "originals"
+    stats = {"folders": args.folders, "files": 0, "events": 0, "bytes": 0}
+    started = time.perf_counter()
+
+    for k in range(args.folders):
+        # Folder numbers start at 10 so no folder counts as optional
+        folder = originals / f"{10 + k}- Synthetic folder {k}"
+        folder.mkdir(parents=True)
+        for i in range(args.files_per_folder):
+            n_events = max(2, int(rng.gauss(args.events_per_file, args.events_per_file * 0.25)))
+            prefix = "¬¬" if rng.random() < args.inefficient_share else ""
+            path = folder / f"{prefix}synthetic {i}.json"
+            write_events_json(path, synthetic_recording(rng, n_events, args))
+            stats["files"] += 1
+            stats["events"] += n_events
+            stats["bytes"] += path.stat().st_size
+        print(f"  Generated {folder.name}: {args.files_per_folder} files")
+
+    chat_dir = root / "chat inserts"
+    chat_dir.mkdir()
+    for i in range(args.chat_files):
+        write_events_json(chat_dir / f"chat {i}.json", synthetic_recording(rng, 200, args))
+    write_events_json(root / "- logout.json", synthetic_recording(rng, 50, args))
+
+    print(f"✓ Generated {stats['files']} files / {stats['events']} events "
+          f"in {time.perf_counter() - started:.1f}s")
+    spec_path.write_text(json.dumps({"spec": spec, "stats": stats}, indent=2), encoding="utf-8")
+    return stats
+
+
+def is_merged_file(name: str) -> bool:
+    """Merged version file (copied logout/always/non-JSON files all start with '@')."""
+    name = name.rsplit("/", 1)[-1]
+    return name.endswith(".json") and not name.startswith("@")
+
+
+def count_output(output_dir: Path) -> tuple:
+    """(files, bytes, events in merged version files) of a run, reading --archive ZIPs too."""
+    output_bytes = output_files = output_events = 0
+    for path in output_dir.rglob("*"):
+        if not path.is_file():
+            continue
+        output_files += 1
+        output_bytes += path.stat().st_size
+        if is_merged_file(path.name):
+            output_events += path.read_bytes().count(b'"Type"')
+        elif path.suffix == ".zip":
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if is_merged_file(info.filename):
+                        output_events += archive.read(info).count(b'"Type"')
+    return output_files, output_bytes, output_events
+
+
+def run_merge(root: Path, output_dir: Path, run_index: int, args) -> dict:
+    """Run merge_macros.py once in a child process and measure it."""
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    cache_dir = root / ".merge_cache"
+    if args.cold_cache:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    if "--no-cache" in args.merge_args:
+        cache = "off"
+    else:
+        cache = "warm" if cache_dir.is_dir() else "cold"
+    # Same bundle id every run, so repeats generate the same output
+    cmd = [sys.executable, str(SCRIPT), ".", str(output_dir),
+           "--versions", str(args.versions),
+           "--target-minutes", str(args.target_minutes),
+           "--bundle-id", str(args.bundle_id)] + args.merge_args
+    log_path = output_dir.parent / f"merge_run_{run_index}.log"
+
+    started = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen(cmd, cwd=root, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - started
+    returncode = os.waitstatus_to_exitcode(status)
+
+    output_files, output_bytes, output_events = count_output(output_dir)
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    result = {
+        "returncode": returncode,
+        "cache": cache,
+        "wall_seconds": round(wall, 3),
+        "output_events": output_events,
+        "events_per_second": round(output_events / wall, 1) if wall > 0 else None,
+        "peak_rss_kb": peak_rss_kb,
+        "output_bytes": output_bytes,
+        "output_files": output_files,
+        "log": str(log_path),
+    }
+    print(f"  Run {run_index + 1} ({cache} cache): {wall:.2f}s, {result['events_per_second']} events/s, "
+          f"peak RSS {peak_rss_kb / 1024:.0f} MB, {output_bytes / 1e6:.1f} MB written"
+          + ("" if returncode == 0 else f"  ❌ exit code {returncode} (see {log_path})"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark merge_macros.py on a synthetic recording library")
+    parser.add_argument("--workdir", type=Path, default=Path("bench_data"), help="Where the synthetic tree and outputs go")
+    parser.add_argument("--report", type=Path, default=Path("bench_report.json"), help="JSON report path")
+    parser.add_argument("--folders", type=int, default=10)
+    parser.add_argument("--files-per-folder", type=int, default=20)
+    parser.add_argument("--events-per-file", type=int, default=700, help="Mean events per recording")
+    parser.add_argument("--click-density", type=float, default=0.017, help="Share of events starting a click")
+    parser.add_argument("--key-density", type=float, default=0.003, help="Share of events starting a key press")
+    parser.add_argument("--gap-median-ms", type=float, default=22, help="Median gap between events")
+    parser.add_argument("--long-gap-rate", type=float, default=0.002, help="Share of 5-60 s gaps (idle movement slots)")
+    parser.add_argument("--inefficient-share", type=float, default=0.1, help="Share of ¬¬ (inefficient) recordings")
+    parser.add_argument("--chat-files", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--versions", type=int, default=6)
+    parser.add_argument("--target-minutes", type=int, default=35)
+    parser.add_argument("--bundle-id", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1, help="Number of timed merge runs")
+    parser.add_argument("--cold-cache", action="store_true", help="Delete the library's .merge_cache before every run")
+    parser.add_argument("--keep-output", action="store_true", help="Keep the merged bundles of the last run")
+    parser.add_argument("merge_args", nargs=argparse.REMAINDER,
+                        help="Extra merge_macros.py arguments after '--' (e.g. -- --workers 4)")
+    args = parser.parse_args()
+    if args.merge_args[:1] == ["--"]:
+        args.merge_args = args.merge_args[1:]
+
+    total_events = args.folders * args.files_per_folder * args.events_per_file
+    print("="*70)
+    print(f"MERGE BENCHMARK (merge_macros {merge_macros.VERSION})")
+    print("="*70)
+    print(f"Dataset: {args.folders} folders x {args.files_per_folder} files x ~{args.events_per_file} events (~{total_events} events)")
+    print(f"Merge: --versions {args.versions} --target-minutes {args.target_minutes} {' '.join(args.merge_args)}")
+    print("="*70)
+
+    root = args.workdir.resolve() / "library"
+    dataset = generate_dataset(root, args)
+
+    output_dir = args.workdir.resolve() / "output"
+    runs = [run_merge(root, output_dir, i, args) for i in range(args.repeat)]
+    if not args.keep_output:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    report = {
+        "script_version": merge_macros.VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {"versions": args.versions, "target_minutes": args.target_minutes, "merge_args": args.merge_args},
+        "dataset": dataset,
+        "runs": runs,
+        "best_wall_seconds": min(run["wall_seconds"] for run in runs),
+        "best_wall_seconds_by_cache": {cache: min(run["wall_seconds"] for run in runs if run["cache"] == cache)
+                                       for cache in sorted({run["cache"] for run in runs})},
+    }
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+    args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n✅ Report written: {args.report}")
+
+    if any(run["returncode"] != 0 for run in runs):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-merge_macros.py - v3.32.2
+merge_macros.py - v3.33.0
 - OPTIMIZED: 4-phase cursor transitions (from string_macros - better click protection)
 - NEW: Combination history system (Feature 1)
 - NEW: Smart jitter with exclusion zones + rapid click protection (Feature 2)
@@ -8,13 +8,33 @@ merge_macros.py - v3.32.2
 - Alphabetical naming: Raw (A,B,C) -> Ineff (D,E,F) -> Normal (G,H,I...)
 - DROP ONLY insertion for Mining folders
 - Working whitelist + random file queue
+- Parsed-event cache (.merge_cache) + --workers N process pool (per-version seeds)
+- Columnar EventBuffer pipeline (dicts only built by the JSON writer)
+- SQLite folder catalog (re-scans changed folders only) + --catalog-info
+- --incremental: rerunning a bundle id hard-links its unchanged pools
+- --profile / --cprofile: per-stage timing reports next to the manifests
+- --archive: bundle written straight into merged_macros_<id>.zip
+- --plan / --from-plan: bundle layout as JSON (no events loaded), generated later
+- Background read-ahead of the next source files (--prefetch / --prefetch-mb)
+- Batched human paths (generate_human_paths, --path-engine numpy; NumPy is optional: pip install numpy)
+- Compressed columnar recording packs (pack_recordings.py → recordings.mpack, read via mmap)
 """
 
 import argparse, json, random, re, sys, os, math, shutil
+import hashlib, pickle, operator, sqlite3, time, tempfile, io, zipfile, threading
+import mmap, struct, zlib
+from itertools import accumulate, islice
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+np = None  # NumPy, imported on first use by numpy_available() (--path-engine numpy only)
+
 # Script version
-VERSION = "v3.32.3"
+VERSION = "v3.33.0"
 
 
 def load_folder_whitelist(whitelist_path: str = None, root_path: Path = None) -> dict:
@@ -143,9 +163,10 @@ def detect_optional_folders(folder_name: str, rng: random.Random) -> tuple:
 
 
 # Chat inserts are loaded from 'chat inserts' folder at runtime
-def load_json_events(path: Path):
+def parse_json_events(raw_text: str) -> list:
+    """Parse recording JSON text into the cleaned event list (events with a Time field)."""
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = json.loads(raw_text)
         events = []
         if isinstance(data, dict):
             found_list = None
@@ -165,991 +186,3788 @@ def load_json_events(path: Path):
     except Exception:
         return []
 
-def get_file_duration_ms(path: Path) -> int:
-    events = load_json_events(path)
-    if not events: return 0
-    try:
-        times = [int(e.get("Time", 0)) for e in events]
-        return max(times) - min(times)
-    except: return 0
 
-def format_ms_precise(ms: int) -> str:
-    ts = int(round(ms / 1000))
-    m, s = ts // 60, ts % 60
-    return f"{m}m {s}s" if m > 0 else f"{s}s"
+# Sentinel for null X/Y/Delta/KeyCode values in EventBuffer columns
+NULL_VALUE = -2 ** 31
 
-def clean_identity(name: str) -> str:
-    return re.sub(r'(\s*-\s*Copy(\s*\(\d+\))?)|(\s*\(\d+\))', '', name, flags=re.IGNORECASE).strip().lower()
+# Interned event type names (code 0 = null Type); unknown names are appended
+EVENT_TYPE_NAMES = [None, "MouseMove", "DragStart", "DragEnd", "KeyDown", "KeyUp",
+                    "MouseWheel", "Click", "LeftDown", "LeftUp", "RightDown", "RightUp"]
+_EVENT_TYPE_CODES = {name: code for code, name in enumerate(EVENT_TYPE_NAMES)}
 
+# Interned field orders, so output dicts keep the key order they were created with
+RECORDED_LAYOUT = ("Type", "Time", "X", "Y", "Delta", "KeyCode")  # recorder files
+MOVE_LAYOUT = ("Type", "Time", "X", "Y")                           # jitter + transitions
+IDLE_MOVE_LAYOUT = ("Time", "Type", "X", "Y")                      # idle movements
+EVENT_LAYOUTS = [RECORDED_LAYOUT, MOVE_LAYOUT, IDLE_MOVE_LAYOUT]
+_EVENT_LAYOUT_CODES = {fields: code for code, fields in enumerate(EVENT_LAYOUTS)}
+_EVENT_FIELDS = frozenset(RECORDED_LAYOUT)
 
-def find_drop_only_files(folder_path: Path, all_files: list) -> list:
+# New codes are only added under this lock (prefetch threads parse files too)
+_intern_lock = threading.Lock()
+
+
+def event_type_code(name) -> int:
+    """Interned code of an event Type name."""
+    code = _EVENT_TYPE_CODES.get(name)
+    if code is None:
+        with _intern_lock:
+            code = _EVENT_TYPE_CODES.get(name)
+            if code is None:
+                code = len(EVENT_TYPE_NAMES)
+                EVENT_TYPE_NAMES.append(name)
+                _EVENT_TYPE_CODES[name] = code
+    return code
+
+
+def event_layout_code(fields: tuple) -> int:
+    """Interned code of an event field order."""
+    code = _EVENT_LAYOUT_CODES.get(fields)
+    if code is None:
+        with _intern_lock:
+            code = _EVENT_LAYOUT_CODES.get(fields)
+            if code is None:
+                code = len(EVENT_LAYOUTS)
+                EVENT_LAYOUTS.append(fields)
+                _EVENT_LAYOUT_CODES[fields] = code
+    return code
+
+
+MOUSE_MOVE = event_type_code("MouseMove")
+DRAG_START = event_type_code("DragStart")
+DRAG_END = event_type_code("DragEnd")
+KEY_DOWN = event_type_code("KeyDown")
+KEY_UP = event_type_code("KeyUp")
+CLICK = event_type_code("Click")
+LEFT_DOWN = event_type_code("LeftDown")
+RIGHT_DOWN = event_type_code("RightDown")
+MOVE_LAYOUT_CODE = event_layout_code(MOVE_LAYOUT)
+IDLE_MOVE_LAYOUT_CODE = event_layout_code(IDLE_MOVE_LAYOUT)
+
+
+def _column_value(value):
+    """Column form of an X/Y/Delta/KeyCode value, or None if it can't be stored."""
+    if value is None:
+        return NULL_VALUE
+    if type(value) is int and NULL_VALUE < value < -NULL_VALUE:
+        return value
+    return None
+
+
+def _coerced_column_value(value):
+    """Best-effort column form of a non-schema value (e.g. float coordinates)."""
+    try:
+        coerced = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return NULL_VALUE
+    return coerced if NULL_VALUE < coerced < -NULL_VALUE else NULL_VALUE
+
+
+class EventBuffer:
     """
-    Find all DROP ONLY files in Mining folders and subfolders.
-    Checks if "mining" appears ANYWHERE in the folder path.
-    Returns list of file paths.
+    Columnar event storage used by the whole merge pipeline.
+    
+    Events live in parallel arrays (type code, time, x, y, delta, keycode and
+    layout code) instead of one dict per event, which keeps 35-minute merges
+    small and makes copies/time shifts cheap. Null values are NULL_VALUE.
+    Events that don't fit the recorder schema (extra keys, non-int values)
+    keep their original dict in `extras`; their time still lives in `times`.
+    The JSON writer formats straight from the columns; only extras go
+    through a dict again (event()).
     """
-    # Check if "mining" appears anywhere in the full path
-    full_path_str = str(folder_path).lower()
-    if "mining" not in full_path_str:
-        return []
+    __slots__ = ("types", "times", "xs", "ys", "deltas", "keycodes", "layouts", "extras")
     
-    drop_only_files = []
+    def __init__(self):
+        self.types = array("H")
+        self.times = array("q")
+        self.xs = array("i")
+        self.ys = array("i")
+        self.deltas = array("i")
+        self.keycodes = array("i")
+        self.layouts = array("H")
+        self.extras = {}  # index -> original dict of non-schema events
     
-    # Search through all files for DROP ONLY pattern
-    for file_path in all_files:
-        filename = file_path.name.lower()
-        # Match: "drop only", "drop only1", "drop only 1", "drop only - copy", etc.
-        if "drop only" in filename:
-            drop_only_files.append(file_path)
+    def __len__(self):
+        return len(self.times)
     
-    return drop_only_files
+    def _columns(self):
+        return (self.types, self.times, self.xs, self.ys, self.deltas, self.keycodes, self.layouts)
+    
+    @classmethod
+    def from_dicts(cls, events) -> "EventBuffer":
+        buf = cls()
+        for e in events:
+            try:
+                time_ms = int(e["Time"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            name = e.get("Type")
+            x = _column_value(e.get("X"))
+            y = _column_value(e.get("Y"))
+            delta = _column_value(e.get("Delta"))
+            keycode = _column_value(e.get("KeyCode"))
+            fields = tuple(e)
+            plain = (type(e["Time"]) is int and (name is None or type(name) is str)
+                     and None not in (x, y, delta, keycode) and _EVENT_FIELDS.issuperset(fields))
+            if not plain:
+                buf.extras[len(buf)] = dict(e)
+                x, y, delta, keycode = (_coerced_column_value(e.get(k)) for k in ("X", "Y", "Delta", "KeyCode"))
+                if name is not None and type(name) is not str:
+                    name = str(name)
+            buf.append(event_type_code(name), time_ms, x, y, delta, keycode,
+                       event_layout_code(fields) if plain else 0)
+        return buf
+    
+    def append(self, type_code, time_ms, x=NULL_VALUE, y=NULL_VALUE,
+               delta=NULL_VALUE, keycode=NULL_VALUE, layout=0):
+        self.types.append(type_code)
+        self.times.append(time_ms)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.deltas.append(delta)
+        self.keycodes.append(keycode)
+        self.layouts.append(layout)
+    
+    def append_move(self, time_ms, x, y, layout=MOVE_LAYOUT_CODE):
+        self.append(MOUSE_MOVE, time_ms, x, y, NULL_VALUE, NULL_VALUE, layout)
+    
+    def extend(self, other, time_offset=0, start=0, end=None):
+        """Append other[start:end], shifting its times by time_offset."""
+        if end is None:
+            end = len(other)
+        if start >= end:
+            return
+        base = len(self)
+        self.types.extend(other.types[start:end])
+        if time_offset:
+            self.times.extend([t + time_offset for t in other.times[start:end]])
+        else:
+            self.times.extend(other.times[start:end])
+        self.xs.extend(other.xs[start:end])
+        self.ys.extend(other.ys[start:end])
+        self.deltas.extend(other.deltas[start:end])
+        self.keycodes.extend(other.keycodes[start:end])
+        self.layouts.extend(other.layouts[start:end])
+        extras = other.extras
+        if extras:
+            # Only visit the spliced range (or the extras, when fewer), so
+            # repeated splices of one recording stay linear overall
+            if len(extras) > end - start:
+                for i in range(start, end):
+                    e = extras.get(i)
+                    if e is not None:
+                        self.extras[base + i - start] = e
+            else:
+                for i, e in extras.items():
+                    if start <= i < end:
+                        self.extras[base + i - start] = e
+    
+    def shift_times(self, start, delta, end=None):
+        """Add delta to the times of events[start:end] in one pass."""
+        times = self.times
+        if end is None:
+            end = len(times)
+        if delta and start < end:
+            times[start:end] = array("q", [t + delta for t in times[start:end]])
+    
+    def apply_pauses(self, pauses):
+        """
+        Apply sorted (index, duration) pauses, each delaying its event and
+        every later one. Uses running prefix sums, so the cost is one pass
+        over the events instead of one pass per pause.
+        """
+        offset = 0
+        for k, (index, duration) in enumerate(pauses):
+            offset += duration
+            end = pauses[k + 1][0] if k + 1 < len(pauses) else len(self.times)
+            self.shift_times(index, offset, end)
+    
+    def take(self, indices) -> "EventBuffer":
+        """New buffer with the events at the given indices, in that order."""
+        buf = EventBuffer()
+        for column, src in zip(buf._columns(), self._columns()):
+            column.extend([src[i] for i in indices])
+        if self.extras:
+            for new_i, i in enumerate(indices):
+                if i in self.extras:
+                    buf.extras[new_i] = self.extras[i]
+        return buf
+    
+    def copy(self) -> "EventBuffer":
+        buf = EventBuffer()
+        buf.extend(self)
+        return buf
+    
+    def nbytes(self) -> int:
+        """Size of the column data (extras not counted)."""
+        return sum(column.itemsize * len(column) for column in self._columns())
+    
+    def type_name(self, i):
+        return EVENT_TYPE_NAMES[self.types[i]]
+    
+    def event(self, i) -> dict:
+        """Dict form of event i, with the field order it was created with."""
+        extra = self.extras.get(i)
+        if extra is not None:
+            e = dict(extra)
+            e["Time"] = self.times[i]
+            return e
+        values = {
+            "Type": EVENT_TYPE_NAMES[self.types[i]],
+            "Time": self.times[i],
+            "X": self.xs[i],
+            "Y": self.ys[i],
+            "Delta": self.deltas[i],
+            "KeyCode": self.keycodes[i],
+        }
+        return {k: (None if values[k] == NULL_VALUE else values[k]) for k in EVENT_LAYOUTS[self.layouts[i]]}
+    
+    def to_state(self) -> dict:
+        """Plain-type snapshot (codes are interned per process, so ship the tables)."""
+        return {
+            "type_names": list(EVENT_TYPE_NAMES),
+            "layouts": list(EVENT_LAYOUTS),
+            "columns": [column.tobytes() for column in self._columns()],
+            "extras": self.extras,
+        }
+    
+    @classmethod
+    def from_state(cls, state: dict) -> "EventBuffer":
+        buf = cls()
+        for column, data in zip(buf._columns(), state["columns"]):
+            column.frombytes(data)
+        buf.extras = state["extras"]
+        type_names, layouts = state["type_names"], state["layouts"]
+        if type_names != EVENT_TYPE_NAMES[:len(type_names)]:
+            remap = [event_type_code(name) for name in type_names]
+            buf.types = array("H", [remap[c] for c in buf.types])
+        if layouts != EVENT_LAYOUTS[:len(layouts)]:
+            remap = [event_layout_code(tuple(fields)) for fields in layouts]
+            buf.layouts = array("H", [remap[c] for c in buf.layouts])
+        return buf
+    
+    def __getstate__(self):
+        return self.to_state()
+    
+    def __setstate__(self, state):
+        buf = EventBuffer.from_state(state)
+        for name in self.__slots__:
+            setattr(self, name, getattr(buf, name))
 
 
-def extract_folder_number(folder_name: str) -> int:
+class EventSpool:
     """
-    Extract number from folder name like '1-Mining' or '23-Fishing'.
-    Returns the number, or 0 if not found.
+    Append-only event stream of one merged version.
+    
+    Events are appended like EventBuffer.extend/append_move, but every full
+    chunk is spilled to a temporary file, so memory stays bounded by the chunk
+    size whatever --target-minutes is. The merge loop only needs the length,
+    the last time and the last cursor position, which are tracked on append.
+    Edits that look back (DROP ONLY insertion, massive pause) are recorded as
+    planned index/time offsets and applied while final_pieces() streams the
+    finished events to the writer.
     """
-    match = re.match(r'^(\d+)-', folder_name)
-    if match:
-        return int(match.group(1))
-    return 0
+    CHUNK_EVENTS = 1 << 16
+    
+    def __init__(self):
+        self.tail = EventBuffer()   # Events not spilled yet
+        self.chunk_starts = []      # First index of every spilled chunk
+        self.chunk_offsets = []     # File offset of every spilled chunk
+        self.spilled = 0
+        self.file = None
+        self.last_time = None
+        self.last_cursor = None
+        self.insert_plan = None     # (index, events, time_offset, delay)
+        self.shift_plan = None      # (final index, delay)
+        self._loaded = (None, None) # (chunk number, EventBuffer) of the last chunk read back
+    
+    def __len__(self):
+        return self.spilled + len(self.tail)
+    
+    def extend(self, other, time_offset=0):
+        start = len(self.tail)
+        self.tail.extend(other, time_offset)
+        tail = self.tail
+        if len(tail) > start:
+            self.last_time = tail.times[-1]
+            for j in range(len(tail) - 1, start - 1, -1):
+                if tail.xs[j] != NULL_VALUE and tail.ys[j] != NULL_VALUE:
+                    self.last_cursor = (tail.xs[j], tail.ys[j])
+                    break
+        self._spill()
+    
+    def append_move(self, time_ms, x, y, layout=MOVE_LAYOUT_CODE):
+        self.tail.append_move(time_ms, x, y, layout)
+        self.last_time = time_ms
+        self.last_cursor = (x, y)
+        self._spill()
+    
+    def _spill(self):
+        if len(self.tail) < self.CHUNK_EVENTS:
+            return
+        if self.file is None:
+            self.file = tempfile.TemporaryFile()
+        self.chunk_offsets.append(self.file.seek(0, os.SEEK_END))
+        self.chunk_starts.append(self.spilled)
+        pickle.dump(self.tail, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled += len(self.tail)
+        self.tail = EventBuffer()
+    
+    def _chunk(self, k) -> EventBuffer:
+        if k == len(self.chunk_starts):
+            return self.tail
+        if self._loaded[0] != k:
+            self.file.seek(self.chunk_offsets[k])
+            self._loaded = (k, pickle.load(self.file))
+        return self._loaded[1]
+    
+    def time_at(self, index) -> int:
+        """Time of appended event index (before planned edits)."""
+        k = bisect_right(self.chunk_starts, index) - 1 if index < self.spilled else len(self.chunk_starts)
+        start = self.chunk_starts[k] if k < len(self.chunk_starts) else self.spilled
+        return self._chunk(k).times[index - start]
+    
+    def plan_insert(self, index, events, time_offset, delay):
+        """Insert events (times + time_offset) before index; delay every later event."""
+        self.insert_plan = (index, events, time_offset, delay)
+    
+    def plan_shift(self, index, delay):
+        """Delay the events from final position index on (after the insertion)."""
+        self.shift_plan = (index, delay)
+    
+    def final_len(self) -> int:
+        return len(self) + (len(self.insert_plan[1]) if self.insert_plan else 0)
+    
+    def final_time_at(self, index) -> int:
+        """Time of the event at final position index, with the planned edits applied."""
+        if self.insert_plan:
+            at, events, time_offset, delay = self.insert_plan
+            if index < at:
+                time_ms = self.time_at(index)
+            elif index < at + len(events):
+                time_ms = events.times[index - at] + time_offset
+            else:
+                time_ms = self.time_at(index - len(events)) + delay
+        else:
+            time_ms = self.time_at(index)
+        if self.shift_plan and index >= self.shift_plan[0]:
+            time_ms += self.shift_plan[1]
+        return time_ms
+    
+    def _pieces(self, start, end, time_offset):
+        """Copies of appended events [start:end] with shifted times, chunk by chunk."""
+        for k in range(len(self.chunk_starts) + 1):
+            chunk_start = self.chunk_starts[k] if k < len(self.chunk_starts) else self.spilled
+            chunk_end = self.chunk_starts[k + 1] if k + 1 < len(self.chunk_starts) else (
+                self.spilled if k < len(self.chunk_starts) else len(self))
+            lo, hi = max(start, chunk_start), min(end, chunk_end)
+            if lo < hi:
+                piece = EventBuffer()
+                piece.extend(self._chunk(k), time_offset, lo - chunk_start, hi - chunk_start)
+                yield piece
+    
+    def final_pieces(self):
+        """Stream the finished events as EventBuffer pieces (planned edits applied)."""
+        n = len(self)
+        if self.insert_plan:
+            at, events, time_offset, delay = self.insert_plan
+            inserted = EventBuffer()
+            inserted.extend(events, time_offset)
+            sources = [self._pieces(0, at, 0), [inserted], self._pieces(at, n, delay)]
+        else:
+            sources = [self._pieces(0, n, 0)]
+        
+        position = 0
+        for source in sources:
+            for piece in source:
+                if self.shift_plan:
+                    split = self.shift_plan[0] - position
+                    if split < len(piece):
+                        piece.shift_times(max(0, split), self.shift_plan[1])
+                position += len(piece)
+                yield piece
+    
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
 
-def is_always_first_or_last_file(filename: str) -> bool:
+
+class BufferMemo:
     """
-    Check if a file should be treated as "always first" or "always last".
-    Checks if these phrases appear ANYWHERE in the filename (case-insensitive).
+    Thread-safe LRU of the recordings loaded this run (event cache and packs).
+    
+    Source files are reused across the versions of a pool, so their parsed
+    EventBuffers are kept, but only up to max_bytes of column data (the
+    --prefetch-mb budget); the least recently used ones are dropped first.
+    Stored buffers are never handed out, callers get copies.
     """
-    filename_lower = filename.lower()
-    patterns = ["always first", "always last", "alwaysfirst", "alwayslast"]
-    return any(pattern in filename_lower for pattern in patterns)
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.buffers = OrderedDict()  # key -> (EventBuffer, nbytes)
+        self.nbytes = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            found = self.buffers.get(key)
+            if found is None:
+                return None
+            self.buffers.move_to_end(key)
+            return found[0]
+    
+    def put(self, key, buf: EventBuffer):
+        size = buf.nbytes()
+        with self.lock:
+            old = self.buffers.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self.buffers[key] = (buf, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, dropped) = self.buffers.popitem(last=False)
+                self.nbytes -= dropped
+
+
+# Set by main() from --prefetch-mb
+_buffer_memo = BufferMemo(256 * 1024 * 1024)
+
+
+def configure_buffer_memo(max_bytes: int):
+    """Bound the memory kept by loaded recordings (see BufferMemo)."""
+    global _buffer_memo
+    _buffer_memo = BufferMemo(max(0, max_bytes))
+    return _buffer_memo
+
 
-def detect_rapid_click_sequences(events):
+class ParsedEventCache:
     """
-    Detect sequences of rapid clicks at similar coordinates.
-    
-    Detects:
-    - Double clicks (2 clicks within 500ms, ±5 pixels)
-    - Spam clicks (3+ clicks within 2 seconds, ±10 pixels)
+    Persistent on-disk cache of parsed recordings.
     
-    Returns list of protected ranges: [(start_idx, end_idx), ...]
-    These ranges should NOT have pauses/gaps inserted between them.
+    Stores the cleaned events of every JSON file under <cache_dir>/events/,
+    keyed by the file path: a small struct header, JSON metadata (file stat,
+    digest, code tables, extras) and the raw little-endian EventBuffer
+    columns. Nothing is unpickled, so a tampered cache directory can't run
+    code. An entry is reused when the file size and mtime match; otherwise
+    the file content hash is compared, so a fresh checkout (new mtimes, same
+    content) still hits the cache. Loaded buffers are also kept in the
+    run's BufferMemo, and every load returns a fresh copy (callers mutate
+    events in place).
     """
-    if not events or len(events) < 2:
-        return []
+    FORMAT = 4
+    MAGIC = b"MEVTC\x00"
+    HEADER = struct.Struct("<6sHI")  # magic, format, metadata size
     
-    protected_ranges = []
+    def __init__(self, cache_dir: Path, root: Path):
+        self.cache_dir = cache_dir
+        self.entries_dir = cache_dir / "events"
+        self.root = root.resolve()
+        self.hits = 0
+        self.parsed = 0
     
-    i = 0
-    while i < len(events):
-        event = events[i]
-        
-        # Check Click and DragStart events (both are click actions)
-        event_type = event.get("Type")
-        if event_type not in ("Click", "DragStart"):
-            i += 1
-            continue
+    def _entry_path(self, path: Path) -> Path:
+        resolved = path.resolve()
+        try:
+            key = resolved.relative_to(self.root).as_posix()
+        except ValueError:
+            key = resolved.as_posix()
+        return self.entries_dir / (hashlib.sha1(key.encode("utf-8")).hexdigest() + ".bin")
+    
+    @staticmethod
+    def _encode_events(buf: EventBuffer) -> tuple:
+        """(metadata, column bytes) of an EventBuffer."""
+        meta = {
+            "events": len(buf),
+            "type_names": list(EVENT_TYPE_NAMES),
+            "layouts": [list(fields) for fields in EVENT_LAYOUTS],
+            "extras": {str(i): e for i, e in buf.extras.items()},
+        }
+        body = bytearray()
+        for column in buf._columns():
+            if sys.byteorder == "big":
+                column = array(column.typecode, column)
+                column.byteswap()
+            body += column.tobytes()
+        return meta, bytes(body)
+    
+    @staticmethod
+    def _decode_events(meta: dict, body: bytes) -> EventBuffer:
+        """Inverse of _encode_events(); raises ValueError on anything inconsistent."""
+        n, pos, columns = meta["events"], 0, []
+        for column in EventBuffer()._columns():
+            size = column.itemsize * n
+            column.frombytes(body[pos:pos + size])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns.append(column.tobytes())
+            pos += size
+        type_names, layouts = meta["type_names"], [tuple(fields) for fields in meta["layouts"]]
+        extras = {int(i): e for i, e in meta["extras"].items()}
+        buf = EventBuffer.from_state({"type_names": type_names, "layouts": layouts,
+                                      "columns": columns, "extras": extras})
+        if (pos != len(body) or any(not 0 <= i < n for i in extras)
+                or (n and (max(buf.types) >= len(EVENT_TYPE_NAMES) or max(buf.layouts) >= len(EVENT_LAYOUTS)))):
+            raise ValueError("inconsistent cache entry")
+        return buf
+    
+    def _read_entry(self, entry_path: Path):
+        """(metadata, column bytes) of a cache entry, or None if missing or unreadable."""
+        try:
+            with open(entry_path, "rb") as f:
+                data = f.read()
+            magic, fmt, meta_size = self.HEADER.unpack_from(data, 0)
+            if magic != self.MAGIC or fmt != self.FORMAT:
+                return None
+            start = self.HEADER.size
+            meta = json.loads(data[start:start + meta_size].decode("utf-8"))
+            if isinstance(meta, dict):
+                return meta, data[start + meta_size:]
+        except Exception:
+            pass
+        return None
+    
+    def _write_entry(self, entry_path: Path, meta: dict, body: bytes):
+        try:
+            self.entries_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+            with open(tmp_path, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.FORMAT, len(meta_bytes)))
+                f.write(meta_bytes)
+                f.write(body)
+            os.replace(tmp_path, entry_path)
+        except Exception:
+            pass  # Cache is best effort, never fail the merge over it
+    
+    def _load_events(self, path: Path) -> EventBuffer:
+        try:
+            st = path.stat()
+        except OSError:
+            return EventBuffer()
         
-        # Found a click, look for nearby clicks
-        click_sequence = [i]
-        first_time = event.get("Time", 0)
-        first_x = event.get("X")
-        first_y = event.get("Y")
+        entry_path = self._entry_path(path)
+        entry = self._read_entry(entry_path)
+        meta = entry[0] if entry else {}
+        if meta.get("size") == st.st_size and meta.get("mtime_ns") == st.st_mtime_ns:
+            try:
+                buf = self._decode_events(*entry)
+                self.hits += 1
+                return buf
+            except Exception:
+                meta = {}
         
-        if first_x is None or first_y is None:
-            i += 1
-            continue
+        try:
+            raw_bytes = path.read_bytes()
+        except OSError:
+            return EventBuffer()
+        digest = hashlib.blake2b(raw_bytes, digest_size=16).hexdigest()
         
-        # Look ahead for more clicks
-        j = i + 1
-        while j < len(events):
-            next_event = events[j]
-            next_time = next_event.get("Time", 0)
-            
-            # Stop looking if too far in time (2 seconds max)
-            if next_time - first_time > 2000:
-                break
-            
-            # Check if it's a click or drag
-            next_type = next_event.get("Type")
-            if next_type in ("Click", "DragStart"):
-                next_x = next_event.get("X")
-                next_y = next_event.get("Y")
-                
-                if next_x is not None and next_y is not None:
-                    # Calculate distance from first click
-                    dist = ((next_x - first_x) ** 2 + (next_y - first_y) ** 2) ** 0.5
-                    
-                    # If within 10 pixels, part of sequence
-                    if dist <= 10:
-                        click_sequence.append(j)
-            
-            j += 1
+        buf = None
+        if meta.get("digest") == digest:
+            # Same content, new mtime (e.g. fresh checkout): refresh stat only
+            try:
+                buf = self._decode_events(*entry)
+                self.hits += 1
+            except Exception:
+                buf = None
+        if buf is None:
+            self.parsed += 1
+            try:
+                events = parse_json_events(raw_bytes.decode("utf-8"))
+            except UnicodeDecodeError:
+                events = []
+            buf = EventBuffer.from_dicts(events)
         
-        # If found 2+ clicks, protect the sequence
-        if len(click_sequence) >= 2:
-            start_idx = click_sequence[0]
-            end_idx = click_sequence[-1]
-            protected_ranges.append((start_idx, end_idx))
-            i = end_idx + 1
-        else:
-            i += 1
+        meta, body = self._encode_events(buf)
+        meta.update({"size": st.st_size, "mtime_ns": st.st_mtime_ns, "digest": digest})
+        self._write_entry(entry_path, meta, body)
+        return buf
     
-    return protected_ranges
+    def load(self, path: Path) -> EventBuffer:
+        key = ("cache", path)
+        buf = _buffer_memo.get(key)
+        if buf is None:
+            buf = self._load_events(path)
+            _buffer_memo.put(key, buf)
+        return buf.copy()
 
 
-def is_in_protected_range(index, protected_ranges):
-    """Check if an index is within any protected range."""
-    for start, end in protected_ranges:
-        if start <= index <= end:
-            return True
-    return False
+# Set by main() unless --no-cache is given
+_event_cache = None
+
+
+def configure_event_cache(cache_dir, root):
+    """Enable (or disable with cache_dir=None) the persistent parsed-event cache."""
+    global _event_cache
+    _event_cache = ParsedEventCache(Path(cache_dir), Path(root)) if cache_dir else None
+    return _event_cache
+
 
+# Compressed columnar archive of one folder's recordings (written by pack_recordings.py)
+PACK_NAME = "recordings.mpack"
+PACK_MAGIC = b"MPACK\x00"
+PACK_FORMAT = 1
+_PACK_HEADER = struct.Struct("<6sHQQ")  # magic, format, index offset, index size
+_PACK_NULL16 = -2 ** 15  # NULL_VALUE in int16 columns
 
-def is_in_drag_sequence(events, index):
+
+def _pack_column(values) -> tuple:
+    """(typecode, array) of an X/Y/Delta/KeyCode column: int16 when every value fits."""
+    if all(v == NULL_VALUE or _PACK_NULL16 < v < -_PACK_NULL16 for v in values):
+        return "h", array("h", [_PACK_NULL16 if v == NULL_VALUE else v for v in values])
+    return "i", array("i", values)
+
+
+def write_recording_pack(pack_path: Path, recordings) -> int:
     """
-    Check if the given index is inside a drag sequence (between DragStart and DragEnd).
-    Returns True if we're in the middle of a drag.
+    Write a recording pack from (name, EventBuffer, source) items, where
+    source holds source_size, source_mtime_ns, digest and duration_ms of the
+    JSON file, plus the newline that rebuilds it with events_json_text() (None
+    if it can't be rebuilt exactly). Each recording is one zlib block of little-endian columns:
+    type codes, time deltas, int16 X/Y/Delta/KeyCode (int32 if out of range)
+    and layout codes. A compressed JSON index at the end lists the blocks.
+    Returns the pack size in bytes.
     """
-    drag_started = False
-    for j in range(index, -1, -1):
-        event_type = events[j].get("Type", "")
-        if event_type == "DragEnd":
-            return False
-        elif event_type == "DragStart":
-            drag_started = True
-            break
-    
-    if not drag_started:
-        return False
-    
-    for j in range(index + 1, len(events)):
-        event_type = events[j].get("Type", "")
-        if event_type == "DragEnd":
-            return True
-        elif event_type == "DragStart":
-            return False
-    
-    return False
+    type_table, layout_table, files = {}, {}, []
+    tmp_path = pack_path.with_name(pack_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_PACK_HEADER.pack(PACK_MAGIC, PACK_FORMAT, 0, 0))
+        for name, buf, source in recordings:
+            times = buf.times
+            deltas = [0] + [b - a for a, b in zip(times, islice(times, 1, None))]
+            types = [type_table.setdefault(EVENT_TYPE_NAMES[c], len(type_table)) for c in buf.types]
+            layouts = [layout_table.setdefault(EVENT_LAYOUTS[c], len(layout_table)) for c in buf.layouts]
+            columns = [
+                ("B" if len(type_table) <= 256 else "H", types),
+                ("i" if all(-2 ** 31 <= d < 2 ** 31 for d in deltas) else "q", deltas),
+                *(_pack_column(column) for column in (buf.xs, buf.ys, buf.deltas, buf.keycodes)),
+                ("B" if len(layout_table) <= 256 else "H", layouts),
+            ]
+            block = bytearray()
+            for code, values in columns:
+                column = array(code, values)
+                if sys.byteorder == "big":
+                    column.byteswap()
+                block += column.tobytes()
+            data = zlib.compress(bytes(block), 9)
+            files.append({
+                "name": name,
+                "offset": f.tell(),
+                "size": len(data),
+                "events": len(buf),
+                "t0": times[0] if len(buf) else 0,
+                "columns": [code for code, _ in columns],
+                "extras": {str(i): e for i, e in buf.extras.items()},
+                **source,
+            })
+            f.write(data)
+        index = zlib.compress(json.dumps({
+            "type_names": list(type_table),
+            "layouts": [list(fields) for fields in layout_table],
+            "files": files,
+        }, ensure_ascii=False).encode("utf-8"), 9)
+        index_offset = f.tell()
+        f.write(index)
+        f.seek(0)
+        f.write(_PACK_HEADER.pack(PACK_MAGIC, PACK_FORMAT, index_offset, len(index)))
+    os.replace(tmp_path, pack_path)
+    return pack_path.stat().st_size
 
-def generate_human_path(start_x, start_y, end_x, end_y, duration_ms, rng):
+
+class RecordingPack:
     """
-    Generate a human-like path with variable speed, wobbles, and imperfections.
+    Reader of a folder's recording pack (write_recording_pack()).
     
-    Returns: List of (time_ms, x, y) tuples with realistic timing and positions.
+    The pack is memory-mapped once; a recording is decoded from its block
+    and kept in the run's BufferMemo, and load() returns copies (callers
+    mutate events in place).
     """
-    if duration_ms < 100:
-        return [(0, end_x, end_y)]
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            st = os.fstat(f.fileno())
+        self.memo_key = ("pack", str(path), st.st_size, st.st_mtime_ns)  # A rewritten pack never hits old buffers
+        magic, fmt, index_offset, index_size = _PACK_HEADER.unpack_from(self.mm, 0)
+        if magic != PACK_MAGIC or fmt != PACK_FORMAT:
+            raise ValueError("not a recording pack (or unsupported format)")
+        index = json.loads(zlib.decompress(self.mm[index_offset:index_offset + index_size]))
+        self.type_codes = [event_type_code(name) for name in index["type_names"]]
+        self.layout_codes = [event_layout_code(tuple(fields)) for fields in index["layouts"]]
+        self._entries = {entry["name"]: entry for entry in index["files"]}  # Folder order
     
-    path = []
+    def names(self) -> list:
+        return list(self._entries)
     
-    # Calculate distance
-    dx = end_x - start_x
-    dy = end_y - start_y
-    distance = math.sqrt(dx**2 + dy**2)
+    def entry(self, name: str):
+        """Index entry of a recording (source size/mtime/digest, duration, newline), or None."""
+        return self._entries.get(name)
     
-    if distance < 5:
-        return [(0, end_x, end_y)]
+    def _decode(self, entry) -> EventBuffer:
+        raw = zlib.decompress(self.mm[entry["offset"]:entry["offset"] + entry["size"]])
+        n, pos, columns = entry["events"], 0, []
+        for code in entry["columns"]:
+            column = array(code)
+            column.frombytes(raw[pos:pos + column.itemsize * n])
+            if sys.byteorder == "big":
+                column.byteswap()
+            pos += column.itemsize * n
+            columns.append(column)
+        types, deltas, xs, ys, event_deltas, keycodes, layouts = columns
+        
+        buf = EventBuffer()
+        buf.types = array("H", [self.type_codes[c] for c in types])
+        buf.times = array("q", accumulate(islice(deltas, 1, None), initial=entry["t0"])) if n else array("q")
+        buf.xs, buf.ys, buf.deltas, buf.keycodes = (
+            array("i", [NULL_VALUE if v == _PACK_NULL16 else v for v in column]) if column.typecode == "h"
+            else array("i", column)
+            for column in (xs, ys, event_deltas, keycodes))
+        buf.layouts = array("H", [self.layout_codes[c] for c in layouts])
+        buf.extras = {int(i): e for i, e in entry["extras"].items()}
+        return buf
     
-    # Determine speed profile (variable speeds make it human)
-    speed_profile = rng.choice(['fast_start', 'slow_start', 'medium', 'hesitant'])
+    def load(self, name: str) -> EventBuffer:
+        key = self.memo_key + (name,)
+        buf = _buffer_memo.get(key)
+        if buf is None:
+            buf = self._decode(self._entries[name])
+            _buffer_memo.put(key, buf)
+        return buf.copy()
     
-    # Number of steps based on distance and duration
-    num_steps = max(3, min(int(distance / 15), int(duration_ms / 50)))
+    def decode(self, name: str) -> EventBuffer:
+        """A recording decoded from the pack file itself, bypassing the BufferMemo."""
+        return self._decode(self._entries[name])
     
-    # Add control points for curve (not perfect bezier)
-    num_control = rng.randint(1, 3)
-    control_points = []
-    for _ in range(num_control):
-        # Offset perpendicular to main direction
-        offset = rng.uniform(-0.3, 0.3) * distance
-        t = rng.uniform(0.2, 0.8)
-        ctrl_x = start_x + dx * t + (-dy / (distance + 1)) * offset
-        ctrl_y = start_y + dy * t + (dx / (distance + 1)) * offset
-        control_points.append((ctrl_x, ctrl_y, t))
+    def verify(self, recordings: dict) -> list:
+        """Names of the {name: EventBuffer} recordings the pack lacks or decodes differently."""
+        bad = []
+        for name, events in recordings.items():
+            if name not in self._entries:
+                bad.append(name)
+                continue
+            buf = self.decode(name)
+            if buf._columns() != events._columns() or buf.extras != events.extras:
+                bad.append(name)
+        return bad
     
-    control_points.sort(key=lambda p: p[2])  # Sort by t position
+    def close(self):
+        self.mm.close()
     
-    current_time = 0
+    def json_bytes(self, name: str):
+        """The original JSON file of a recording, rebuilt byte for byte (None if the pack can't)."""
+        newline = self._entries[name]["newline"]
+        if not newline:
+            return None
+        return events_json_text(self.load(name)).replace("\n", newline).encode("utf-8")
+
+
+# folder -> RecordingPack (or None), opened once per run
+_pack_memo = {}
+
+
+def recording_pack(folder):
+    """The recording pack of a folder, or None if it has none."""
+    key = str(folder)
+    if key not in _pack_memo:
+        pack = None
+        pack_path = Path(folder) / PACK_NAME
+        if pack_path.is_file():
+            try:
+                pack = RecordingPack(pack_path)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️  Ignoring unreadable recording pack {pack_path}: {e}")
+        _pack_memo[key] = pack
+    return _pack_memo[key]
+
+
+def forget_recording_pack(folder):
+    """Close and drop the memoized pack of a folder (before it is replaced on disk)."""
+    pack = _pack_memo.pop(str(folder), None)
+    if pack:
+        pack.close()
+
+
+def packed_recording(path) -> tuple:
+    """
+    (pack, index entry) serving a recording, or (None, None). The pack is
+    used when the JSON file was removed or is exactly the one that was
+    packed (same size and mtime); an edited JSON file is read instead.
+    """
+    path = Path(path)
+    pack = recording_pack(path.parent)
+    entry = pack.entry(path.name) if pack else None
+    if entry is None:
+        return None, None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return pack, entry
+    if st.st_size == entry["source_size"] and st.st_mtime_ns == entry["source_mtime_ns"]:
+        return pack, entry
+    return None, None
+
+
+def packed_recording_names(folder, files) -> list:
+    """Recordings of a folder that only exist in its pack (JSON removed), in pack order."""
+    if PACK_NAME not in files:
+        return []
+    pack = recording_pack(folder)
+    if pack is None:
+        return []
+    present = set(files)
+    return [name for name in pack.names() if name not in present and "click_zones" not in name.lower()]
+
+
+def load_event_buffer(path: Path) -> EventBuffer:
+    """Load a recording as an EventBuffer (from its folder's pack, or through the event cache when enabled)."""
+    pack, entry = packed_recording(path)
+    if entry is not None:
+        return pack.load(entry["name"])
+    if _event_cache is not None:
+        return _event_cache.load(Path(path))
+    try:
+        return EventBuffer.from_dicts(parse_json_events(Path(path).read_text(encoding="utf-8")))
+    except Exception:
+        return EventBuffer()
+
+# Filtered chat insert / DROP ONLY recordings, loaded once per run
+_template_memo = {}
+
+
+def load_template(path: Path) -> tuple:
+    """
+    (events, start_time, end_time) of a chat insert or DROP ONLY file with
+    problematic keys filtered, parsed once per run. The events are shared by
+    every insertion: copy them out with a time offset, never mutate them.
+    """
+    template = _template_memo.get(path)
+    if template is None:
+        events = filter_problematic_keys(load_event_buffer(path))
+        if events:
+            template = (events, min(events.times), max(events.times))
+        else:
+            template = (events, 0, 0)
+        _template_memo[path] = template
+    return template
+
+
+def load_filtered_events(path: Path) -> EventBuffer:
+    """load_event_buffer() + filter_problematic_keys() of one source file."""
+    events = load_event_buffer(path)
+    return filter_problematic_keys(events) if events else events
+
+
+# Read-ahead threads, created on first use (per process)
+_prefetch_executor = None
+
+
+class EventPrefetcher:
+    """
+    Bounded read-ahead of the source files of one version.
     
-    for step in range(num_steps + 1):
-        # Non-linear time progression based on speed profile
-        t_raw = step / num_steps
-        
-        if speed_profile == 'fast_start':
-            # Fast at start, slow at end
-            t = 1 - (1 - t_raw) ** 2
-        elif speed_profile == 'slow_start':
-            # Slow at start, fast at end
-            t = t_raw ** 2
-        elif speed_profile == 'hesitant':
+    While file i is merged, files i+1.. are loaded and filtered on a thread
+    pool: at most depth files ahead, and only while their on-disk size stays
+    within byte_budget (the next file is always allowed). Each buffer is
+    handed out once by take() and forgotten by the prefetcher right away.
+    depth=0 loads every file inline.
+    """
+    def __init__(self, paths, depth: int, byte_budget: int):
+        self.paths = paths
+        self.depth = depth
+        self.byte_budget = byte_budget
+        self.pending = {}  # index -> (future, size)
+        self.pending_bytes = 0
+        self.next_index = 0
+    
+    def _fill(self):
+        global _prefetch_executor
+        while self.next_index < len(self.paths) and len(self.pending) < self.depth:
+            path = self.paths[self.next_index]
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                size = 0
+            if self.pending and self.pending_bytes + size > self.byte_budget:
+                break
+            if _prefetch_executor is None:
+                _prefetch_executor = ThreadPoolExecutor(max_workers=max(1, self.depth), thread_name_prefix="prefetch")
+            self.pending[self.next_index] = (_prefetch_executor.submit(load_filtered_events, path), size)
+            self.pending_bytes += size
+            self.next_index += 1
+    
+    def take(self, index: int) -> EventBuffer:
+        """Filtered events of paths[index] (indexes are taken in order)."""
+        self._fill()
+        found = self.pending.pop(index, None)
+        if found is None:
+            self.next_index = max(self.next_index, index + 1)
+            events = load_filtered_events(self.paths[index])
+        else:
+            future, size = found
+            self.pending_bytes -= size
+            events = future.result()
+        self._fill()
+        return events
+    
+    def close(self):
+        for future, _ in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.pending_bytes = 0
+
+# Integer Time value of a flat recorder event
+_TIME_VALUE_RE = re.compile(rb'"Time"\s*:\s*(-?\d+)\s*[,}]')
+
+
+def probe_file_duration_ms(path: Path):
+    """
+    Duration of a recording from a regex scan of its raw bytes (Time values only).
+    Returns None unless the file is a plain JSON list of flat events with
+    integer Times, so the caller can fall back to the full parser.
+    """
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    if not re.match(rb"\s*\[", raw) or not raw.rstrip().endswith(b"]"):
+        return None
+    times = [int(t) for t in _TIME_VALUE_RE.findall(raw)]
+    # Every object must be one event with one integer Time
+    if len(times) != raw.count(b"{"):
+        return None
+    if not times: return 0
+    return max(times) - min(times)
+
+
+def get_file_duration_ms(path: Path) -> int:
+    _, entry = packed_recording(path)
+    if entry is not None:
+        return entry["duration_ms"]
+    duration = probe_file_duration_ms(path)
+    if duration is not None:
+        return duration
+    events = load_event_buffer(path)
+    if not events: return 0
+    return max(events.times) - min(events.times)
+
+def scan_folder(folder: str):
+    """
+    (subdirs, files) of a directory like one os.walk step, or None if unreadable.
+    One scandir pass; entry types come from the directory listing itself.
+    """
+    subdirs, files = [], []
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry.name)
+                elif not entry.is_symlink():
+                    subdirs.append(entry.name)
+    except OSError:
+        return None
+    return subdirs, files
+
+
+class FolderCatalog:
+    """
+    Persistent SQLite catalog of the originals tree.
+    
+    Records the listing (subfolders + files, in scan order) of every directory
+    and the duration and content digest of every recording. A directory is
+    re-listed only when its mtime changed, so an unchanged tree is rediscovered
+    with stat calls alone. A duration is reused when the file size and mtime
+    match, or else when the size and digest do: a fresh checkout (new mtimes,
+    same content, e.g. CI restoring .merge_cache) costs one read per file but
+    no re-probing.
+    """
+    FORMAT = 2  # PRAGMA user_version; older catalogs are rebuilt
+    
+    def __init__(self, db_path: Path, root: Path):
+        self.db_path = db_path
+        self.root = root.resolve()
+        self.dirs_reused = 0
+        self.dirs_scanned = 0
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != self.FORMAT:
+            self.conn.executescript("DROP TABLE IF EXISTS dirs; DROP TABLE IF EXISTS files;")
+            self.conn.execute(f"PRAGMA user_version = {self.FORMAT}")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY, mtime_ns INTEGER, subdirs TEXT, files TEXT);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, folder TEXT, size INTEGER, mtime_ns INTEGER,
+                digest TEXT, duration_ms INTEGER);
+            CREATE INDEX IF NOT EXISTS files_folder ON files (folder);
+        """)
+    
+    def _key(self, path) -> str:
+        resolved = Path(path).resolve()
+        try:
+            return resolved.relative_to(self.root).as_posix()
+        except ValueError:
+            return resolved.as_posix()
+    
+    def listing(self, folder: str):
+        """(subdirs, files) of a directory like one os.walk step, or None if unreadable."""
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+        key = self._key(folder)
+        row = self.conn.execute("SELECT mtime_ns, subdirs, files FROM dirs WHERE path = ?", (key,)).fetchone()
+        if row and row[0] == mtime_ns:
+            self.dirs_reused += 1
+            return json.loads(row[1]), json.loads(row[2])
+        
+        found = scan_folder(folder)
+        if found is None:
+            return None
+        subdirs, files = found
+        self.dirs_scanned += 1
+        self.conn.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)",
+                          (key, mtime_ns, json.dumps(subdirs), json.dumps(files)))
+        # Forget durations of files that left this directory
+        self.conn.execute("DELETE FROM files WHERE folder = ? AND path NOT IN (SELECT value FROM json_each(?))",
+                          (key, json.dumps([self._key(os.path.join(folder, f)) for f in files])))
+        return subdirs, files
+    
+    def duration_ms(self, path: Path) -> int:
+        """get_file_duration_ms() of a recording, probed again only if the file changed."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return get_file_duration_ms(path)
+        key = self._key(path)
+        row = self.conn.execute("SELECT size, mtime_ns, digest, duration_ms FROM files WHERE path = ?",
+                                (key,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[3]
+        try:
+            digest = hashlib.blake2b(Path(path).read_bytes(), digest_size=16).hexdigest()
+        except OSError:
+            return get_file_duration_ms(path)
+        if row and row[0] == st.st_size and row[2] == digest:
+            duration = row[3]  # Same content, new mtime (e.g. fresh checkout)
+        else:
+            duration = get_file_duration_ms(path)
+        self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                          (key, self._key(os.path.dirname(path)), st.st_size, st.st_mtime_ns, digest, duration))
+        return duration
+    
+    def idle_subtrees(self, names: frozenset, excluded: frozenset) -> set:
+        """
+        Keys of directories whose whole subtree is unchanged since it was last
+        listed and holds no folder named in names: a whitelisted walk can skip
+        them, as nothing below can be selected. A new folder anywhere bumps its
+        parent's mtime, so one stat per recorded directory proves a subtree idle.
+        """
+        rows = {path: (mtime_ns, json.loads(subdirs))
+                for path, mtime_ns, subdirs in self.conn.execute("SELECT path, mtime_ns, subdirs FROM dirs")}
+        idle = set()
+        # Children before parents (the root key "." last)
+        for key in sorted(rows, key=lambda k: -1 if k == "." else k.count("/"), reverse=True):
+            if key.startswith("/") or key.rsplit("/", 1)[-1].lower() in names:
+                continue
+            mtime_ns, subdirs = rows[key]
+            try:
+                if os.stat(self.root / key).st_mtime_ns != mtime_ns:
+                    continue
+            except OSError:
+                continue
+            prefix = "" if key == "." else key + "/"
+            if all(prefix + name in idle for name in subdirs if name not in excluded):
+                idle.add(key)
+        return idle
+    
+    def close(self):
+        try:
+            self.conn.commit()
+        finally:
+            self.conn.close()
+
+
+class FolderScanner:
+    """
+    Pruned top-down walk of the originals tree for discover_pools().
+    
+    The whitelist is compiled once into name sets and a folder's selection is
+    carried down from its parent, so no per-folder path matching is needed.
+    Each directory is listed once (scandir, or the catalog when given) and
+    .git/.github/output subtrees are never entered. With a whitelist and a
+    catalog, unselected subtrees the catalog proves hold no whitelisted folder
+    are skipped without being listed.
+    """
+    EXCLUDED = frozenset({".git", ".github", "output"})
+    
+    def __init__(self, whitelist: dict = None, catalog: FolderCatalog = None):
+        self.catalog = catalog
+        if whitelist is None:
+            self.names = self.root_names = None
+        else:
+            # Any path part naming a specific or parent folder selects everything below it
+            self.root_names = frozenset(whitelist["folders"])
+            self.names = self.root_names | frozenset(whitelist["parent_folders"])
+        self._ahead = {}
+        self._idle = None
+    
+    def listing(self, folder: str):
+        """(subdirs, files) of folder, or None if unreadable."""
+        found = self._ahead.pop(folder, None)
+        if found is not None:
+            return found
+        return self.catalog.listing(folder) if self.catalog else scan_folder(folder)
+    
+    def peek(self, folder: str):
+        """listing() of a folder the walk has not reached yet, kept until it gets there."""
+        found = self._ahead.get(folder)
+        if found is None:
+            found = self.listing(folder)
+            if found is not None:
+                self._ahead[folder] = found
+        return found
+    
+    def walk(self, top):
+        """
+        Yield (folder, subdirs, files, selected) in os.walk(top) order, where
+        selected is should_process_folder() for that folder.
+        """
+        if self.EXCLUDED.intersection(Path(top).parts):
+            return
+        selected = self.names is None or Path(top).name.lower() in self.root_names
+        if self.names is not None and self.catalog:
+            self._idle = self.catalog.idle_subtrees(self.names, self.EXCLUDED)
+        yield from self._walk(str(top), selected, False)
+    
+    def _walk(self, folder: str, selected: bool, inherited: bool):
+        found = self.listing(folder)
+        if found is None:
+            return
+        subdirs, files = found
+        yield folder, subdirs, files, selected
+        for name in subdirs:
+            if name in self.EXCLUDED:
+                continue
+            child = inherited or self.names is None or name.lower() in self.names
+            path = os.path.join(folder, name)
+            if not child and self._idle and self.catalog._key(path) in self._idle:
+                continue  # Nothing below can be selected
+            yield from self._walk(path, child, child)
+
+
+# Fields left out of compact output when null (the player treats missing as null)
+COMPACT_OPTIONAL_FIELDS = ("X", "Y", "Delta", "KeyCode")
+
+
+def _json_scalar(value):
+    """JSON text of a flat event value, or None if it needs the full encoder."""
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if type(value) is int:
+        return int.__repr__(value)
+    if type(value) is str:
+        return json.encoder.encode_basestring_ascii(value)
+    return None
+
+
+def _event_json_chunk(e: dict, compact: bool) -> str:
+    """JSON text of one event dict as it appears inside the output array."""
+    encode_key = json.encoder.encode_basestring_ascii
+    parts = []
+    for k, v in e.items():
+        if compact and v is None and k in COMPACT_OPTIONAL_FIELDS:
+            continue
+        value_text = _json_scalar(v) if type(k) is str else None
+        if value_text is None:
+            parts = None
+            break
+        parts.append((encode_key(k), value_text))
+    
+    if parts is None:
+        # Non-trivial event (floats, nested values): use the stdlib encoder
+        if compact:
+            e = {k: v for k, v in e.items() if v is not None or k not in COMPACT_OPTIONAL_FIELDS}
+            return json.dumps(e, separators=(",", ":"))
+        return "  " + json.dumps(e, indent=2).replace("\n", "\n  ")
+    if compact:
+        return "{" + ",".join(f"{k}:{v}" for k, v in parts) + "}"
+    if parts:
+        return "  {\n" + ",\n".join(f"    {k}: {v}" for k, v in parts) + "\n  }"
+    return "  {}"
+
+
+def _event_buffer_json_chunks(buf: EventBuffer, compact: bool):
+    """JSON chunks straight from EventBuffer columns (no per-event dicts)."""
+    encode_key = json.encoder.encode_basestring_ascii
+    type_texts = ["null" if name is None else encode_key(name) for name in EVENT_TYPE_NAMES]
+    field_slots = {field: slot for slot, field in enumerate(RECORDED_LAYOUT)}
+    formats = {}  # layout code -> (% template, slot order) for indented output
+    slot_orders = {}
+    extras = buf.extras
+    
+    for i, (type_code, time_ms, x, y, delta, keycode, layout) in enumerate(zip(
+            buf.types, buf.times, buf.xs, buf.ys, buf.deltas, buf.keycodes, buf.layouts)):
+        if i in extras:
+            yield _event_json_chunk(buf.event(i), compact)
+            continue
+        order = slot_orders.get(layout)
+        if order is None:
+            fields = EVENT_LAYOUTS[layout]
+            order = slot_orders[layout] = tuple(field_slots[field] for field in fields)
+            lines = [f"    {encode_key(field)}: %s" for field in fields]
+            formats[layout] = ("  {\n" + ",\n".join(lines) + "\n  }") if lines else "  {}"
+        values = (type_texts[type_code], time_ms,
+                  "null" if x == NULL_VALUE else x,
+                  "null" if y == NULL_VALUE else y,
+                  "null" if delta == NULL_VALUE else delta,
+                  "null" if keycode == NULL_VALUE else keycode)
+        if compact:
+            yield "{" + ",".join(f'"{RECORDED_LAYOUT[slot]}":{values[slot]}' for slot in order
+                                 if slot < 2 or values[slot] != "null") + "}"
+        else:
+            yield formats[layout] % tuple(values[slot] for slot in order)
+
+
+def write_events_json(path: Path, events, compact: bool = False) -> int:
+    """
+    Stream events (an EventBuffer, a list of dicts, or an iterator of
+    EventBuffer pieces such as EventSpool.final_pieces()) to disk without
+    building the whole document in memory. Returns the number of events.
+    Paths inside an --archive bundle are written straight into the archive.
+    
+    Default output is byte-identical to json.dumps(events, indent=2).
+    compact=True writes one unindented event per line and drops null
+    X/Y/Delta/KeyCode fields.
+    """
+    if isinstance(events, EventBuffer):
+        chunks = _event_buffer_json_chunks(events, compact)
+    elif isinstance(events, (list, tuple)):
+        chunks = (_event_json_chunk(e, compact) for e in events)
+    else:
+        chunks = (chunk for piece in events for chunk in _event_buffer_json_chunks(piece, compact))
+    count = 0
+    if _bundle_archive is not None and _bundle_archive.owns(path):
+        f = _bundle_archive.open_text(path)
+    else:
+        f = open(path, "w", buffering=1 << 20)
+    with f:
+        for chunk in chunks:
+            f.write(("[\n" if not count else ",\n") + chunk)
+            count += 1
+        f.write("[]" if not count else "\n]")
+    return count
+
+
+def events_json_text(events: EventBuffer) -> str:
+    """write_events_json() output of an EventBuffer as a string."""
+    chunks = list(_event_buffer_json_chunks(events, False))
+    return "[\n" + ",\n".join(chunks) + "\n]" if chunks else "[]"
+
+
+class BundleArchive:
+    """
+    --archive output: bundle files go straight into a ZIP file instead of the
+    bundle folder. A path under root becomes the entry named relative to
+    root.parent (merged_bundle_N/...), the same layout as `zip -r` of the
+    folder. Small or already-compressed entries are stored, the rest deflated.
+    """
+    STORE_BELOW = 1024
+    STORED_SUFFIXES = {".zip", ".gz", ".7z", ".rar", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".mp3", ".mp4"}
+    
+    def __init__(self, zip_path: Path, root: Path):
+        self.zip_path = zip_path
+        self.root = root
+        self.zip = zipfile.ZipFile(zip_path, "w", allowZip64=True)
+    
+    def owns(self, path) -> bool:
+        try:
+            Path(path).relative_to(self.root)
+            return True
+        except ValueError:
+            return False
+    
+    def _info(self, path, size=None) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(Path(path).relative_to(self.root.parent).as_posix(), time.localtime()[:6])
+        info.external_attr = 0o644 << 16
+        stored = Path(path).suffix.lower() in self.STORED_SUFFIXES or (size is not None and size < self.STORE_BELOW)
+        info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+        return info
+    
+    def open_text(self, path):
+        """Writable text stream for a new entry (size unknown, so deflated)."""
+        return io.TextIOWrapper(self.zip.open(self._info(path), "w"), encoding="utf-8")
+    
+    def write_text(self, path, text: str):
+        self.write_bytes(path, text.encode("utf-8"))
+    
+    def write_bytes(self, path, data: bytes):
+        self.zip.writestr(self._info(path, len(data)), data)
+    
+    def copy(self, src, path):
+        """Add the file src as the entry for path (keeps its mtime, like copy2)."""
+        info = zipfile.ZipInfo.from_file(src, Path(path).relative_to(self.root.parent).as_posix())
+        info.compress_type = self._info(path, info.file_size).compress_type
+        with open(src, "rb") as f_in, self.zip.open(info, "w") as f_out:
+            shutil.copyfileobj(f_in, f_out, 1 << 20)
+    
+    def move_in(self, path):
+        """Add a file written under root by another process, then delete it."""
+        self.copy(path, path)
+        os.unlink(path)
+    
+    def close(self):
+        self.zip.close()
+        # Drop the (now empty) folders created for the bundle layout
+        for folder, _, _ in sorted(os.walk(self.root), key=lambda entry: -len(entry[0])):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                pass
+
+
+_bundle_archive = None
+
+
+def configure_bundle_archive(zip_path, root):
+    """Send bundle output to a ZIP (or back to the filesystem with zip_path=None)."""
+    global _bundle_archive
+    _bundle_archive = BundleArchive(Path(zip_path), Path(root)) if zip_path else None
+    return _bundle_archive
+
+
+def save_bundle_text(path: Path, text: str):
+    """Path.write_text() that honours --archive."""
+    if _bundle_archive is not None and _bundle_archive.owns(path):
+        _bundle_archive.write_text(path, text)
+    else:
+        Path(path).write_text(text)
+
+
+def copy_into_bundle(src: Path, dest: Path):
+    """shutil.copy2() that honours --archive (packed recordings are rebuilt as JSON)."""
+    if not os.path.exists(src):
+        pack, entry = packed_recording(src)
+        data = pack.json_bytes(entry["name"]) if entry else None
+        if data is not None:
+            if _bundle_archive is not None and _bundle_archive.owns(dest):
+                _bundle_archive.write_bytes(dest, data)
+            else:
+                Path(dest).write_bytes(data)
+            return
+    if _bundle_archive is not None and _bundle_archive.owns(dest):
+        _bundle_archive.copy(src, dest)
+    else:
+        shutil.copy2(src, dest)
+
+
+def version_counts(versions: int, is_ts: bool) -> tuple:
+    """
+    Number of (normal, inefficient, raw) versions generated for a folder.
+    Regular folder:  norm_v normal  +  norm_v//2 inef  +  3 raw
+    TS folder:        norm_v TS      +  0 inef          +  3 raw
+    """
+    norm_v = versions
+    inef_v = 0 if is_ts else (norm_v // 2)
+    raw_v = 3   # always 3 raw (^ tag) for every folder type
+    return norm_v, inef_v, raw_v
+
+def derive_seed(bundle_id: int, *parts) -> int:
+    """Stable 64-bit seed from the bundle id plus identifying parts (e.g. pool key)."""
+    material = "\x1f".join([str(bundle_id)] + [str(p) for p in parts])
+    return int.from_bytes(hashlib.sha256(material.encode("utf-8")).digest()[:8], "big")
+
+def format_ms_precise(ms: int) -> str:
+    ts = int(round(ms / 1000))
+    m, s = ts // 60, ts % 60
+    return f"{m}m {s}s" if m > 0 else f"{s}s"
+
+def clean_identity(name: str) -> str:
+    return re.sub(r'(\s*-\s*Copy(\s*\(\d+\))?)|(\s*\(\d+\))', '', name, flags=re.IGNORECASE).strip().lower()
+
+
+def find_drop_only_files(folder_path: Path, all_files: list) -> list:
+    """
+    Find all DROP ONLY files in Mining folders and subfolders.
+    Checks if "mining" appears ANYWHERE in the folder path.
+    Returns list of file paths.
+    """
+    # Check if "mining" appears anywhere in the full path
+    full_path_str = str(folder_path).lower()
+    if "mining" not in full_path_str:
+        return []
+    
+    drop_only_files = []
+    
+    # Search through all files for DROP ONLY pattern
+    for file_path in all_files:
+        filename = file_path.name.lower()
+        # Match: "drop only", "drop only1", "drop only 1", "drop only - copy", etc.
+        if "drop only" in filename:
+            drop_only_files.append(file_path)
+    
+    return drop_only_files
+
+
+def extract_folder_number(folder_name: str) -> int:
+    """
+    Extract number from folder name like '1-Mining' or '23-Fishing'.
+    Returns the number, or 0 if not found.
+    """
+    match = re.match(r'^(\d+)-', folder_name)
+    if match:
+        return int(match.group(1))
+    return 0
+
+def is_always_first_or_last_file(filename: str) -> bool:
+    """
+    Check if a file should be treated as "always first" or "always last".
+    Checks if these phrases appear ANYWHERE in the filename (case-insensitive).
+    """
+    filename_lower = filename.lower()
+    patterns = ["always first", "always last", "alwaysfirst", "alwayslast"]
+    return any(pattern in filename_lower for pattern in patterns)
+
+def build_click_index(events) -> tuple:
+    """
+    Click index of a file: (positions, monotonic).
+    positions are the indices of Click/DragStart events; monotonic tells
+    whether event times never decrease, in which case the 2 s look-ahead of
+    detect_rapid_click_sequences only has to visit clicks.
+    """
+    types, times = events.types, events.times
+    positions = [i for i, type_code in enumerate(types) if type_code == CLICK or type_code == DRAG_START]
+    monotonic = all(map(operator.le, times, islice(times, 1, None)))
+    return positions, monotonic
+
+
+def detect_rapid_click_sequences(events, click_index=None):
+    """
+    Detect sequences of rapid clicks at similar coordinates.
+    
+    Detects:
+    - Double clicks (2 clicks within 500ms, ±5 pixels)
+    - Spam clicks (3+ clicks within 2 seconds, ±10 pixels)
+    
+    Returns list of protected ranges: [(start_idx, end_idx), ...]
+    These ranges should NOT have pauses/gaps inserted between them.
+    """
+    if not events or len(events) < 2:
+        return []
+    
+    positions, monotonic = click_index if click_index is not None else build_click_index(events)
+    if not monotonic:
+        return _scan_rapid_click_sequences(events)
+    
+    times, xs, ys = events.times, events.xs, events.ys
+    protected_ranges = []
+    
+    c = 0
+    while c < len(positions):
+        i = positions[c]
+        first_time = times[i]
+        first_x = xs[i]
+        first_y = ys[i]
+        
+        if first_x == NULL_VALUE or first_y == NULL_VALUE:
+            c += 1
+            continue
+        
+        # Look ahead over later clicks within 2 seconds (times are sorted)
+        last_match = None
+        d = c + 1
+        while d < len(positions) and times[positions[d]] - first_time <= 2000:
+            j = positions[d]
+            next_x = xs[j]
+            next_y = ys[j]
+            if next_x != NULL_VALUE and next_y != NULL_VALUE:
+                # If within 10 pixels of the first click, part of sequence
+                dist = ((next_x - first_x) ** 2 + (next_y - first_y) ** 2) ** 0.5
+                if dist <= 10:
+                    last_match = d
+            d += 1
+        
+        # If found 2+ clicks, protect the sequence
+        if last_match is not None:
+            protected_ranges.append((i, positions[last_match]))
+            c = last_match + 1
+        else:
+            c += 1
+    
+    return protected_ranges
+
+
+# Rapid-click ranges of each source file (filtered events), shared by all versions
+_rapid_click_memo = {}
+
+
+def file_rapid_click_ranges(path, events):
+    """detect_rapid_click_sequences() of a source file, computed once per run."""
+    ranges = _rapid_click_memo.get(path)
+    if ranges is None:
+        ranges = _rapid_click_memo[path] = detect_rapid_click_sequences(events)
+    return list(ranges)
+
+
+def _scan_rapid_click_sequences(events):
+    """
+    Full-scan rapid click detection over every event, used when event
+    times are not sorted. Same result as detect_rapid_click_sequences.
+    """
+    if not events or len(events) < 2:
+        return []
+    
+    types, times, xs, ys = events.types, events.times, events.xs, events.ys
+    click_codes = (CLICK, DRAG_START)
+    n = len(events)
+    protected_ranges = []
+    
+    i = 0
+    while i < n:
+        # Check Click and DragStart events (both are click actions)
+        if types[i] not in click_codes:
+            i += 1
+            continue
+        
+        # Found a click, look for nearby clicks
+        click_sequence = [i]
+        first_time = times[i]
+        first_x = xs[i]
+        first_y = ys[i]
+        
+        if first_x == NULL_VALUE or first_y == NULL_VALUE:
+            i += 1
+            continue
+        
+        # Look ahead for more clicks
+        j = i + 1
+        while j < n:
+            # Stop looking if too far in time (2 seconds max)
+            if times[j] - first_time > 2000:
+                break
+            
+            # Check if it's a click or drag
+            if types[j] in click_codes:
+                next_x = xs[j]
+                next_y = ys[j]
+                
+                if next_x != NULL_VALUE and next_y != NULL_VALUE:
+                    # Calculate distance from first click
+                    dist = ((next_x - first_x) ** 2 + (next_y - first_y) ** 2) ** 0.5
+                    
+                    # If within 10 pixels, part of sequence
+                    if dist <= 10:
+                        click_sequence.append(j)
+            
+            j += 1
+        
+        # If found 2+ clicks, protect the sequence
+        if len(click_sequence) >= 2:
+            start_idx = click_sequence[0]
+            end_idx = click_sequence[-1]
+            protected_ranges.append((start_idx, end_idx))
+            i = end_idx + 1
+        else:
+            i += 1
+    
+    return protected_ranges
+
+
+class IntervalSet:
+    """
+    Sorted, non-overlapping closed intervals [start, end] built from any
+    (start, end) pairs. Membership is a binary search, so click-proximity
+    checks cost O(log zones) instead of a scan over every zone.
+    """
+    def __init__(self, intervals=()):
+        starts, ends = [], []
+        for start, end in sorted(intervals):
+            if start > end:
+                continue
+            if ends and start <= ends[-1]:
+                if end > ends[-1]:
+                    ends[-1] = end  # Overlaps the previous interval: merge
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts = starts
+        self.ends = ends
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+    
+    def __contains__(self, value):
+        i = bisect_right(self.starts, value) - 1
+        return i >= 0 and value <= self.ends[i]
+    
+    def uncovered(self, lo, hi) -> "UncoveredIndices":
+        """Integers in [lo, hi) outside every interval, as a lazy sequence."""
+        return UncoveredIndices(self, lo, hi)
+
+
+class UncoveredIndices(Sequence):
+    """
+    Read-only sequence of the integers in [lo, hi) not covered by an
+    IntervalSet, without materializing them. Stored as gap runs with prefix
+    counts, so len() is O(1) and indexing is a binary search. Works directly
+    with rng.sample() / rng.choice() for uniform draws.
+    """
+    def __init__(self, intervals: IntervalSet, lo, hi):
+        self.run_starts = []  # first index of each uncovered run
+        self.run_offsets = []  # number of uncovered indices before each run
+        total = 0
+        cursor = lo
+        for start, end in intervals:
+            start, end = max(start, lo), min(end, hi - 1)
+            if start > end:
+                continue
+            if start > cursor:
+                self.run_starts.append(cursor)
+                self.run_offsets.append(total)
+                total += start - cursor
+            cursor = max(cursor, end + 1)
+        if cursor < hi:
+            self.run_starts.append(cursor)
+            self.run_offsets.append(total)
+            total += hi - cursor
+        self.total = total
+    
+    def __len__(self):
+        return self.total
+    
+    def __getitem__(self, k):
+        if k < 0:
+            k += self.total
+        if not 0 <= k < self.total:
+            raise IndexError("uncovered index out of range")
+        run = bisect_right(self.run_offsets, k) - 1
+        return self.run_starts[run] + k - self.run_offsets[run]
+    
+    def __iter__(self):
+        ends = self.run_offsets[1:] + [self.total]
+        for start, offset, end in zip(self.run_starts, self.run_offsets, ends):
+            yield from range(start, start + end - offset)
+
+
+def click_exclusion_zones(events, protected_ranges, click_buffer=1000, sequence_buffer=1500) -> IntervalSet:
+    """
+    Time zones around clicks: click_buffer ms around every click-type event
+    plus sequence_buffer ms around each rapid-click range (see
+    detect_rapid_click_sequences).
+    """
+    zones = []
+    
+    # Buffer around ALL individual clicks
+    click_types = {CLICK, LEFT_DOWN, RIGHT_DOWN, DRAG_START}
+    for type_code, click_time in zip(events.types, events.times):
+        if type_code in click_types:
+            zones.append((click_time - click_buffer, click_time + click_buffer))
+    
+    # EXTENDED buffer before the first and after the last click of a sequence
+    for start_idx, end_idx in protected_ranges:
+        if start_idx < len(events) and end_idx < len(events):
+            zones.append((events.times[start_idx] - sequence_buffer, events.times[end_idx] + sequence_buffer))
+    
+    return IntervalSet(zones)
+
+
+def build_idle_context(events) -> tuple:
+    """
+    One-pass per-event context for insert_idle_mouse_movements.
+    
+    Returns (in_drag, last_cursor, next_cursor) arrays:
+    - in_drag[i]: 1 if i lies between a DragStart and its DragEnd
+    - last_cursor[i]: index of the last event <= i with X/Y, or -1
+    - next_cursor[i]: index of the first event > i with X/Y, or len(events)
+    """
+    n = len(events)
+    types, xs, ys = events.types, events.xs, events.ys
+    
+    # Backward pass: next drag marker after i and next cursor after i
+    next_marker = array("H", bytes(2 * n))
+    next_cursor = array("i", [n]) * n
+    marker, cursor = 0, n
+    for i in range(n - 1, -1, -1):
+        next_marker[i] = marker
+        next_cursor[i] = cursor
+        if types[i] == DRAG_START or types[i] == DRAG_END:
+            marker = types[i]
+        if xs[i] != NULL_VALUE and ys[i] != NULL_VALUE:
+            cursor = i
+    
+    # Forward pass: last drag marker at or before i and last cursor <= i
+    in_drag = array("b", bytes(n))
+    last_cursor = array("i", [-1]) * n
+    marker, cursor = 0, -1
+    for i in range(n):
+        if types[i] == DRAG_START or types[i] == DRAG_END:
+            marker = types[i]
+        if xs[i] != NULL_VALUE and ys[i] != NULL_VALUE:
+            cursor = i
+        last_cursor[i] = cursor
+        if marker == DRAG_START and next_marker[i] == DRAG_END:
+            in_drag[i] = 1
+    
+    return in_drag, last_cursor, next_cursor
+
+
+def generate_human_path(start_x, start_y, end_x, end_y, duration_ms, rng):
+    """
+    Generate a human-like path with variable speed, wobbles, and imperfections.
+    
+    Returns: List of (time_ms, x, y) tuples with realistic timing and positions.
+    """
+    if duration_ms < 100:
+        return [(0, end_x, end_y)]
+    
+    path = []
+    
+    # Calculate distance
+    dx = end_x - start_x
+    dy = end_y - start_y
+    distance = math.sqrt(dx**2 + dy**2)
+    
+    if distance < 5:
+        return [(0, end_x, end_y)]
+    
+    # Determine speed profile (variable speeds make it human)
+    speed_profile = rng.choice(['fast_start', 'slow_start', 'medium', 'hesitant'])
+    
+    # Number of steps based on distance and duration
+    num_steps = max(3, min(int(distance / 15), int(duration_ms / 50)))
+    
+    # Add control points for curve (not perfect bezier)
+    num_control = rng.randint(1, 3)
+    control_points = []
+    for _ in range(num_control):
+        # Offset perpendicular to main direction
+        offset = rng.uniform(-0.3, 0.3) * distance
+        t = rng.uniform(0.2, 0.8)
+        ctrl_x = start_x + dx * t + (-dy / (distance + 1)) * offset
+        ctrl_y = start_y + dy * t + (dx / (distance + 1)) * offset
+        control_points.append((ctrl_x, ctrl_y, t))
+    
+    control_points.sort(key=lambda p: p[2])  # Sort by t position
+    
+    current_time = 0
+    
+    for step in range(num_steps + 1):
+        # Non-linear time progression based on speed profile
+        t_raw = step / num_steps
+        
+        if speed_profile == 'fast_start':
+            # Fast at start, slow at end
+            t = 1 - (1 - t_raw) ** 2
+        elif speed_profile == 'slow_start':
+            # Slow at start, fast at end
+            t = t_raw ** 2
+        elif speed_profile == 'hesitant':
             # Slow-fast-slow with micro-pauses
             t = 0.5 * (1 - math.cos(t_raw * math.pi))
         else:  # medium
             # Slight ease in/out
             t = 0.5 * (1 - math.cos(t_raw * math.pi))
         
-        # Calculate position using control points (imperfect curve)
-        if not control_points:
-            # Simple interpolation with wobble
-            x = start_x + dx * t
-            y = start_y + dy * t
-        else:
-            # Multi-segment curve through control points
-            x, y = start_x, start_y
-            for i, (ctrl_x, ctrl_y, ctrl_t) in enumerate(control_points):
-                if t <= ctrl_t:
-                    segment_t = t / ctrl_t if ctrl_t > 0 else 0
-                    x = start_x + (ctrl_x - start_x) * segment_t
-                    y = start_y + (ctrl_y - start_y) * segment_t
-                    break
-                else:
-                    if i == len(control_points) - 1:
-                        # Last segment
-                        segment_t = (t - ctrl_t) / (1 - ctrl_t) if (1 - ctrl_t) > 0 else 0
-                        x = ctrl_x + (end_x - ctrl_x) * segment_t
-                        y = ctrl_y + (end_y - ctrl_y) * segment_t
-                    else:
-                        start_x, start_y = ctrl_x, ctrl_y
+        # Calculate position using control points (imperfect curve)
+        if not control_points:
+            # Simple interpolation with wobble
+            x = start_x + dx * t
+            y = start_y + dy * t
+        else:
+            # Multi-segment curve through control points
+            x, y = start_x, start_y
+            for i, (ctrl_x, ctrl_y, ctrl_t) in enumerate(control_points):
+                if t <= ctrl_t:
+                    segment_t = t / ctrl_t if ctrl_t > 0 else 0
+                    x = start_x + (ctrl_x - start_x) * segment_t
+                    y = start_y + (ctrl_y - start_y) * segment_t
+                    break
+                else:
+                    if i == len(control_points) - 1:
+                        # Last segment
+                        segment_t = (t - ctrl_t) / (1 - ctrl_t) if (1 - ctrl_t) > 0 else 0
+                        x = ctrl_x + (end_x - ctrl_x) * segment_t
+                        y = ctrl_y + (end_y - ctrl_y) * segment_t
+                    else:
+                        start_x, start_y = ctrl_x, ctrl_y
+        
+        # Add random wobble (humans don't move in perfect lines)
+        wobble_amount = rng.uniform(1, 5) if step > 0 and step < num_steps else 0
+        x += rng.uniform(-wobble_amount, wobble_amount)
+        y += rng.uniform(-wobble_amount, wobble_amount)
+        
+        # Add occasional micro-corrections (overshoot and correct)
+        if step > 0 and step < num_steps and rng.random() < 0.15:
+            overshoot = rng.uniform(5, 15)
+            direction = 1 if rng.random() < 0.5 else -1
+            x += direction * overshoot * (dx / (distance + 1))
+            y += direction * overshoot * (dy / (distance + 1))
+        
+        # Keep within bounds
+        x = max(100, min(1800, int(x)))
+        y = max(100, min(1000, int(y)))
+        
+        # Calculate time with variable speed
+        time_progress = t
+        
+        # Add micro-pauses (humans sometimes pause mid-movement)
+        if step > 0 and step < num_steps and rng.random() < 0.1:
+            pause = rng.randint(30, 100)
+            current_time += pause
+        
+        step_time = int(time_progress * duration_ms)
+        current_time = max(current_time, step_time)  # Ensure monotonic
+        
+        path.append((current_time, x, y))
+    
+    return path
+
+
+def human_path_end(start_x, start_y, end_x, end_y, duration_ms) -> tuple:
+    """Last point of a path from the numpy engine (the target, clamped like every point)."""
+    if duration_ms < 100 or math.sqrt((end_x - start_x)**2 + (end_y - start_y)**2) < 5:
+        return end_x, end_y
+    return max(100, min(1800, int(end_x))), max(100, min(1000, int(end_y)))
+
+
+def numpy_available() -> bool:
+    """Import NumPy (optional dependency) on first use; False if it is not installed."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+
+def generate_human_paths(requests, rng, engine: str = "compat") -> list:
+    """
+    Batch version of generate_human_path(): one path per (start_x, start_y,
+    end_x, end_y, duration_ms) request.
+    
+    engine="compat" calls generate_human_path() in order with rng, so paths
+    and the rng state afterwards match per-call generation exactly.
+    engine="numpy" computes every step of every path at once with NumPy,
+    from a generator seeded by one rng draw: same shapes and distributions,
+    a different random stream, and each path ends exactly on human_path_end().
+    Without NumPy installed the compat engine is used.
+    """
+    if engine != "numpy" or not requests or not numpy_available():
+        return [generate_human_path(*request, rng) for request in requests]
+    return _human_paths_numpy(requests, np.random.default_rng(rng.getrandbits(64)))
+
+
+def _human_paths_numpy(requests, gen) -> list:
+    """generate_human_paths() numpy engine; gen is a numpy.random.Generator."""
+    sx, sy, ex, ey, dur = np.array(requests, dtype=np.float64).reshape(-1, 5).T
+    n_paths = len(sx)
+    dx, dy = ex - sx, ey - sy
+    distance = np.sqrt(dx**2 + dy**2)
+    moving = (dur >= 100) & (distance >= 5)
+    perp = 1 / (distance + 1)
+    
+    # Per path: speed profile, step count and 1-3 control points sorted by t
+    profile = gen.integers(0, 4, n_paths)  # fast_start, slow_start, medium/hesitant (x2)
+    num_steps = np.maximum(3, np.minimum((distance / 15).astype(np.int64), (dur / 50).astype(np.int64)))
+    num_steps[~moving] = 0  # Single point at the target
+    num_control = gen.integers(1, 4, n_paths)
+    offset = gen.uniform(-0.3, 0.3, (n_paths, 3)) * distance[:, None]
+    ctrl_t = gen.uniform(0.2, 0.8, (n_paths, 3))
+    ctrl_t[np.arange(3) >= num_control[:, None]] = 2.0  # Unused slots sort last and are never reached
+    ctrl_t.sort(axis=1)
+    ctrl_x = sx[:, None] + dx[:, None] * ctrl_t - (dy * perp)[:, None] * offset
+    ctrl_y = sy[:, None] + dy[:, None] * ctrl_t + (dx * perp)[:, None] * offset
+    
+    # Every step of every path as one flat array
+    counts = num_steps + 1
+    first = np.cumsum(counts) - counts
+    r = np.repeat(np.arange(n_paths), counts)
+    rows = np.arange(len(r))
+    k = rows - first[r]
+    n = num_steps[r]
+    t_raw = k / np.maximum(n, 1)
+    prof = profile[r]
+    t = np.where(prof == 0, 1 - (1 - t_raw) ** 2,
+                 np.where(prof == 1, t_raw ** 2, 0.5 * (1 - np.cos(t_raw * math.pi))))
+    
+    # Segment of the control polyline, interpolated like generate_human_path()
+    # (a middle segment is scaled by t / its end t, not its own span)
+    seg = (ctrl_t[r] < t[:, None]).sum(axis=1)
+    nc = num_control[r]
+    last = seg >= nc
+    j_prev, j_next = np.maximum(seg - 1, 0), np.minimum(seg, 2)
+    px = np.where(seg == 0, sx[r], ctrl_x[r, j_prev])
+    py = np.where(seg == 0, sy[r], ctrl_y[r, j_prev])
+    qx = np.where(last, ex[r], ctrl_x[r, j_next])
+    qy = np.where(last, ey[r], ctrl_y[r, j_next])
+    last_t = ctrl_t[r, nc - 1]
+    seg_t = np.where(last, (t - last_t) / (1 - last_t), t / ctrl_t[r, j_next])
+    x = px + (qx - px) * seg_t
+    y = py + (qy - py) * seg_t
+    
+    # Wobble and occasional overshoot corrections on inner steps
+    inner = (k > 0) & (k < n)
+    wobble = gen.uniform(1, 5, len(r)) * inner
+    x += gen.uniform(-1, 1, len(r)) * wobble
+    y += gen.uniform(-1, 1, len(r)) * wobble
+    correct = inner & (gen.random(len(r)) < 0.15)
+    shift = np.where(correct, gen.uniform(5, 15, len(r)) * np.where(gen.random(len(r)) < 0.5, 1, -1), 0.0)
+    x += shift * (dx * perp)[r]
+    y += shift * (dy * perp)[r]
+    xs = np.clip(np.trunc(x), 100, 1800).astype(np.int64)
+    ys = np.clip(np.trunc(y), 100, 1000).astype(np.int64)
+    ends = first + num_steps
+    xs[ends] = np.where(moving, np.clip(ex, 100, 1800), ex)
+    ys[ends] = np.where(moving, np.clip(ey, 100, 1000), ey)
+    
+    # Micro-pauses push later steps back: time = max(previous + pause, step time),
+    # i.e. paused + running max of (step time - paused), restarted for every path
+    pause = np.where(inner & (gen.random(len(r)) < 0.1), gen.integers(30, 101, len(r)), 0)
+    paused = np.cumsum(pause)
+    paused -= (paused[first] - pause[first])[r]
+    step_time = np.trunc(t * dur[r]).astype(np.int64)
+    restart = r.astype(np.int64) << 40
+    times = np.maximum.accumulate(step_time - paused + restart) - restart + paused
+    
+    times, xs, ys = times.tolist(), xs.tolist(), ys.tolist()
+    return [list(zip(times[a:b], xs[a:b], ys[a:b])) for a, b in zip(first.tolist(), (first + counts).tolist())]
+
+
+class IdlePathWriter:
+    """
+    Output of insert_idle_mouse_movements(): recorded slices and idle paths,
+    queued in order. The compat engine generates each path when it is added
+    (same RNG order as direct generate_human_path() calls); the numpy engine
+    generates all paths of the recording in one batch in write().
+    """
+    def __init__(self, events, rng, engine: str = "compat"):
+        self.events = events
+        self.rng = rng
+        self.engine = engine if engine == "numpy" and numpy_available() else "compat"
+        self.ops = []  # (False, lo, hi) recorded slice / (True, base_time, path or request index)
+        self.requests = []
+    
+    def copy(self, lo, hi):
+        """Queue events[lo:hi] unchanged."""
+        self.ops.append((False, lo, hi))
+    
+    def add(self, base_time, start_x, start_y, end_x, end_y, duration_ms) -> tuple:
+        """Queue a human path starting at base_time; returns its last position."""
+        request = (start_x, start_y, end_x, end_y, duration_ms)
+        if self.engine == "compat":
+            path = generate_human_path(*request, self.rng)
+            self.ops.append((True, base_time, path))
+            return path[-1][1], path[-1][2]
+        self.ops.append((True, base_time, len(self.requests)))
+        self.requests.append(request)
+        return human_path_end(*request)
+    
+    def write(self) -> EventBuffer:
+        paths = generate_human_paths(self.requests, self.rng, self.engine)
+        result = EventBuffer()
+        for is_path, a, b in self.ops:
+            if not is_path:
+                result.extend(self.events, 0, a, b)
+                continue
+            for path_time, px, py in (paths[b] if self.engine == "numpy" else b):
+                result.append_move(a + path_time, px, py, IDLE_MOVE_LAYOUT_CODE)
+        return result
+
+def add_pre_click_jitter(events: EventBuffer, rng: random.Random, protected_ranges=None) -> tuple:
+    """
+    IMPROVED SMART JITTER v3.32.1
+    
+    Add realistic jitter to 21-32% of TOTAL movements (not per-move).
+    NEVER jitter within 1 second before/after ANY click.
+    EXTRA PROTECTION for rapid click sequences (double-clicks, spam clicks).
+    
+    protected_ranges: precomputed detect_rapid_click_sequences(events), if known.
+    
+    Returns (events_with_jitter, jitter_count, total_moves, jitter_percentage,
+    protected_ranges) with the ranges re-indexed for the jittered events.
+    """
+    if not events or len(events) < 2:
+        return events, 0, 0, 0.0, []
+    
+    types, times, xs, ys = events.types, events.times, events.xs, events.ys
+    
+    # Step 1: Detect rapid click sequences (double-clicks, spam clicks)
+    if protected_ranges is None:
+        protected_ranges = detect_rapid_click_sequences(events)
+    
+    # Step 2: Build exclusion zones (merged, sorted intervals)
+    # 1000ms around ALL individual clicks, 1500ms around rapid click sequences
+    exclusion_zones = click_exclusion_zones(events, protected_ranges)
+    
+    # Step 3: Find safe MouseMove events (NOT in any exclusion zone)
+    safe_movements = [i for i, (type_code, event_time) in enumerate(zip(types, times))
+                      if type_code == MOUSE_MOVE and event_time not in exclusion_zones]
+    
+    if not safe_movements:
+        return events, 0, 0, 0.0, protected_ranges
+    
+    # Calculate target: 21-32% of TOTAL movements
+    move_types = (MOUSE_MOVE, CLICK, RIGHT_DOWN)
+    total_moves = sum(1 for type_code in types if type_code in move_types)
+    jitter_percentage = rng.uniform(0.21, 0.32)
+    target_jitters = int(total_moves * jitter_percentage)
+    target_jitters = min(target_jitters, len(safe_movements))
+    
+    if target_jitters == 0:
+        return events, 0, total_moves, 0.0, protected_ranges
+    
+    # Randomly select which safe movements get jitter
+    movements_to_jitter = rng.sample(safe_movements, target_jitters)
+    
+    # Generate in descending index order (keeps the RNG draw order)
+    movements_to_jitter.sort(reverse=True)
+    
+    jitter_count = 0
+    jitter_by_index = {}  # target index -> micro-movements placed before it
+    
+    # Add jitter to selected movements
+    for idx in movements_to_jitter:
+        move_x = xs[idx]
+        move_y = ys[idx]
+        move_time = times[idx]
+        
+        if move_x == NULL_VALUE or move_y == NULL_VALUE:
+            continue
+        
+        # Generate 2-3 micro-movements
+        num_jitters = rng.randint(2, 3)
+        time_budget = rng.randint(100, 200)
+        time_per_jitter = time_budget // (num_jitters + 1)
+        
+        current_time = move_time - time_budget
+        jitter_events = []
+        
+        for j in range(num_jitters):
+            offset_x = rng.randint(-3, 3)
+            offset_y = rng.randint(-3, 3)
+            
+            jitter_x = move_x + offset_x
+            jitter_y = move_y + offset_y
+            
+            jitter_x = max(100, min(1800, jitter_x))
+            jitter_y = max(100, min(1000, jitter_y))
+            
+            jitter_events.append((current_time, jitter_x, jitter_y))
+            
+            current_time += time_per_jitter
+        
+        # Final snap to exact position
+        jitter_events.append((current_time, move_x, move_y))
+        
+        jitter_by_index[idx] = jitter_events
+        jitter_count += 1
+    
+    # Single merge pass: original events with the jitter interleaved
+    # BEFORE each target movement
+    result = EventBuffer()
+    copied = 0
+    targets = sorted(jitter_by_index)
+    inserted_through = []  # jitter events inserted up to and including each target
+    for idx in targets:
+        result.extend(events, 0, copied, idx)
+        for jitter_time, jitter_x, jitter_y in jitter_by_index[idx]:
+            result.append_move(jitter_time, jitter_x, jitter_y)
+        inserted_through.append(len(result) - idx)
+        copied = idx
+    result.extend(events, 0, copied)
+    
+    # Jitter only lands on moves far from clicks, so the rapid click ranges
+    # of the result are the same ranges shifted past the inserted events
+    def shifted(index):
+        k = bisect_right(targets, index)
+        return index + inserted_through[k - 1] if k else index
+    protected_ranges = [(shifted(start), shifted(end)) for start, end in protected_ranges]
+    
+    return result, jitter_count, total_moves, jitter_percentage, protected_ranges
+
+def insert_intra_file_pauses(events: EventBuffer, rng: random.Random, protected_ranges=None) -> tuple:
+    """
+    Insert random pauses before recorded actions.
+    Each file gets 1-4 random pauses (randomly chosen per file).
+    Each pause is 1000-2000ms (non-rounded).
+    Protected ranges (rapid click sequences, a list of (start_idx, end_idx)
+    or an IntervalSet) are skipped.
+    Returns (events_with_pauses, total_pause_time).
+    """
+    if not events or len(events) < 5:
+        return events, 0
+    
+    if protected_ranges is None:
+        protected_ranges = []
+    
+    # Randomly decide how many pauses for this file (1-4)
+    num_pauses = rng.randint(1, 4)
+    
+    # Valid indices (not in protected ranges), as a lazy sequence
+    if not isinstance(protected_ranges, IntervalSet):
+        protected_ranges = IntervalSet(protected_ranges)
+    valid_indices = protected_ranges.uncovered(1, len(events))
+    
+    if not valid_indices:
+        return events, 0
+    
+    # Select random unique indices from valid ones
+    num_pauses = min(num_pauses, len(valid_indices))
+    pause_indices = rng.sample(valid_indices, num_pauses)
+    pause_indices.sort()
+    
+    total_pause_added = 0
+    pauses = []
+    
+    # Draw a pause for each selected index
+    for pause_idx in pause_indices:
+        # Generate non-rounded pause duration (1000-2000ms)
+        pause_duration = int(rng.uniform(1000.123, 1999.987))
+        total_pause_added += pause_duration
+        pauses.append((pause_idx, pause_duration))
+    
+    # Shift each event by the sum of the pauses before it (no rounding!)
+    events.apply_pauses(pauses)
+    
+    return events, total_pause_added
+
+def filter_problematic_keys(events: EventBuffer) -> EventBuffer:
+    """
+    Remove problematic key events that could trigger macro player hotkeys.
+    Filters out: HOME (36), END (35), PAGE UP (33), PAGE DOWN (34), 
+    ESC (27), PAUSE/BREAK (19), PRINT SCREEN (44)
+    """
+    problematic_keycodes = {27, 19, 33, 34, 35, 36, 44}
+    key_types = (KEY_DOWN, KEY_UP)
+    
+    # Skip KeyDown/KeyUp events with problematic keycodes
+    dropped = [i for i, (type_code, keycode) in enumerate(zip(events.types, events.keycodes))
+               if type_code in key_types and keycode in problematic_keycodes]
+    if not dropped:
+        return events
+    
+    dropped = set(dropped)
+    return events.take([i for i in range(len(events)) if i not in dropped])
+
+def insert_idle_mouse_movements(events, rng, movement_percentage, path_engine="compat"):
+    """
+    Insert realistic human-like mouse movements during idle periods (gaps > 5 seconds).
+    
+    Movements have:
+    - Variable speeds (fast bursts, slow drifts, hesitations)
+    - Imperfect paths (wobbles, overshoots, corrections)
+    - Natural patterns (wandering, checking, fidgeting)
+    - Smooth transition back to next recorded position
+    
+    path_engine selects the generate_human_paths() engine for the paths.
+    """
+    if not events or len(events) < 2:
+        return events, 0
+    
+    times, xs, ys = events.times, events.xs, events.ys
+    in_drag, last_cursor, next_cursor = build_idle_context(events)
+    moves = IdlePathWriter(events, rng, path_engine)
+    total_idle_time = 0
+    copied = 0  # events[:copied] are already queued
+    
+    for i in range(len(events) - 1):
+        # Check gap to next event
+        current_time = times[i]
+        next_time = times[i + 1]
+        gap = next_time - current_time
+        
+        # Only process gaps >= 5 seconds
+        if gap >= 5000:
+            # Skip if in drag sequence
+            if in_drag[i]:
+                continue
+            
+            # Recorded events up to and including i come before the movements
+            moves.copy(copied, i + 1)
+            copied = i + 1
+            
+            # Calculate active window
+            active_duration = int(gap * movement_percentage)
+            buffer_start = (gap - active_duration) // 2
+            movement_start = current_time + buffer_start
+            
+            # Get start position (last known cursor)
+            start_x, start_y = 500, 500
+            j = last_cursor[i]
+            if j >= 0:
+                start_x, start_y = xs[j], ys[j]
+            
+            # Get next position (where we need to end up), within 20 events
+            next_x, next_y = start_x, start_y
+            j = next_cursor[i]
+            if j < min(i + 20, len(events)):
+                next_x, next_y = xs[j], ys[j]
+            
+            # Reserve last 25% for smooth transition back
+            transition_duration = int(active_duration * 0.25)
+            pattern_duration = active_duration - transition_duration
+            
+            # Choose movement behavior
+            behavior = rng.choice([
+                'wander',      # Random wandering around
+                'check_edge',  # Quick look at screen edge
+                'fidget',      # Small nervous movements
+                'explore',     # Move far then return
+                'drift',       # Slow meandering
+                'scan'         # Move across screen
+            ])
+            
+            pattern_end_x, pattern_end_y = start_x, start_y
+            pattern_time_used = 0
+            
+            if behavior == 'wander':
+                # Random wandering - multiple small moves
+                num_moves = rng.randint(3, 6)
+                move_duration = pattern_duration // num_moves
+                
+                current_x, current_y = start_x, start_y
+                
+                for move_idx in range(num_moves):
+                    # Pick random nearby target
+                    target_x = current_x + rng.randint(-150, 150)
+                    target_y = current_y + rng.randint(-100, 100)
+                    target_x = max(100, min(1800, target_x))
+                    target_y = max(100, min(1000, target_y))
+                    
+                    # Generate human path
+                    current_x, current_y = moves.add(movement_start + pattern_time_used, current_x, current_y, target_x, target_y, move_duration)
+                    pattern_time_used += move_duration
+                
+                pattern_end_x, pattern_end_y = current_x, current_y
+            
+            elif behavior == 'check_edge':
+                # Quick look at screen edge then back
+                edges = [
+                    (150, start_y),    # Left edge
+                    (1750, start_y),   # Right edge
+                    (start_x, 150),    # Top edge
+                    (start_x, 950),    # Bottom edge
+                ]
+                edge_x, edge_y = rng.choice(edges)
+                
+                # Move to edge (60% of time, fast)
+                edge_duration = int(pattern_duration * 0.6)
+                moves.add(movement_start, start_x, start_y, edge_x, edge_y, edge_duration)
+                
+                # Return near start (40% of time, slower)
+                return_duration = pattern_duration - edge_duration
+                return_x = start_x + rng.randint(-40, 40)
+                return_y = start_y + rng.randint(-40, 40)
+                return_x = max(100, min(1800, return_x))
+                return_y = max(100, min(1000, return_y))
+                
+                pattern_end_x, pattern_end_y = moves.add(movement_start + edge_duration, edge_x, edge_y, return_x, return_y, return_duration)
+                pattern_time_used = pattern_duration
+            
+            elif behavior == 'fidget':
+                # Small rapid movements in small area
+                num_fidgets = rng.randint(5, 10)
+                fidget_duration = pattern_duration // num_fidgets
+                
+                current_x, current_y = start_x, start_y
+                
+                for fidget_idx in range(num_fidgets):
+                    # Small offset
+                    target_x = current_x + rng.randint(-30, 30)
+                    target_y = current_y + rng.randint(-30, 30)
+                    target_x = max(100, min(1800, target_x))
+                    target_y = max(100, min(1000, target_y))
+                    
+                    current_x, current_y = moves.add(movement_start + pattern_time_used, current_x, current_y, target_x, target_y, fidget_duration)
+                    pattern_time_used += fidget_duration
+                
+                pattern_end_x, pattern_end_y = current_x, current_y
+            
+            elif behavior == 'explore':
+                # Move far away then return near start
+                away_x = start_x + rng.randint(-400, 400)
+                away_y = start_y + rng.randint(-300, 300)
+                away_x = max(100, min(1800, away_x))
+                away_y = max(100, min(1000, away_y))
+                
+                # Go away (65% of time)
+                away_duration = int(pattern_duration * 0.65)
+                moves.add(movement_start, start_x, start_y, away_x, away_y, away_duration)
+                
+                # Return (35% of time)
+                return_duration = pattern_duration - away_duration
+                return_x = start_x + rng.randint(-15, 15)
+                return_y = start_y + rng.randint(-15, 15)
+                return_x = max(100, min(1800, return_x))
+                return_y = max(100, min(1000, return_y))
+                
+                pattern_end_x, pattern_end_y = moves.add(movement_start + away_duration, away_x, away_y, return_x, return_y, return_duration)
+                pattern_time_used = pattern_duration
+            
+            elif behavior == 'drift':
+                # Slow continuous drift
+                target_x = start_x + rng.randint(-200, 200)
+                target_y = start_y + rng.randint(-150, 150)
+                target_x = max(100, min(1800, target_x))
+                target_y = max(100, min(1000, target_y))
+                
+                pattern_end_x, pattern_end_y = moves.add(movement_start, start_x, start_y, target_x, target_y, pattern_duration)
+                pattern_time_used = pattern_duration
+            
+            elif behavior == 'scan':
+                # Scan across screen
+                scan_distance = rng.randint(300, 600)
+                direction = rng.choice(['horizontal', 'vertical', 'diagonal'])
+                
+                if direction == 'horizontal':
+                    target_x = start_x + (scan_distance if rng.random() < 0.5 else -scan_distance)
+                    target_y = start_y + rng.randint(-50, 50)
+                elif direction == 'vertical':
+                    target_x = start_x + rng.randint(-50, 50)
+                    target_y = start_y + (scan_distance if rng.random() < 0.5 else -scan_distance)
+                else:  # diagonal
+                    target_x = start_x + (scan_distance if rng.random() < 0.5 else -scan_distance)
+                    target_y = start_y + (scan_distance if rng.random() < 0.5 else -scan_distance)
+                
+                target_x = max(100, min(1800, target_x))
+                target_y = max(100, min(1000, target_y))
+                
+                pattern_end_x, pattern_end_y = moves.add(movement_start, start_x, start_y, target_x, target_y, pattern_duration)
+                pattern_time_used = pattern_duration
+            
+            # Smooth transition back to next recorded position
+            moves.add(movement_start + pattern_duration,
+                      pattern_end_x, pattern_end_y,
+                      next_x, next_y,
+                      transition_duration)
+            
+            total_idle_time += active_duration
+    
+    moves.copy(copied, len(events))
+    return moves.write(), total_idle_time
+
+
+class CombinationHistory:
+    """
+    NEW FEATURE 1: Combination history store shared by all folders of a run.
+    
+    Signatures live in one SQLite file (combination_history/history.sqlite),
+    keyed by folder. COMBINATION_HISTORY_*.txt files dropped into
+    combination_history/ are imported once (again only if they change);
+    they are the durable record (CI commits one per bundle), the SQLite file
+    is only an index that is rebuilt from them when it is lost.
+    Everything is loaded into per-folder sets at startup, and the
+    combinations of this run are appended in one transaction at the end.
+    """
+    def __init__(self, input_dir: Path):
+        self.history_dir = input_dir / "combination_history"
+        self.db_path = self.history_dir / "history.sqlite"
+        self.folders = {}  # lowercased folder name -> set of signatures
+        
+        if not self.history_dir.exists():
+            return
+        
+        rebuilt = not self.db_path.exists()
+        conn = self._connect()
+        try:
+            txt_files = sorted(self.history_dir.glob("*.txt"))
+            if rebuilt:
+                if txt_files:
+                    print(f"  ⚠️  {self.db_path.name} missing, rebuilding it from {len(txt_files)} history file(s)")
+                else:
+                    print(f"  ⚠️  {self.db_path.name} missing and no COMBINATION_HISTORY_*.txt files: starting with an empty history")
+            imported = dict((name, (size, mtime_ns)) for name, size, mtime_ns
+                            in conn.execute("SELECT name, size, mtime_ns FROM imported"))
+            new_files = [f for f in txt_files if imported.get(f.name) != self._stat_key(f)]
+            if new_files:
+                print(f"  📂 Importing {len(new_files)} history file(s)...")
+            for hist_file in new_files:
+                try:
+                    with conn:
+                        conn.executemany("INSERT OR IGNORE INTO combinations VALUES (?, ?)",
+                                         self._read_txt(hist_file))
+                        conn.execute("INSERT OR REPLACE INTO imported VALUES (?, ?, ?)",
+                                     (hist_file.name, *self._stat_key(hist_file)))
+                    print(f"    ✅ {hist_file.name}: Imported")
+                except Exception as e:
+                    print(f"    ⚠️  {hist_file.name}: Error - {e}")
+            
+            for folder, signature in conn.execute("SELECT folder, signature FROM combinations"):
+                self.folders.setdefault(folder, set()).add(signature)
+        finally:
+            conn.close()
+        
+        if self.folders:
+            total = sum(len(used) for used in self.folders.values())
+            print(f"📂 Combination history: {total} combinations for {len(self.folders)} folders")
+    
+    def _connect(self):
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path))
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS combinations (
+                folder TEXT, signature TEXT, PRIMARY KEY (folder, signature)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS imported (name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER);
+        """)
+        return conn
+    
+    @staticmethod
+    def _stat_key(path: Path) -> tuple:
+        st = path.stat()
+        return st.st_size, st.st_mtime_ns
+    
+    @staticmethod
+    def _read_txt(hist_file: Path) -> list:
+        """(folder, signature) rows of a COMBINATION_HISTORY_*.txt file"""
+        rows = []
+        with open(hist_file, 'r', encoding='utf-8') as f:
+            current_folder = None
+            for line in f:
+                line = line.strip()
+                
+                # Detect folder section
+                if line.startswith('[') and line.endswith(']'):
+                    current_folder = line[1:-1].lower()
+                    continue
+                
+                # Skip empty lines and headers
+                if not line or line.startswith('==='):
+                    continue
+                
+                if current_folder and '|' in line:  # Looks like a combination signature
+                    rows.append((current_folder, line))
+        return rows
+    
+    def used(self, folder_name: str) -> set:
+        """Copy of the signatures already used by a folder (callers add to it)."""
+        return set(self.folders.get(folder_name.lower(), ()))
+    
+    def append(self, bundle_combinations: dict):
+        """Atomically add this run's {folder_name: [signatures]} to the store."""
+        rows = [(folder.lower(), signature) for folder, combos in bundle_combinations.items() for signature in combos]
+        if not rows:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO combinations VALUES (?, ?)", rows)
+        finally:
+            conn.close()
+
+
+class ManualHistoryTracker:
+    """
+    NEW FEATURE 1: Manual combination history tracker for merge_macros.
+    
+    Tracks which file combinations have been used across multiple runs.
+    History is stored in: input_macros/combination_history/ (see CombinationHistory)
+    Output: COMBINATION_HISTORY_{bundle_id}.txt
+    """
+    def __init__(self, all_files, rng, folder_name, history):
+        self.all_files = all_files
+        self.rng = rng
+        self.folder_name = folder_name
+        
+        # Combinations of this folder from history
+        self.used_combinations = history.used(folder_name)
         
-        # Add random wobble (humans don't move in perfect lines)
-        wobble_amount = rng.uniform(1, 5) if step > 0 and step < num_steps else 0
-        x += rng.uniform(-wobble_amount, wobble_amount)
-        y += rng.uniform(-wobble_amount, wobble_amount)
+        # Track combinations used THIS run
+        self.current_run_combinations = []
         
-        # Add occasional micro-corrections (overshoot and correct)
-        if step > 0 and step < num_steps and rng.random() < 0.15:
-            overshoot = rng.uniform(5, 15)
-            direction = 1 if rng.random() < 0.5 else -1
-            x += direction * overshoot * (dx / (distance + 1))
-            y += direction * overshoot * (dy / (distance + 1))
+        if self.used_combinations:
+            print(f"  📊 {len(self.used_combinations)} combinations loaded from history")
+    
+    def get_unique_sequence(self, target_files):
+        """
+        Get a file sequence that hasn't been used before.
+        Tries to find new combination, falls back to random if exhausted.
+        """
+        # Create signature from file sequence
+        signature = "|".join(f.name for f in target_files)
         
-        # Keep within bounds
-        x = max(100, min(1800, int(x)))
-        y = max(100, min(1000, int(y)))
+        # Check if already used
+        if signature in self.used_combinations:
+            # Already used, but allow it (combination space may be exhausted)
+            pass
         
-        # Calculate time with variable speed
-        time_progress = t
+        # Mark as used
+        self.used_combinations.add(signature)
+        self.current_run_combinations.append(signature)
         
-        # Add micro-pauses (humans sometimes pause mid-movement)
-        if step > 0 and step < num_steps and rng.random() < 0.1:
-            pause = rng.randint(30, 100)
-            current_time += pause
+        return target_files
+
+
+class QueueFileSelector:
+    def __init__(self, rng, all_files, durations_cache):
+        self.rng = rng
+        self.durations = durations_cache
+        self.efficient = [f for f in all_files if "¬¬" not in f.name]
+        self.inefficient = [f for f in all_files if "¬¬" in f.name]
+        self.eff_pool = list(self.efficient)
+        self.ineff_pool = list(self.inefficient)
+        self.rng.shuffle(self.eff_pool)
+        self.rng.shuffle(self.ineff_pool)
+
+    def get_sequence(self, target_minutes, force_inef=False, is_time_sensitive=False):
+        seq, cur_ms = [], 0.0
+        target_ms = target_minutes * 60000
+        # Add ±5% margin for flexibility
+        margin = int(target_ms * 0.05)
+        target_min = target_ms - margin
+        target_max = target_ms + margin
+        actual_force = force_inef if not is_time_sensitive else False
         
-        step_time = int(time_progress * duration_ms)
-        current_time = max(current_time, step_time)  # Ensure monotonic
+        # Keep adding files until we reach target
+        # Stop conditions:
+        # 1. Reached target OR
+        # 2. Adding next file would overshoot by more than 4 minutes
         
-        path.append((current_time, x, y))
-    
-    return path
+        while cur_ms < target_max:
+            # Try to get next file
+            if actual_force and self.ineff_pool: pick = self.ineff_pool.pop(0)
+            elif self.eff_pool: pick = self.eff_pool.pop(0)
+            elif self.efficient:
+                self.eff_pool = list(self.efficient); self.rng.shuffle(self.eff_pool)
+                pick = self.eff_pool.pop(0)
+            elif self.ineff_pool and not is_time_sensitive: pick = self.ineff_pool.pop(0)
+            else: break  # No more files
+            
+            file_duration = self.durations.get(pick, 500)
+            
+            # File selector multiplier - CRITICAL for accuracy
+            # 1.0x = too many files (overshoot 11-18 min)
+            # 1.8x = too few files (undershoot 10-13 min)
+            # 1.35x = sweet spot (target ±2-4 min)
+            if is_time_sensitive:
+                estimated_time = file_duration * 1.05  # TIME SENSITIVE: minimal overhead
+            else:
+                estimated_time = file_duration * 1.35  # NORMAL: balanced estimate
+            
+            # Check if adding would overshoot too much
+            potential_total = cur_ms + estimated_time
+            overshoot = potential_total - target_ms
+            
+            if overshoot > margin:  # Would overshoot beyond acceptable margin
+                # Only skip if we're already reasonably close to target
+                if cur_ms >= (target_ms - (4 * 60000)):  # Within 4 min of target
+                    break  # Close enough, stop
+                else:
+                    # Still far from target, add it anyway
+                    seq.append(pick)
+                    cur_ms += estimated_time
+            else:
+                # Safe to add (won't overshoot by more than 4 min)
+                seq.append(pick)
+                cur_ms += estimated_time
+            
+            # Safety limits
+            if len(seq) > 800: break
+            if cur_ms > target_ms * 3: break
+        
+        return seq
+
+
+def pool_output_dir(data, settings) -> tuple:
+    """(cleaned folder name, output folder) of a pool inside the bundle."""
+    # Remove D_ or d_ from folder name
+    cleaned_folder_name = re.sub(r'[Dd]_', '', data["rel_path"].name)
+    return cleaned_folder_name, settings["bundle_dir"] / data["rel_path"].parent / cleaned_folder_name
+
 
-def add_pre_click_jitter(events: list, rng: random.Random) -> tuple:
+def prepare_pool(key, data, settings, rng, history):
     """
-    IMPROVED SMART JITTER v3.32.1
+    Create the output folder of one pool, copy logout/non-JSON/'always'
+    files and build the manifest header. history is the run's CombinationHistory.
+    Returns the pool dict that build_version() and finish_pool() work on.
+    """
+    folder_number = data["folder_number"]
     
-    Add realistic jitter to 21-32% of TOTAL movements (not per-move).
-    NEVER jitter within 1 second before/after ANY click.
-    EXTRA PROTECTION for rapid click sequences (double-clicks, spam clicks).
+    original_rel_path = data["rel_path"]
     
-    Returns (events_with_jitter, jitter_count, total_moves, jitter_percentage).
-    """
-    if not events or len(events) < 2:
-        return events, 0, 0, 0.0
+    cleaned_folder_name, out_f = pool_output_dir(data, settings)
+    out_f.mkdir(parents=True, exist_ok=True)
     
-    # Step 1: Detect rapid click sequences (double-clicks, spam clicks)
-    protected_ranges = detect_rapid_click_sequences(events)
+    # NEW FEATURE 1: Initialize combination history tracker
+    tracker = ManualHistoryTracker(
+        data["files"],
+        rng,
+        cleaned_folder_name,
+        history
+    )
     
-    # Step 2: Build exclusion zones
-    exclusion_zones = []  # List of (start_time, end_time) tuples
+    logout_file = settings["logout_file"]
+    if logout_file:
+        try:
+            original_name = logout_file.name
+            # Simple @ prefix with UPPERCASE, no folder number: "logout.json" → "@ LOGOUT.JSON"
+            if original_name.startswith("-"):
+                # Has dash: "- logout.json" → "@ LOGOUT.JSON"
+                new_name = "@ " + original_name[1:].strip().upper()
+            else:
+                # Add @ prefix: "logout.json" → "@ LOGOUT.JSON"
+                new_name = "@ " + original_name.upper()
+            logout_dest = out_f / new_name
+            copy_into_bundle(logout_file, logout_dest)
+            print(f"  ✓ Copied logout: {original_name} → {new_name}")
+        except Exception as e:
+            print(f"  ✗ Error copying {logout_file.name}: {e}")
+    else:
+        print(f"  ⚠  Warning: No logout file found")
     
-    # Add 1000ms buffer around ALL individual clicks
-    click_types = {'Click', 'LeftDown', 'RightDown', 'DragStart'}
-    for e in events:
-        if e.get('Type') in click_types:
-            click_time = e.get('Time', 0)
-            exclusion_zones.append((click_time - 1000, click_time + 1000))
+    if "non_json_files" in data and data["non_json_files"]:
+        for non_json_file in data["non_json_files"]:
+            try:
+                original_name = non_json_file.name
+                # Keep @ prefix if present
+                if original_name.startswith("-"):
+                    new_name = f"@ {folder_number} {original_name[1:].strip()}"
+                else:
+                    new_name = f"@ {folder_number} {original_name}"
+                copy_into_bundle(non_json_file, out_f / new_name)
+                print(f"  ✓ Copied non-JSON file: {original_name} → {new_name}")
+            except Exception as e:
+                print(f"  ✗ Error copying {non_json_file.name}: {e}")
     
-    # Add EXTENDED buffer around rapid click sequences
-    # For sequences, extend 1500ms before first click and 1500ms after last click
-    for start_idx, end_idx in protected_ranges:
-        if start_idx < len(events) and end_idx < len(events):
-            first_click_time = events[start_idx].get('Time', 0)
-            last_click_time = events[end_idx].get('Time', 0)
-            # Extended buffer: 1500ms before/after the sequence
-            exclusion_zones.append((first_click_time - 1500, last_click_time + 1500))
+    if "always_files" in data and data["always_files"]:
+        for always_file in data["always_files"]:
+            try:
+                original_name = Path(always_file).name
+                # Add folder number prefix
+                if original_name.startswith("-"):
+                    new_name = f"@ {folder_number} {original_name[1:].strip()}"
+                else:
+                    new_name = f"@ {folder_number} {original_name}"
+                copy_into_bundle(always_file, out_f / new_name)
+                print(f"  ✓ Copied 'always' file: {original_name} → {new_name}")
+            except Exception as e:
+                print(f"  ✗ Error copying {Path(always_file).name}: {e}")
     
-    # Step 3: Find safe MouseMove events (NOT in any exclusion zone)
-    safe_movements = []
-    for i, event in enumerate(events):
-        if event.get('Type') == 'MouseMove':
-            event_time = event.get('Time', 0)
-            # Check if this time is safe (not in any exclusion zone)
-            is_safe = True
-            for zone_start, zone_end in exclusion_zones:
-                if zone_start <= event_time <= zone_end:
-                    is_safe = False
-                    break
-            
-            if is_safe:
-                safe_movements.append((i, event))
+    total_original_ms = sum(settings["durations_cache"].get(f, 0) for f in data["files"])
     
-    if not safe_movements:
-        return events, 0, 0, 0.0
+    manifest = [
+        f"MANIFEST FOR FOLDER: {original_rel_path}",
+        "=" * 40,
+        f"Script Version: {VERSION}",
+        f"Merged Bundle: merged_bundle_{settings['bundle_id']}",
+        f"Total Original Files: {len(data['files'])}",
+        f"Total Original Files Duration: {format_ms_precise(total_original_ms)}",
+        " "
+    ]
     
-    # Calculate target: 21-32% of TOTAL movements
-    total_moves = sum(1 for e in events if e.get('Type') in ('MouseMove', 'Click', 'RightDown'))
-    jitter_percentage = rng.uniform(0.21, 0.32)
-    target_jitters = int(total_moves * jitter_percentage)
-    target_jitters = min(target_jitters, len(safe_movements))
+    is_ts  = data["is_ts"]
+    norm_v, inef_v, raw_v = version_counts(settings["versions"], is_ts)
+    total_v = norm_v + inef_v + raw_v
     
-    if target_jitters == 0:
-        return events, 0, total_moves, 0.0
+    return {
+        "key": key,
+        "folder_number": folder_number,
+        "folder_name": cleaned_folder_name,
+        "out_f": out_f,
+        "tracker": tracker,
+        "manifest": manifest,
+        "raw_v": raw_v,
+        "inef_v": inef_v,
+        "total_v": total_v,
+    }
+
+
+def plan_version(data, settings, pool, v_idx, rng):
+    """
+    The event-independent decisions of version v_idx: type, multiplier, file
+    sequence, DROP ONLY file and chat insertion point (the first half of
+    build_version(), also used by --plan). rng is consumed in place.
+    Returns None when no files could be selected.
+    """
+    folder_number = pool["folder_number"]
+    raw_v, inef_v = pool["raw_v"], pool["inef_v"]
+    is_ts = data["is_ts"]
     
-    # Randomly select which safe movements get jitter
-    movements_to_jitter = rng.sample(safe_movements, target_jitters)
+    # Determine file type based on NEW ordering
+    # NEW NAMING SCHEME: Raw gets A,B,C first, then Inefficient, then Normal
+    if v_idx <= raw_v:
+        is_raw = True
+        is_inef = False
+        is_ts_version = False
+    elif v_idx <= raw_v + inef_v:
+        is_raw = False
+        is_inef = True
+        is_ts_version = False
+    else:
+        is_raw = False
+        is_inef = False
+        is_ts_version = is_ts  # Only normal files can be TS
     
-    # Sort by index (descending) to insert from end to start
-    movements_to_jitter.sort(key=lambda x: x[0], reverse=True)
+    v_letter = chr(64 + v_idx)
+    v_code = f"{folder_number}_{v_letter}"
+
+    if is_ts_version: mult = rng.choice([1.0, 1.2, 1.5])
+    elif is_inef:     mult = rng.choices([2, 3], weights=[50, 50], k=1)[0]
+    elif is_raw:      mult = rng.choices([1, 2, 3], weights=[50, 30, 20], k=1)[0]
+    else:             mult = rng.choices([1, 2], weights=[62.5, 37.5], k=1)[0]
+
+    movement_percentage = rng.uniform(0.40, 0.50)
     
-    jitter_count = 0
+    paths = QueueFileSelector(rng, data["files"], settings["durations_cache"]).get_sequence(settings["target_minutes"], is_inef, is_ts_version)
     
-    # Add jitter to selected movements
-    for idx, event in movements_to_jitter:
-        move_x = event.get('X')
-        move_y = event.get('Y')
-        move_time = event.get('Time')
-        
-        if move_x is None or move_y is None or move_time is None:
-            continue
-        
-        # Generate 2-3 micro-movements
-        num_jitters = rng.randint(2, 3)
-        time_budget = rng.randint(100, 200)
-        time_per_jitter = time_budget // (num_jitters + 1)
-        
-        current_time = move_time - time_budget
-        jitter_events = []
-        
-        for j in range(num_jitters):
-            offset_x = rng.randint(-3, 3)
-            offset_y = rng.randint(-3, 3)
-            
-            jitter_x = int(move_x) + offset_x
-            jitter_y = int(move_y) + offset_y
-            
-            jitter_x = max(100, min(1800, jitter_x))
-            jitter_y = max(100, min(1000, jitter_y))
-            
-            jitter_events.append({
-                'Type': 'MouseMove',
-                'Time': current_time,
-                'X': jitter_x,
-                'Y': jitter_y
-            })
-            
-            current_time += time_per_jitter
-        
-        # Final snap to exact position
-        jitter_events.append({
-            'Type': 'MouseMove',
-            'Time': current_time,
-            'X': int(move_x),
-            'Y': int(move_y)
-        })
-        
-        # Insert jitter events BEFORE the target movement
-        for je in reversed(jitter_events):
-            events.insert(idx, je)
-        
-        jitter_count += 1
+    if not paths:
+        return None
+
+    # DROP ONLY insertion for Mining folders (1 file in middle)
+    drop_only_file = None
+    if "drop_only_files" in data and data["drop_only_files"]:
+        # Select ONE random DROP file
+        drop_only_file = rng.choice(data["drop_only_files"])
+        print(f"  ℹ️  Mining folder: Will insert DROP ONLY file: {drop_only_file.name}")
+
+    # Insert chat in only 50% of merged files
+    should_insert_chat = rng.random() < 0.50
+    chat_insertion_point = rng.randint(1, max(1, len(paths)-1)) if len(paths) > 1 and should_insert_chat else -1
     
-    return events, jitter_count, total_moves, jitter_percentage
+    return {
+        "is_raw": is_raw,
+        "is_inef": is_inef,
+        "is_ts_version": is_ts_version,
+        "v_code": v_code,
+        "mult": mult,
+        "movement_percentage": movement_percentage,
+        "paths": paths,
+        "drop_only_file": drop_only_file,
+        "chat_insertion_point": chat_insertion_point,
+    }
+
 
-def insert_chat_from_file(events: list, rng: random.Random, chat_files: list) -> tuple:
+def build_version(data, settings, pool, v_idx, rng, chat_queue):
     """
-    20% chance to insert a random chat message from 'chat inserts' folder.
-    Loads a recorded .json file and inserts it at a random point.
-    Returns (events_with_chat, chat_inserted).
+    Generate and write version v_idx of a pool.
+    rng and chat_queue are consumed in place.
+    Returns dict with the file sequence used and the manifest entry,
+    or None when no files could be selected.
     """
-    if not events or not chat_files or rng.random() > 0.20:
-        return events, False
+    out_f = pool["out_f"]
     
-    # Pick random chat file
-    chat_file = rng.choice(chat_files)
+    plan = plan_version(data, settings, pool, v_idx, rng)
+    if plan is None:
+        return None
+    is_raw, is_inef, is_ts_version = plan["is_raw"], plan["is_inef"], plan["is_ts_version"]
+    v_code, mult, paths = plan["v_code"], plan["mult"], plan["paths"]
+    movement_percentage = plan["movement_percentage"]
+    drop_only_file = plan["drop_only_file"]
+    chat_insertion_point = plan["chat_insertion_point"]
+    jitter_percentage = 0.0  # Will be set per file
     
-    try:
-        # Load chat events
-        chat_events = load_json_events(chat_file)
-        if not chat_events:
-            return events, False
+    total_idle_movements = 0
+    total_intra_pauses = 0
+    total_normal_pauses = 0
+    total_inter_pauses = 0
+    total_afk_pool = 0
+    total_jitter_count = 0
+    total_clicks = 0
+    massive_pause_info = None
+    merged = EventSpool()  # Streams to disk; DROP ONLY + massive pause are planned offsets
+    timeline = 0
+
+    # Chat - only 1 per merged file, using global queue
+    chat_used = False
+    file_segments = []
+    
+    # Get dmwm file set for this folder
+    dmwm_file_set = data.get("dmwm_files", set())
+    
+    # Next files are loaded and filtered in the background while this one is merged
+    prefetch_depth, prefetch_budget = settings.get("prefetch", (0, 0))
+    if _profiler is not None:
+        prefetch_depth = 0  # Keep parse/filter_keys timings on the version that uses them
+    prefetcher = EventPrefetcher(paths, prefetch_depth, prefetch_budget)
+    path_engine = settings.get("path_engine", "compat")
+    
+    for i, p in enumerate(paths):
+        raw = prefetcher.take(i)  # Already filtered for problematic keys
+        if not raw: continue
         
-        # Filter problematic keys from chat
-        chat_events = filter_problematic_keys(chat_events)
-        if not chat_events:
-            return events, False
+        # Check if this file is from "dont mess with me" folder
+        is_dmwm_file = p in dmwm_file_set
         
-        # Find insertion point (20-80% through file)
-        if len(events) < 10:
-            return events, False
+        # is_time_sensitive = True only for explicitly TS versions (not normal versions in TS folders)
+        is_time_sensitive = is_ts_version
         
-        start_idx = int(len(events) * 0.20)
-        end_idx = int(len(events) * 0.80)
-        insertion_point = rng.randint(start_idx, end_idx)
+        # INSERT CHAT ONCE (before the chosen file index)
+        if not chat_used and i == chat_insertion_point and chat_queue:
+            try:
+                chat_file = chat_queue.pop(0)  # Take from front
+                chat_events, chat_start, _ = load_template(chat_file)
+                if chat_events:
+                    # Normalize to current timeline
+                    chat_file_start_idx = len(merged)
+                    merged.extend(chat_events, timeline - chat_start)
+                    
+                    timeline = merged.last_time if len(merged) else timeline
+                    file_segments.append({
+                        "name": chat_file.name,
+                        "end_time": timeline,
+                        "start_idx": chat_file_start_idx,
+                        "end_idx": len(merged) - 1,
+                        "is_chat": True
+                    })
+                    chat_used = True
+                    
+                    # Put used file at END of queue (ensures all files used before repeat)
+                    chat_queue.append(chat_file)
+                    
+                    # If queue is empty, refill and shuffle
+                    if not chat_queue and settings["chat_files"]:
+                        chat_queue.extend(settings["chat_files"])
+                        rng.shuffle(chat_queue)
+            except Exception as e:
+                print(f"  ⚠️ Error loading chat {chat_file.name}: {e}")
+                chat_queue.append(chat_file)  # Return to queue
         
-        # Get time at insertion point
-        base_time = events[insertion_point].get('Time', 0)
+        # Rapid click sequences of this source file (memoized across versions)
+        protected_ranges = file_rapid_click_ranges(p, raw)
         
-        # Normalize chat events to start at base_time
-        chat_start_time = min(e.get('Time', 0) for e in chat_events)
-        for event in chat_events:
-            event['Time'] = event['Time'] - chat_start_time + base_time
+        # Step 1: Add pre-move jitter (skip for dmwm files)
+        if not is_dmwm_file:
+            raw_with_jitter, jitter_count, click_count, jitter_pct, protected_ranges = add_pre_click_jitter(
+                raw, rng, protected_ranges)
+            total_jitter_count += jitter_count
+            total_clicks += click_count
+            jitter_percentage = jitter_pct
+        else:
+            raw_with_jitter = raw
         
-        # Calculate chat duration
-        chat_duration = max(e.get('Time', 0) for e in chat_events) - base_time
+        # Step 2: Insert random intra-file pauses between actions
+        # TIME SENSITIVE and RAW: Skip (adds time)
+        # Rapid click sequences (re-indexed past the jitter) are protected
+        if not is_time_sensitive and not is_raw:
+            raw_with_pauses, intra_pause_time = insert_intra_file_pauses(raw_with_jitter, rng, protected_ranges)
+            total_intra_pauses += intra_pause_time
+        else:
+            raw_with_pauses = raw_with_jitter
         
-        # Shift all events AFTER insertion point (no rounding!)
-        for i in range(insertion_point, len(events)):
-            events[i]['Time'] = events[i]['Time'] + chat_duration
+        # Step 3: Insert idle mouse movements in gaps >= 5 seconds
+        raw_with_movements, idle_time = insert_idle_mouse_movements(raw_with_pauses, rng, movement_percentage, path_engine)
+        total_idle_movements += idle_time
         
-        # Insert chat events
-        for i, chat_event in enumerate(chat_events):
-            events.insert(insertion_point + i, chat_event)
         
-        return events, True
+        base_t = min(raw_with_movements.times)
         
-    except Exception as e:
-        print(f"  ⚠️ Error loading chat file {chat_file.name}: {e}")
-        return events, False
+        # OPTIMIZED 4-PHASE CURSOR TRANSITION (from string_macros)
+        if i > 0:
+            # Phase 1: Pre-file pause (click release protection)
+            # Ensures any clicks from previous file are fully released
+            pre_file_pause = int(rng.uniform(800.0, 1500.0) * mult)
+            timeline += pre_file_pause
+            
+            # Phase 2: Post-pause delay (preparation time)
+            # Simulates player preparing for next action
+            post_pause_delay = int(rng.uniform(500.0, 1000.0) * mult)
+            timeline += post_pause_delay
+            
+            # Get cursor positions
+            last_cursor = merged.last_cursor
+            
+            first_cursor = None
+            for x, y in zip(raw_with_movements.xs, raw_with_movements.ys):
+                if x != NULL_VALUE and y != NULL_VALUE:
+                    first_cursor = (x, y)
+                    break
+            
+            # Phase 3: Fast cursor transition (200-400ms dedicated movement)
+            if last_cursor and first_cursor:
+                last_x, last_y = last_cursor
+                first_x, first_y = first_cursor
+                
+                # Only transition if positions differ
+                if (last_x != first_x) or (last_y != first_y):
+                    # Fast dedicated transition (more realistic than slow gradual)
+                    transition_duration = int(rng.uniform(200, 400))
+                    
+                    transition_path = generate_human_paths([(
+                        last_x, last_y,
+                        first_x, first_y,
+                        transition_duration,
+                    )], rng, path_engine)[0]
+                    
+                    # Add transition movements
+                    for rel_time, x, y in transition_path:
+                        merged.append_move(timeline + rel_time, x, y)
+                    
+                    timeline += transition_duration
+                    
+                    # Phase 4: Explicit final position (guarantees accuracy)
+                    merged.append_move(timeline, first_x, first_y)
+            
+            # Update total inter-pause tracking
+            gap = pre_file_pause + post_pause_delay
+        else:
+            gap = 0
+            
+        timeline += gap
+        total_inter_pauses += gap
+        
+        file_start_idx = len(merged)  # Track where this file starts in merged array
+        
+        merged.extend(raw_with_movements, timeline - base_t)  # No rounding!
+        
+        timeline = merged.last_time
+        file_end_idx = len(merged) - 1
+        # Mark dmwm files in manifest
+        file_name = f"[UNMODIFIED] {p.name}" if is_dmwm_file else p.name
+        file_segments.append({
+            "name": file_name, 
+            "end_time": timeline,
+            "start_idx": file_start_idx,
+            "end_idx": file_end_idx,
+            "is_chat": False
+        })
+
+    prefetcher.close()
+
+    # INSERT DROP ONLY file in middle (Mining folders only)
+    if drop_only_file and len(merged) > 10:
+        drop_events, drop_start_time, drop_end_time = load_template(drop_only_file)
+        if drop_events:
+            # Random insertion point (25-75% through file)
+            drop_start_idx = int(len(merged) * 0.25)
+            drop_end_idx = int(len(merged) * 0.75)
+            drop_insertion_point = rng.randint(drop_start_idx, drop_end_idx)
+            
+            drop_base_time = merged.time_at(drop_insertion_point)
+            drop_duration = drop_end_time - drop_start_time
+            
+            # Insert DROP events at the insertion point, normalized to start at drop_base_time,
+            # and shift all events AFTER insertion point by drop duration
+            merged.plan_insert(drop_insertion_point, drop_events, drop_base_time - drop_start_time, drop_duration)
+            
+            timeline = merged.final_time_at(merged.final_len() - 1)
+            
+            file_segments.append({
+                "name": f"[DROP ONLY] {drop_only_file.name}",
+                "end_time": drop_base_time + drop_duration,
+                "start_idx": drop_insertion_point,
+                "end_idx": drop_insertion_point + len(drop_events) - 1,
+                "is_chat": False
+            })
+            
+            print(f"    ✓ Inserted DROP ONLY at {format_ms_precise(drop_base_time)}")
 
-def insert_intra_file_pauses(events: list, rng: random.Random, protected_ranges: list = None) -> tuple:
-    """
-    Insert random pauses before recorded actions.
-    Each file gets 1-4 random pauses (randomly chosen per file).
-    Each pause is 1000-2000ms (non-rounded).
-    Protected ranges (rapid click sequences) are skipped.
-    Returns (events_with_pauses, total_pause_time).
-    """
-    if not events or len(events) < 5:
-        return events, 0
+    total_afk_pool = total_idle_movements
+    chat_inserted = chat_used  # Track if chat was used
     
-    if protected_ranges is None:
-        protected_ranges = []
+    if is_inef and not data["is_ts"] and merged.final_len() > 1:
+        # Massive pause: 4-9 minutes (240000-540000ms)
+        p_ms = rng.randint(240000, 540000)
+        split = rng.randint(0, merged.final_len() - 2)
+        merged.plan_shift(split + 1, p_ms)
+        timeline = merged.final_time_at(merged.final_len() - 1)
+        massive_pause_info = f"Massive P1: {format_ms_precise(p_ms)}"
+        
+        for seg in file_segments:
+            if seg["end_idx"] > split:
+                seg["end_time"] = merged.final_time_at(seg["end_idx"])
     
-    # Randomly decide how many pauses for this file (1-4)
-    num_pauses = rng.randint(1, 4)
+    # Calculate exact time for filename
+    total_minutes = int(timeline / 60000)
+    total_seconds = int((timeline % 60000) / 1000)
     
-    # Find valid indices (not in protected ranges)
-    valid_indices = []
-    for idx in range(1, len(events)):
-        if not is_in_protected_range(idx, protected_ranges):
-            valid_indices.append(idx)
+    # File prefix: ¬¬ = inefficient, ^ = raw, blank = normal/TS
+    if is_raw:        prefix = "^"
+    elif is_inef:     prefix = "¬¬"
+    else:             prefix = ""
     
-    if not valid_indices:
-        return events, 0
+    fname = f"{prefix}{v_code}_{total_minutes}m{total_seconds}s.json"
+    try:
+        write_events_json(out_f / fname, merged.final_pieces(), compact=settings.get("compact_json", False))
+    finally:
+        merged.close()
     
-    # Select random unique indices from valid ones
-    num_pauses = min(num_pauses, len(valid_indices))
-    pause_indices = rng.sample(valid_indices, num_pauses)
-    pause_indices.sort()
+    # Calculate pause time (idle movements are informational only)
+    total_pause = total_intra_pauses + total_inter_pauses + total_normal_pauses
     
-    total_pause_added = 0
+    # Determine file type
+    if is_ts_version:
+        file_type = "Time sensitive"
+    elif is_inef:
+        file_type = "Inefficient"
+    elif is_raw:
+        file_type = "Raw"
+    else:
+        file_type = "Normal"
     
-    # Apply pauses at selected indices
-    for pause_idx in pause_indices:
-        # Generate non-rounded pause duration (1000-2000ms)
-        pause_duration = int(rng.uniform(1000.123, 1999.987))
-        total_pause_added += pause_duration
-        
-        # Shift this event and all subsequent events by the pause (no rounding!)
-        for j in range(pause_idx, len(events)):
-            events[j]["Time"] = events[j]["Time"] + pause_duration
+    # Calculate pause times
+    # Only inter-file pauses get multiplied!
+    original_intra = total_intra_pauses  # Not multiplied
+    original_inter = int(total_inter_pauses / mult) if mult > 0 else total_inter_pauses
+    original_normal = total_normal_pauses
+    original_total = original_intra + original_inter + original_normal
     
-    return events, total_pause_added
-
-def insert_normal_file_pauses(events: list, rng: random.Random) -> tuple:
-    """
-    Insert 1-3 random extended pauses (0-2 minutes each) for NORMAL files only.
-    These are inserted at random points throughout the merged file.
-    Returns (events_with_pauses, total_pause_time).
-    """
-    if not events or len(events) < 10:
-        return events, 0
+    # Calculate total time in minutes and seconds
+    total_min = int(timeline / 60000)
+    total_sec = int((timeline % 60000) / 1000)
     
-    # Randomly decide how many extended pauses (1-3)
-    num_pauses = rng.randint(1, 3)
+    # Version label with duration and separator
+    version_label = f"Version {prefix}{v_code}_{total_min}m{total_sec}s:"
+    separator = "=" * 40
     
-    # Select random unique indices
-    max_idx = len(events) - 1
-    if max_idx < num_pauses:
-        num_pauses = max_idx
+    if is_raw:
+        # Raw files: minimal manifest (only inter-file pauses, no anti-detection)
+        manifest_entry = [
+            separator,
+            " ",
+            version_label,
+            f"FILE TYPE: Raw (no time-adding features, no chat)",
+            f"  Between files pause: {format_ms_precise(total_inter_pauses)} (x{mult} Multiplier)",
+        ]
+    else:
+        manifest_entry = [
+            separator,
+            " ",
+            version_label,
+            f"FILE TYPE: {file_type}",
+            f"  Total PAUSE ADDED: {format_ms_precise(total_pause)} (x{mult} Multiplier)",
+            f"BREAKDOWN",
+            f"total before    - Within original files pauses: {format_ms_precise(original_intra)}",
+            f"multiplier      - Between original files pauses: {format_ms_precise(original_inter)}",
+            f"                - Normal file pause: {format_ms_precise(original_normal)}",
+        ]
     
-    pause_indices = rng.sample(range(1, len(events)), num_pauses)
-    pause_indices.sort()
+    # Idle and jitter: all types (raw included, since they don't add time)
+    manifest_entry.extend([
+        f"Idle Mouse Movements: {format_ms_precise(total_idle_movements)}",
+        f"Mouse Jitter: {int(jitter_percentage * 100)}%"
+    ])
     
-    total_pause_added = 0
+    # Add files list with chat highlighting
+    # Sort file segments by end_time for chronological order
+    file_segments.sort(key=lambda x: x["end_time"])
     
-    # Apply pauses at selected indices
-    for pause_idx in pause_indices:
-        # Generate non-rounded pause duration (0-2 minutes = 0-120000ms)
-        pause_duration = int(rng.uniform(0.123, 119999.987))
-        total_pause_added += pause_duration
-        
-        # Shift this event and all subsequent events by the pause (no rounding!)
-        for j in range(pause_idx, len(events)):
-            events[j]["Time"] = events[j]["Time"] + pause_duration
+    manifest_entry.append("")
+    for seg in file_segments:
+        if seg.get("is_chat", False):
+            manifest_entry.append(f"  ****** {seg['name']} (Ends at {format_ms_precise(seg['end_time'])})")
+        else:
+            manifest_entry.append(f"  * {seg['name']} (Ends at {format_ms_precise(seg['end_time'])})")
     
-    return events, total_pause_added
+    
+    return {"paths": paths, "manifest_entry": "\n".join(manifest_entry), "output_path": out_f / fname}
+
+
+def record_version(pool, result):
+    """Add a build_version() result to the pool's manifest and combination tracker."""
+    if result is None:
+        return
+    # NEW FEATURE 1: Track this combination
+    pool["tracker"].get_unique_sequence(result["paths"])
+    pool["manifest"].append(result["manifest_entry"])
+
 
-def filter_problematic_keys(events: list) -> list:
+def finish_pool(pool):
+    """Return the finished manifest text and combinations of a pool."""
+    return {
+        "folder_name": pool["folder_name"],
+        "manifest_path": pool["out_f"] / f"!_MANIFEST_{pool['folder_number']}_!.txt",
+        "manifest": "\n".join(pool["manifest"]),
+        "combinations": pool["tracker"].current_run_combinations,
+    }
+
+
+def process_pool(key, data, settings, rng, chat_queue, history):
     """
-    Remove problematic key events that could trigger macro player hotkeys.
-    Filters out: HOME (36), END (35), PAGE UP (33), PAGE DOWN (34), 
-    ESC (27), PAUSE/BREAK (19), PRINT SCREEN (44)
+    Generate every version of one folder pool sequentially.
+    
+    settings holds the run-wide values (bundle_id, versions, target_minutes,
+    bundle_dir, originals_root, logout_file, durations_cache, chat_files).
+    rng and chat_queue are consumed in place, so the sequential mode can share
+    them across pools exactly like before.
     """
-    problematic_keycodes = {27, 19, 33, 34, 35, 36, 44}
+    pool = prepare_pool(key, data, settings, rng, history)
+    for v_idx in range(1, pool["total_v"] + 1):
+        record_version(pool, build_version(data, settings, pool, v_idx, rng, chat_queue))
+    return finish_pool(pool)
+
+
+def run_seeded_version(job):
+    """
+    Build one version with its own RNG stream (--workers mode).
+    The seed is derived from (bundle_id, pool key, v_idx) and the chat queue
+    is the bundle-wide shuffled order rotated to this version's slot, so the
+    result doesn't depend on which worker runs what, or in which order.
+    """
+    data, settings, pool, v_idx, chat_slot = job
+    rng, chat_queue = seeded_version_stream(settings, pool["key"], v_idx, chat_slot)
+    return build_version(data, settings, pool, v_idx, rng, chat_queue)
+
+
+def seeded_version_stream(settings, key, v_idx, chat_slot) -> tuple:
+    """(rng, chat_queue) of one seeded version, see run_seeded_version()."""
+    chat_order = settings["chat_order"]
+    chat_queue = []
+    if chat_order:
+        shift = chat_slot % len(chat_order)
+        chat_queue = chat_order[shift:] + chat_order[:shift]
+    return random.Random(derive_seed(settings["bundle_id"], key, v_idx)), chat_queue
+
+
+PLAN_FORMAT = 2
+
+
+def file_digest(path, digests: dict = None):
+    """
+    Content hash of an input file (the packed digest if only its pack is
+    left), or None if it is missing. digests caches hashes by path.
+    """
+    path = Path(path)
+    if digests is not None and path in digests:
+        return digests[path]
+    try:
+        digest = hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+    except OSError:
+        _, entry = packed_recording(path)  # Packed, JSON removed
+        digest = entry["digest"] if entry else None
+    if digests is not None:
+        digests[path] = digest
+    return digest
+
+
+def _plan_rel(path, root: Path) -> str:
+    """Path stored in a plan: relative to the library root, '/'-separated."""
+    return Path(os.path.relpath(path, root)).as_posix()
+
+
+def plan_pool(key, data, settings, chat_slot, root: Path) -> dict:
+    """
+    --plan entry of one pool: its inputs (paths relative to root) and the
+    decisions of every seeded version, computed without loading any events.
+    """
+    durations = settings["durations_cache"]
+    norm_v, inef_v, raw_v = version_counts(settings["versions"], data["is_ts"])
+    pool = {"key": key, "folder_number": data["folder_number"], "raw_v": raw_v, "inef_v": inef_v}
+    cleaned_folder_name, _ = pool_output_dir(data, settings)
+    rel = lambda p: _plan_rel(p, root)
     
-    filtered = []
-    for event in events:
-        # Skip KeyDown/KeyUp events with problematic keycodes
-        if event.get('Type') in ['KeyDown', 'KeyUp']:
-            keycode = event.get('KeyCode')
-            if keycode in problematic_keycodes:
-                continue  # Skip this event
+    versions = []
+    for v_idx in range(1, norm_v + inef_v + raw_v + 1):
+        rng, chat_queue = seeded_version_stream(settings, key, v_idx, chat_slot + v_idx - 1)
+        plan = plan_version(data, settings, pool, v_idx, rng)
+        if plan is None:
+            versions.append(None)
+            continue
+        
+        if plan["is_ts_version"]:  file_type, prefix, factor = "Time sensitive", "", 1.05
+        elif plan["is_inef"]:      file_type, prefix, factor = "Inefficient", "¬¬", 1.35
+        elif plan["is_raw"]:       file_type, prefix, factor = "Raw", "^", 1.35
+        else:                      file_type, prefix, factor = "Normal", "", 1.35
+        # Same estimate as QueueFileSelector; the exact length (and so the
+        # file name) is only known once the events are generated
+        source_ms = sum(durations.get(p, 500) for p in plan["paths"])
+        estimated_ms = int(source_ms * factor)
+        chat_file = chat_queue[0] if chat_queue and plan["chat_insertion_point"] >= 0 else None
         
-        filtered.append(event)
+        versions.append({
+            "version": plan["v_code"],
+            "type": file_type,
+            "multiplier": plan["mult"],
+            "files": [rel(p) for p in plan["paths"]],
+            "source_ms": source_ms,
+            "estimated_ms": estimated_ms,
+            "estimated_output": f"{prefix}{plan['v_code']}_{int(estimated_ms / 60000)}m{int((estimated_ms % 60000) / 1000)}s.json",
+            "chat_insert": {"file": rel(chat_file), "before_file": plan["chat_insertion_point"]} if chat_file else None,
+            "drop_only": rel(plan["drop_only_file"]) if plan["drop_only_file"] else None,
+        })
     
-    return filtered
+    return {
+        "key": key,
+        "rel_path": data["rel_path"].as_posix(),
+        "folder_number": data["folder_number"],
+        "is_ts": data["is_ts"],
+        "chat_slot": chat_slot,
+        "output_dir": (data["rel_path"].parent / cleaned_folder_name).as_posix(),
+        "files": [rel(p) for p in data["files"]],
+        "always_files": [rel(p) for p in data["always_files"]],
+        "drop_only_files": [rel(p) for p in data["drop_only_files"]],
+        "dmwm_files": sorted(rel(p) for p in data["dmwm_files"]),
+        "non_json_files": [rel(p) for p in data["non_json_files"]],
+        "versions": versions,
+    }
+
+
+def write_bundle_plan(plan_path: Path, settings, pool_plans: list, root: Path):
+    """Write a --plan file: run settings, source durations, input digests and the pool plans."""
+    durations = {}
+    for entry in pool_plans:
+        for name in entry["files"] + entry["always_files"]:
+            ms = settings["durations_cache"].get(root / name)
+            if ms is not None:
+                durations[name] = ms
+    inputs = [_plan_rel(p, root) for p in settings["chat_files"]]
+    if settings["logout_file"]:
+        inputs.append(_plan_rel(settings["logout_file"], root))
+    for entry in pool_plans:
+        for field in ("files", "always_files", "drop_only_files", "dmwm_files", "non_json_files"):
+            inputs += entry[field]
+    plan = {
+        "plan_format": PLAN_FORMAT,
+        "script_version": VERSION,
+        "bundle_id": settings["bundle_id"],
+        "versions": settings["versions"],
+        "target_minutes": settings["target_minutes"],
+        "compact_json": settings["compact_json"],
+        "path_engine": settings["path_engine"],
+        "library_root": str(root),
+        "logout_file": _plan_rel(settings["logout_file"], root) if settings["logout_file"] else None,
+        "chat_files": [_plan_rel(p, root) for p in settings["chat_files"]],
+        "chat_order": [_plan_rel(p, root) for p in settings["chat_order"]],
+        "durations_ms": durations,
+        "digests": {name: file_digest(root / name) for name in sorted(set(inputs))},
+        "pools": pool_plans,
+    }
+    plan_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = plan_path.with_name(plan_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(plan, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, plan_path)
+
 
-def insert_idle_mouse_movements(events, rng, movement_percentage):
+def read_bundle_plan(plan_path: Path) -> dict:
+    """Load and check a --plan file (--from-plan)."""
+    plan = json.loads(Path(plan_path).read_text(encoding="utf-8"))
+    if plan.get("plan_format") != PLAN_FORMAT:
+        raise ValueError(f"unsupported plan format {plan.get('plan_format')!r}")
+    if plan["script_version"] != VERSION:
+        raise ValueError(f"plan was made by merge_macros {plan['script_version']}, this is {VERSION}")
+    return plan
+
+
+def changed_plan_inputs(plan: dict, root: Path) -> list:
+    """Planned input files (relative names) whose content changed or that are gone."""
+    return [name for name, digest in plan["digests"].items() if file_digest(root / name) != digest]
+
+
+def pools_from_plan(plan: dict, root: Path) -> tuple:
     """
-    Insert realistic human-like mouse movements during idle periods (gaps > 5 seconds).
+    The pools of a plan in discover_pools() form, paths resolved against root.
+    Only the pools the plan generates are included (optional folders are
+    already decided). Returns (pools, durations_cache).
+    """
+    pools = {}
+    for entry in plan["pools"]:
+        pools[entry["key"]] = {
+            "rel_path": Path(entry["rel_path"]),
+            "files": [root / name for name in entry["files"]],
+            "always_files": [root / name for name in entry["always_files"]],
+            "drop_only_files": [root / name for name in entry["drop_only_files"]],
+            "dmwm_files": set(root / name for name in entry["dmwm_files"]),
+            "non_json_files": [root / name for name in entry["non_json_files"]],
+            "is_ts": entry["is_ts"],
+            "folder_number": entry["folder_number"],
+        }
+    durations_cache = {root / name: ms for name, ms in plan["durations_ms"].items()}
+    return pools, durations_cache
+
+
+def pool_fingerprint(key, data, settings, chat_slot, digests) -> str:
+    """
+    Hash of everything the seeded outputs of one pool depend on (--incremental):
+    script VERSION, seed (bundle id), generation settings, the pool's files
+    (names + content hashes), the logout file and the chat inserts this pool
+    starts at. Seeds stay per bundle so bundles never repeat each other, which
+    means a pool is only reused by a rerun of the same bundle id (e.g. after
+    editing one folder or an interrupted run). digests caches file content
+    hashes by path for the run.
+    """
+    h = hashlib.blake2b(digest_size=20)
     
-    Movements have:
-    - Variable speeds (fast bursts, slow drifts, hesitations)
-    - Imperfect paths (wobbles, overshoots, corrections)
-    - Natural patterns (wandering, checking, fidgeting)
-    - Smooth transition back to next recorded position
+    def feed(*parts):
+        for part in parts:
+            h.update(repr(part).encode("utf-8"))
+            h.update(b"\0")
+    
+    def feed_files(files):
+        feed(len(files))
+        for f in files:
+            feed(Path(f).name, file_digest(f, digests))
+    
+    feed(VERSION, settings["bundle_id"], key, str(data["rel_path"]), data["folder_number"], data["is_ts"],
+         settings["versions"], settings["target_minutes"], settings["compact_json"],
+         settings.get("path_engine", "compat"))
+    feed_files(data["files"])
+    feed_files(data["always_files"])
+    feed_files(data["drop_only_files"])
+    feed_files(sorted(data["dmwm_files"]))
+    feed_files(data.get("non_json_files", []))
+    feed_files([settings["logout_file"]] if settings["logout_file"] else [])
+    feed(chat_slot)
+    feed_files(settings["chat_order"])
+    return h.hexdigest()
+
+
+class IncrementalStore:
     """
-    if not events or len(events) < 2:
-        return events, 0
+    Record of the pools generated by previous runs (--incremental).
     
-    result = []
-    total_idle_time = 0
+    Maps a pool fingerprint to the output files it produced (plus manifest and
+    combinations), stored as JSON in the cache directory. A pool whose
+    fingerprint matches, and whose recorded outputs still exist, is hard-linked
+    (or copied) into the new bundle instead of being regenerated.
+    """
+    def __init__(self, path: Path):
+        self.path = path
+        self.reused = 0
+        try:
+            self.pools = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.pools = {}
     
-    for i in range(len(events)):
-        result.append(events[i])
-        
-        # Check gap to next event
-        if i < len(events) - 1:
-            current_time = int(events[i].get("Time", 0))
-            next_time = int(events[i + 1].get("Time", 0))
-            gap = next_time - current_time
-            
-            # Only process gaps >= 5 seconds
-            if gap >= 5000:
-                # Skip if in drag sequence
-                if is_in_drag_sequence(events, i):
-                    continue
-                
-                # Calculate active window
-                active_duration = int(gap * movement_percentage)
-                buffer_start = (gap - active_duration) // 2
-                movement_start = current_time + buffer_start
-                
-                # Get start position
-                start_x, start_y = 500, 500
-                for j in range(i, -1, -1):
-                    x_val = events[j].get("X")
-                    y_val = events[j].get("Y")
-                    if x_val is not None and y_val is not None:
-                        start_x = int(x_val)
-                        start_y = int(y_val)
-                        break
-                
-                # Get next position (where we need to end up)
-                next_x, next_y = start_x, start_y
-                for j in range(i + 1, min(i + 20, len(events))):
-                    x_val = events[j].get("X")
-                    y_val = events[j].get("Y")
-                    if x_val is not None and y_val is not None:
-                        next_x = int(x_val)
-                        next_y = int(y_val)
-                        break
-                
-                # Reserve last 25% for smooth transition back
-                transition_duration = int(active_duration * 0.25)
-                pattern_duration = active_duration - transition_duration
-                
-                # Choose movement behavior
-                behavior = rng.choice([
-                    'wander',      # Random wandering around
-                    'check_edge',  # Quick look at screen edge
-                    'fidget',      # Small nervous movements
-                    'explore',     # Move far then return
-                    'drift',       # Slow meandering
-                    'scan'         # Move across screen
-                ])
-                
-                pattern_end_x, pattern_end_y = start_x, start_y
-                pattern_time_used = 0
-                
-                if behavior == 'wander':
-                    # Random wandering - multiple small moves
-                    num_moves = rng.randint(3, 6)
-                    move_duration = pattern_duration // num_moves
-                    
-                    current_x, current_y = start_x, start_y
-                    
-                    for move_idx in range(num_moves):
-                        # Pick random nearby target
-                        target_x = current_x + rng.randint(-150, 150)
-                        target_y = current_y + rng.randint(-100, 100)
-                        target_x = max(100, min(1800, target_x))
-                        target_y = max(100, min(1000, target_y))
-                        
-                        # Generate human path
-                        path = generate_human_path(current_x, current_y, target_x, target_y, move_duration, rng)
-                        
-                        for path_time, px, py in path:
-                            abs_time = movement_start + pattern_time_used + path_time
-                            result.append({
-                                "Time": abs_time,
-                                "Type": "MouseMove",
-                                "X": px,
-                                "Y": py
-                            })
-                        
-                        current_x, current_y = path[-1][1], path[-1][2]
-                        pattern_time_used += move_duration
-                    
-                    pattern_end_x, pattern_end_y = current_x, current_y
-                
-                elif behavior == 'check_edge':
-                    # Quick look at screen edge then back
-                    edges = [
-                        (150, start_y),    # Left edge
-                        (1750, start_y),   # Right edge
-                        (start_x, 150),    # Top edge
-                        (start_x, 950),    # Bottom edge
-                    ]
-                    edge_x, edge_y = rng.choice(edges)
-                    
-                    # Move to edge (60% of time, fast)
-                    edge_duration = int(pattern_duration * 0.6)
-                    path_to_edge = generate_human_path(start_x, start_y, edge_x, edge_y, edge_duration, rng)
-                    
-                    for path_time, px, py in path_to_edge:
-                        abs_time = movement_start + path_time
-                        result.append({"Time": abs_time, "Type": "MouseMove", "X": px, "Y": py})
-                    
-                    # Return near start (40% of time, slower)
-                    return_duration = pattern_duration - edge_duration
-                    return_x = start_x + rng.randint(-40, 40)
-                    return_y = start_y + rng.randint(-40, 40)
-                    return_x = max(100, min(1800, return_x))
-                    return_y = max(100, min(1000, return_y))
-                    
-                    path_return = generate_human_path(edge_x, edge_y, return_x, return_y, return_duration, rng)
-                    
-                    for path_time, px, py in path_return:
-                        abs_time = movement_start + edge_duration + path_time
-                        result.append({"Time": abs_time, "Type": "MouseMove", "X": px, "Y": py})
-                    
-                    pattern_end_x, pattern_end_y = path_return[-1][1], path_return[-1][2]
-                    pattern_time_used = pattern_duration
-                
-                elif behavior == 'fidget':
-                    # Small rapid movements in small area
-                    num_fidgets = rng.randint(5, 10)
-                    fidget_duration = pattern_duration // num_fidgets
-                    
-                    current_x, current_y = start_x, start_y
-                    
-                    for fidget_idx in range(num_fidgets):
-                        # Small offset
-                        target_x = current_x + rng.randint(-30, 30)
-                        target_y = current_y + rng.randint(-30, 30)
-                        target_x = max(100, min(1800, target_x))
-                        target_y = max(100, min(1000, target_y))
-                        
-                        path = generate_human_path(current_x, current_y, target_x, target_y, fidget_duration, rng)
-                        
-                        for path_time, px, py in path:
-                            abs_time = movement_start + pattern_time_used + path_time
-                            result.append({"Time": abs_time, "Type": "MouseMove", "X": px, "Y": py})
-                        
-                        current_x, current_y = path[-1][1], path[-1][2]
-                        pattern_time_used += fidget_duration
-                    
-                    pattern_end_x, pattern_end_y = current_x, current_y
-                
-                elif behavior == 'explore':
-                    # Move far away then return near start
-                    away_x = start_x + rng.randint(-400, 400)
-                    away_y = start_y + rng.randint(-300, 300)
-                    away_x = max(100, min(1800, away_x))
-                    away_y = max(100, min(1000, away_y))
-                    
-                    # Go away (65% of time)
-                    away_duration = int(pattern_duration * 0.65)
-                    path_away = generate_human_path(start_x, start_y, away_x, away_y, away_duration, rng)
-                    
-                    for path_time, px, py in path_away:
-                        abs_time = movement_start + path_time
-                        result.append({"Time": abs_time, "Type": "MouseMove", "X": px, "Y": py})
-                    
-                    # Return (35% of time)
-                    return_duration = pattern_duration - away_duration
-                    return_x = start_x + rng.randint(-15, 15)
-                    return_y = start_y + rng.randint(-15, 15)
-                    return_x = max(100, min(1800, return_x))
-                    return_y = max(100, min(1000, return_y))
-                    
-                    path_return = generate_human_path(away_x, away_y, return_x, return_y, return_duration, rng)
-                    
-                    for path_time, px, py in path_return:
-                        abs_time = movement_start + away_duration + path_time
-                        result.append({"Time": abs_time, "Type": "MouseMove", "X": px, "Y": py})
-                    
-                    pattern_end_x, pattern_end_y = path_return[-1][1], path_return[-1][2]
-                    pattern_time_used = pattern_duration
-                
-                elif behavior == 'drift':
-                    # Slow continuous drift
-                    target_x = start_x + rng.randint(-200, 200)
-                    target_y = start_y + rng.randint(-150, 150)
-                    target_x = max(100, min(1800, target_x))
-                    target_y = max(100, min(1000, target_y))
-                    
-                    path = generate_human_path(start_x, start_y, target_x, target_y, pattern_duration, rng)
-                    
-                    for path_time, px, py in path:
-                        abs_time = movement_start + path_time
-                        result.append({"Time": abs_time, "Type": "MouseMove", "X": px, "Y": py})
-                    
-                    pattern_end_x, pattern_end_y = path[-1][1], path[-1][2]
-                    pattern_time_used = pattern_duration
-                
-                elif behavior == 'scan':
-                    # Scan across screen
-                    scan_distance = rng.randint(300, 600)
-                    direction = rng.choice(['horizontal', 'vertical', 'diagonal'])
-                    
-                    if direction == 'horizontal':
-                        target_x = start_x + (scan_distance if rng.random() < 0.5 else -scan_distance)
-                        target_y = start_y + rng.randint(-50, 50)
-                    elif direction == 'vertical':
-                        target_x = start_x + rng.randint(-50, 50)
-                        target_y = start_y + (scan_distance if rng.random() < 0.5 else -scan_distance)
-                    else:  # diagonal
-                        target_x = start_x + (scan_distance if rng.random() < 0.5 else -scan_distance)
-                        target_y = start_y + (scan_distance if rng.random() < 0.5 else -scan_distance)
-                    
-                    target_x = max(100, min(1800, target_x))
-                    target_y = max(100, min(1000, target_y))
-                    
-                    path = generate_human_path(start_x, start_y, target_x, target_y, pattern_duration, rng)
-                    
-                    for path_time, px, py in path:
-                        abs_time = movement_start + path_time
-                        result.append({"Time": abs_time, "Type": "MouseMove", "X": px, "Y": py})
-                    
-                    pattern_end_x, pattern_end_y = path[-1][1], path[-1][2]
-                    pattern_time_used = pattern_duration
-                
-                # Smooth transition back to next recorded position
-                transition_path = generate_human_path(
-                    pattern_end_x, pattern_end_y,
-                    next_x, next_y,
-                    transition_duration,
-                    rng
-                )
-                
-                for path_time, px, py in transition_path:
-                    abs_time = movement_start + pattern_duration + path_time
-                    result.append({"Time": abs_time, "Type": "MouseMove", "X": px, "Y": py})
-                
-                total_idle_time += active_duration
+    def reuse(self, fingerprint: str, bundle_dir: Path, out_f: Path):
+        """Link the recorded outputs into out_f; returns the record, or None on a miss."""
+        record = self.pools.get(fingerprint)
+        if not record:
+            return None
+        source_dir = Path(record["bundle_dir"])
+        sources = [source_dir / rel for rel in record["files"]]
+        if not all(src.is_file() for src in sources):
+            return None
+        out_f.mkdir(parents=True, exist_ok=True)
+        keep = set()
+        for rel, src in zip(record["files"], sources):
+            dest = bundle_dir / rel
+            if dest.exists() and os.path.samefile(src, dest):
+                keep.add(dest.name)
+                continue
+            if dest.exists():
+                dest.unlink()
+            try:
+                os.link(src, dest)
+            except OSError:
+                shutil.copy2(src, dest)
+            keep.add(dest.name)
+        # Drop leftovers of other runs (e.g. version files with other durations)
+        for p in out_f.iterdir():
+            if p.is_file() and p.name not in keep:
+                p.unlink()
+        self.reused += 1
+        return record
+    
+    def release(self, out_f: Path):
+        """
+        Clear out_f before the pool is regenerated: forget the records of its
+        current files and unlink them, so files of other bundles sharing the
+        same inodes (hard links) are never written through.
+        """
+        if not out_f.is_dir():
+            return
+        targets = {p.resolve() for p in out_f.iterdir() if p.is_file()}
+        self.pools = {fp: record for fp, record in self.pools.items()
+                      if not any((Path(record["bundle_dir"]) / rel).resolve() in targets for rel in record["files"])}
+        for target in targets:
+            target.unlink()
     
-    return result, total_idle_time
+    def remember(self, fingerprint: str, bundle_dir: Path, out_f: Path, result: dict):
+        """Record the outputs of a freshly generated pool."""
+        self.pools[fingerprint] = {
+            "bundle_dir": str(bundle_dir.resolve()),
+            "files": sorted(p.relative_to(bundle_dir).as_posix() for p in out_f.iterdir() if p.is_file()),
+            "folder_name": result["folder_name"],
+            "combinations": result["combinations"],
+        }
+    
+    def save(self):
+        # Forget pools whose outputs were deleted since
+        self.pools = {fp: record for fp, record in self.pools.items()
+                      if all((Path(record["bundle_dir"]) / rel).is_file() for rel in record["files"])}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(self.pools), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass  # Best effort, like the event cache
 
 
-class ManualHistoryTracker:
+class StageProfiler:
     """
-    NEW FEATURE 1: Manual combination history tracker for merge_macros.
+    Per-stage instrumentation for --profile.
     
-    Tracks which file combinations have been used across multiple runs.
-    Files are stored in: input_macros/combination_history/
-    Output: COMBINATION_HISTORY_{bundle_id}.txt
+    enable() replaces the module functions listed in STAGES with timing
+    wrappers that record wall time (inclusive and self), call count and event
+    count per (folder, version, stage). Without --profile nothing is wrapped,
+    so the normal run executes the original functions with no overhead.
     """
-    def __init__(self, all_files, rng, folder_name, input_dir):
-        self.all_files = all_files
-        self.rng = rng
-        self.folder_name = folder_name
-        self.input_dir = input_dir
-        
-        # History folder
-        self.history_dir = input_dir / "combination_history"
-        
-        # Load all combinations from history
-        self.used_combinations = self._load_all_combinations()
-        
-        # Track combinations used THIS run
-        self.current_run_combinations = []
-        
-        if self.used_combinations:
-            print(f"  📊 {len(self.used_combinations)} combinations loaded from history")
+    # module function -> stage name in the report
+    STAGES = {
+        "discover_pools": "discovery",
+        "get_file_duration_ms": "duration_probe",
+        "load_event_buffer": "parse",
+        "filter_problematic_keys": "filter_keys",
+        "add_pre_click_jitter": "jitter",
+        "insert_intra_file_pauses": "intra_pauses",
+        "insert_idle_mouse_movements": "idle_movements",
+        "generate_human_path": "human_path",
+        "_human_paths_numpy": "human_path",
+        "write_events_json": "json_write",
+        "build_version": "merge_loop",
+    }
     
-    def _load_all_combinations(self):
-        """Load all combination signatures from ALL .txt files in history folder"""
-        if not self.history_dir.exists():
-            return set()
-        
-        used = set()
-        txt_files = list(self.history_dir.glob("*.txt"))
-        
-        if not txt_files:
-            return set()
-        
-        print(f"  📂 Reading {len(txt_files)} history file(s)...")
+    def __init__(self):
+        self.records = {}  # (folder key, version code, stage) -> [wall, self, calls, events]
+        self.folders = {}  # folder key -> (output folder, folder number)
+        self.context = (None, None)
+        self.child_time = [0.0]  # Time spent in nested stages, per active frame
+    
+    def enable(self):
+        module = globals()
+        for func_name, stage in self.STAGES.items():
+            module[func_name] = self._wrap(module[func_name], stage)
+    
+    def _wrap(self, func, stage):
+        profiler = self
         
-        for hist_file in txt_files:
+        def wrapper(*args, **kwargs):
+            if stage == "merge_loop":
+                pool, v_idx = args[2], args[3]
+                profiler.folders[pool["key"]] = (str(pool["out_f"]), pool["folder_number"])
+                outer_context = profiler.context
+                profiler.context = (pool["key"], f"{pool['folder_number']}_{chr(64 + v_idx)}")
+            profiler.child_time.append(0.0)
+            started = time.perf_counter()
             try:
-                with open(hist_file, 'r', encoding='utf-8') as f:
-                    current_folder = None
-                    for line in f:
-                        line = line.strip()
-                        
-                        # Detect folder section
-                        if line.startswith('[') and line.endswith(']'):
-                            current_folder = line[1:-1]
-                            continue
-                        
-                        # Skip empty lines and headers
-                        if not line or line.startswith('==='):
-                            continue
-                        
-                        # Only process combinations for THIS folder
-                        if current_folder and current_folder.lower() == self.folder_name.lower():
-                            if '|' in line:  # Looks like a combination signature
-                                used.add(line)
-                
-                print(f"    ✅ {hist_file.name}: Loaded")
-            except Exception as e:
-                print(f"    ⚠️  {hist_file.name}: Error - {e}")
+                result = func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                nested = profiler.child_time.pop()
+                profiler.child_time[-1] += elapsed
+                folder, version = profiler.context
+                if stage == "merge_loop":
+                    profiler.context = outer_context
+                entry = profiler.records.setdefault((folder, version, stage), [0.0, 0.0, 0, 0])
+                entry[0] += elapsed
+                entry[1] += elapsed - nested
+                entry[2] += 1
+            entry[3] += profiler._event_count(stage, args, result)
+            return result
         
-        return used
+        wrapper.__name__ = func.__name__
+        wrapper.__qualname__ = func.__qualname__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
     
-    def get_unique_sequence(self, target_files):
+    @staticmethod
+    def _event_count(stage, args, result) -> int:
+        if stage == "human_path" and result and isinstance(result[0], list):
+            return sum(len(path) for path in result)  # Batch of paths
+        if stage in ("parse", "human_path"):
+            return len(result)
+        if stage == "json_write":
+            return result
+        if stage == "discovery":
+            return 0
+        if stage == "merge_loop":
+            return 0
+        events = args[0] if args else None
+        return len(events) if isinstance(events, EventBuffer) else 0
+    
+    def drain(self) -> tuple:
+        """Hand over (and reset) the records of a worker process."""
+        state = (self.records, self.folders)
+        self.records, self.folders = {}, {}
+        return state
+    
+    def absorb(self, state):
+        """Add records drained from a worker process."""
+        records, folders = state
+        self.folders.update(folders)
+        for key, (wall, self_time, calls, events) in records.items():
+            entry = self.records.setdefault(key, [0.0, 0.0, 0, 0])
+            entry[0] += wall
+            entry[1] += self_time
+            entry[2] += calls
+            entry[3] += events
+    
+    @staticmethod
+    def _stage_table(rows) -> dict:
+        table = {}
+        for stage, wall, self_time, calls, events in rows:
+            entry = table.setdefault(stage, {"wall_seconds": 0.0, "self_seconds": 0.0, "calls": 0, "events": 0})
+            entry["wall_seconds"] += wall
+            entry["self_seconds"] += self_time
+            entry["calls"] += calls
+            entry["events"] += events
+        for entry in table.values():
+            entry["wall_seconds"] = round(entry["wall_seconds"], 6)
+            entry["self_seconds"] = round(entry["self_seconds"], 6)
+        return table
+    
+    def write_reports(self, bundle_dir: Path, bundle_id, total_seconds: float) -> Path:
         """
-        Get a file sequence that hasn't been used before.
-        Tries to find new combination, falls back to random if exhausted.
+        Write !_PROFILE_<n>_!.json next to each folder manifest (per version
+        stages) and the bundle summary !_PROFILE_!.json; returns the summary path.
         """
-        # Create signature from file sequence
-        signature = "|".join(f.name for f in target_files)
-        
-        # Check if already used
-        if signature in self.used_combinations:
-            # Already used, but allow it (combination space may be exhausted)
-            pass
+        by_folder = {}
+        for (folder, version, stage), (wall, self_time, calls, events) in self.records.items():
+            by_folder.setdefault(folder, {}).setdefault(version, []).append((stage, wall, self_time, calls, events))
         
-        # Mark as used
-        self.used_combinations.add(signature)
-        self.current_run_combinations.append(signature)
+        summary_folders = {}
+        for folder, versions in by_folder.items():
+            if folder is None:
+                continue
+            out_f, folder_number = self.folders[folder]
+            report = {
+                "folder": folder,
+                "stages": self._stage_table(row for rows in versions.values() for row in rows),
+                "versions": {version: self._stage_table(rows) for version, rows in sorted(versions.items(), key=lambda kv: str(kv[0]))},
+            }
+            save_bundle_text(Path(out_f, f"!_PROFILE_{folder_number}_!.json"), json.dumps(report, indent=2))
+            summary_folders[folder] = report["stages"]
         
-        return target_files
+        summary = {
+            "script_version": VERSION,
+            "bundle_id": bundle_id,
+            "total_seconds": round(total_seconds, 6),
+            "startup": self._stage_table(row for rows in by_folder.get(None, {}).values() for row in rows),
+            "stages": self._stage_table((stage, *values) for (_, _, stage), values in self.records.items()),
+            "folders": summary_folders,
+        }
+        summary_path = bundle_dir / "!_PROFILE_!.json"
+        save_bundle_text(summary_path, json.dumps(summary, indent=2))
+        return summary_path
 
 
-class QueueFileSelector:
-    def __init__(self, rng, all_files, durations_cache):
-        self.rng = rng
-        self.durations = durations_cache
-        self.efficient = [f for f in all_files if "¬¬" not in f.name]
-        self.inefficient = [f for f in all_files if "¬¬" in f.name]
-        self.eff_pool = list(self.efficient)
-        self.ineff_pool = list(self.inefficient)
-        self.rng.shuffle(self.eff_pool)
-        self.rng.shuffle(self.ineff_pool)
+_profiler = None
 
-    def get_sequence(self, target_minutes, force_inef=False, is_time_sensitive=False):
-        seq, cur_ms = [], 0.0
-        target_ms = target_minutes * 60000
-        # Add ±5% margin for flexibility
-        margin = int(target_ms * 0.05)
-        target_min = target_ms - margin
-        target_max = target_ms + margin
-        actual_force = force_inef if not is_time_sensitive else False
-        
-        # Keep adding files until we reach target
-        # Stop conditions:
-        # 1. Reached target OR
-        # 2. Adding next file would overshoot by more than 4 minutes
+
+def enable_profiling() -> StageProfiler:
+    """Turn on --profile instrumentation for this process."""
+    global _profiler
+    if _profiler is None:
+        _profiler = StageProfiler()
+        _profiler.enable()
+    return _profiler
+
+
+def run_profiled_version(job):
+    """run_seeded_version() in a worker, returning (result, profile records)."""
+    return run_seeded_version(job), _profiler.drain()
+
+
+# Archives inherited from a forked --archive parent, kept alive but unused
+_inherited_archives = []
+
+
+def _init_pool_worker(cache_dir, cache_root, profile=False, memo_bytes=None):
+    """Process-pool initializer: re-enable the event cache (and --profile) in the worker."""
+    global _bundle_archive, _prefetch_executor
+    _prefetch_executor = None  # Threads of a forked parent don't exist here
+    if memo_bytes is not None:
+        configure_buffer_memo(memo_bytes)
+    if _bundle_archive is not None:
+        # Workers write version files to the bundle folder and the parent moves
+        # them into the archive; closing the inherited ZipFile would corrupt it
+        _inherited_archives.append(_bundle_archive)
+        _bundle_archive = None
+    if cache_dir:
+        configure_event_cache(cache_dir, cache_root)
+    if profile:
+        enable_profiling().drain()  # Drop records inherited from a forked parent
+
+
+def discover_pools(originals_root: Path, folder_whitelist, catalog=None) -> tuple:
+    """
+    Find the merge pools (one per folder with recordings) under originals_root.
+    Returns (pools, durations_cache, processed_folders, skipped_folders); the
+    catalog, when given, serves directory listings and durations.
+    """
+    pools = {}
+    durations_cache = {}
+    # Track skipped and processed folders for summary
+    skipped_folders = []
+    processed_folders = []
+
+    scanner = FolderScanner(folder_whitelist, catalog)
+    for root, dirs, files, selected in scanner.walk(originals_root):
+        curr = Path(root)
+        jsons = [f for f in files if f.endswith(".json") and "click_zones" not in f.lower()]
+        jsons += packed_recording_names(root, files)
+        if not jsons: continue
+
+        # Check whitelist before processing
+        if not selected:
+            skipped_folders.append(curr.name)
+            continue
+
+        non_jsons = [f for f in files if not f.endswith(".json") and f != PACK_NAME]
         
-        while cur_ms < target_max:
-            # Try to get next file
-            if actual_force and self.ineff_pool: pick = self.ineff_pool.pop(0)
-            elif self.eff_pool: pick = self.eff_pool.pop(0)
-            elif self.efficient:
-                self.eff_pool = list(self.efficient); self.rng.shuffle(self.eff_pool)
-                pick = self.eff_pool.pop(0)
-            elif self.ineff_pool and not is_time_sensitive: pick = self.ineff_pool.pop(0)
-            else: break  # No more files
+        # Check for "dont mess with me" subfolder (listed once, reused when the walk reaches it)
+        dmwm_files = []
+        dmwm_path = curr / "dont mess with me"
+        dmwm_listing = scanner.peek(str(dmwm_path)) if "dont mess with me" in dirs else None
+        if dmwm_listing:
+            dmwm_files = [dmwm_path / f for f in dmwm_listing[1] if f.endswith(".json") and "click_zones" not in f.lower()]
+            dmwm_files += [dmwm_path / f for f in packed_recording_names(dmwm_path, dmwm_listing[1])]
+        if dmwm_files:
+            print(f"  ⚠️  Found 'dont mess with me' folder: {len(dmwm_files)} unmodified files (added to pool)")
+
+        processed_folders.append(curr.name)
+
+        
+        macro_id = clean_identity(curr.name)
+        rel_path = curr.relative_to(originals_root)
             
-            file_duration = self.durations.get(pick, 500)
+        parent_scope = None
+        for part in curr.parts:
+            if "desktop" in part.lower() or "mobile" in part.lower():
+                parent_scope = part
+                break
             
-            # File selector multiplier - CRITICAL for accuracy
-            # 1.0x = too many files (overshoot 11-18 min)
-            # 1.8x = too few files (undershoot 10-13 min)
-            # 1.35x = sweet spot (target ±2-4 min)
-            if is_time_sensitive:
-                estimated_time = file_duration * 1.05  # TIME SENSITIVE: minimal overhead
-            else:
-                estimated_time = file_duration * 1.35  # NORMAL: balanced estimate
+        key = str(rel_path).lower()
+        if key not in pools:
+            is_ts = bool(re.search(r'time[\s-]*sens', key))
+            file_paths = [curr / f for f in jsons]
             
-            # Check if adding would overshoot too much
-            potential_total = cur_ms + estimated_time
-            overshoot = potential_total - target_ms
+            # Separate DROP ONLY files from regular files (for Mining folders)
+            drop_only_files = find_drop_only_files(curr, file_paths)
             
-            if overshoot > margin:  # Would overshoot beyond acceptable margin
-                # Only skip if we're already reasonably close to target
-                if cur_ms >= (target_ms - (4 * 60000)):  # Within 4 min of target
-                    break  # Close enough, stop
-                else:
-                    # Still far from target, add it anyway
-                    seq.append(pick)
-                    cur_ms += estimated_time
-            else:
-                # Safe to add (won't overshoot by more than 4 min)
-                seq.append(pick)
-                cur_ms += estimated_time
+            # Remove DROP ONLY files from regular merge pool
+            if drop_only_files:
+                file_paths = [f for f in file_paths if f not in drop_only_files]
+                print(f"  Found {len(drop_only_files)} DROP ONLY file(s), excluded from regular pool")
             
-            # Safety limits
-            if len(seq) > 800: break
-            if cur_ms > target_ms * 3: break
-        
-        return seq
+            # Add "dont mess with me" files to regular pool
+            all_files = file_paths + dmwm_files
+            
+            pools[key] = {
+                "rel_path": rel_path,
+                "files": all_files,
+                "is_ts": is_ts,
+                "macro_id": macro_id,
+                "parent_scope": parent_scope,
+                "non_json_files": [curr / f for f in non_jsons],
+                "drop_only_files": drop_only_files,
+                "dmwm_files": set(dmwm_files)  # Track which files are unmodified
+            }
+                
+            for fp in file_paths:
+                durations_cache[fp] = catalog.duration_ms(fp) if catalog else get_file_duration_ms(fp)
+
+    for pool_key, pool_data in pools.items():
+        all_files = pool_data["files"]
+        always_files = [f for f in all_files if is_always_first_or_last_file(Path(f).name)]
+        mergeable_files = [f for f in all_files if f not in always_files]
+        pool_data["files"] = mergeable_files
+        pool_data["always_files"] = always_files
+    
+    return pools, durations_cache, processed_folders, skipped_folders
+
+
+def print_catalog_info(pools: dict, durations_cache: dict, skipped_folders: list):
+    """Print pool sizes and total recording durations (--catalog-info)."""
+    print("="*70)
+    print(f"CATALOG INFO ({len(pools)} pools)")
+    print("="*70)
+    total_files = 0
+    total_ms = 0
+    for key, data in pools.items():
+        pool_files = data["files"] + data["always_files"]
+        pool_ms = sum(durations_cache.get(f, 0) for f in pool_files)
+        total_files += len(pool_files)
+        total_ms += pool_ms
+        extras = []
+        if data["always_files"]:
+            extras.append(f"{len(data['always_files'])} always first/last")
+        if data["drop_only_files"]:
+            extras.append(f"{len(data['drop_only_files'])} DROP ONLY")
+        if data["dmwm_files"]:
+            extras.append(f"{len(data['dmwm_files'])} unmodified")
+        if data["is_ts"]:
+            extras.append("TIME SENSITIVE")
+        detail = f" ({', '.join(extras)})" if extras else ""
+        print(f"  {data['rel_path']}: {len(pool_files)} files, {format_ms_precise(pool_ms)}{detail}")
+    print("-"*70)
+    print(f"Total: {total_files} files, {format_ms_precise(total_ms)}")
+    if skipped_folders:
+        print(f"Skipped by whitelist: {len(skipped_folders)} folders")
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("input_root", type=str)
-    parser.add_argument("output_root", type=Path)
+    parser.add_argument("output_root", type=Path, nargs="?")
     parser.add_argument("--versions", type=int, default=6)
     parser.add_argument("--target-minutes", type=int, default=35)
-    parser.add_argument("--bundle-id", type=int, required=True)
+    parser.add_argument("--bundle-id", type=int)
     parser.add_argument("--speed-range", type=str, default="1.0 1.0")
     parser.add_argument("--no-chat", action="store_true", help="Disable chat inserts (default: enabled)")
     parser.add_argument("--use-whitelist", type=str, help="Path to whitelist file with specific folder names (one per line)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the parsed-event cache (always re-parse JSON)")
+    parser.add_argument("--compact-json", action="store_true", help="Write merged files without indentation and without null X/Y/Delta/KeyCode fields")
+    parser.add_argument("--workers", type=int, help="Generate versions in N worker processes (per-version seeds, same output for any N)")
+    parser.add_argument("--catalog-info", action="store_true", help="Print pool sizes and durations from the folder catalog, then exit (no merge)")
+    parser.add_argument("--incremental", action="store_true", help="When rerunning the same --bundle-id, reuse (hard-link) the earlier outputs of pools whose inputs did not change; other bundle ids are always generated from scratch (implies --workers 1 if not set)")
+    parser.add_argument("--profile", action="store_true", help="Write per-stage timing reports (!_PROFILE_*_!.json) next to the manifests")
+    parser.add_argument("--cprofile", action="store_true", help="With --profile, also dump a cProfile of the main process (!_PROFILE_!.prof)")
+    parser.add_argument("--archive", action="store_true", help="Write the bundle straight into output_root/merged_macros_<bundle-id>.zip instead of a folder")
+    parser.add_argument("--prefetch", type=int, default=2, help="Source files loaded ahead in background threads while merging (0 = off)")
+    parser.add_argument("--prefetch-mb", type=int, default=256, help="Max on-disk size of the files loaded ahead, and max memory kept by parsed recordings for reuse (MB)")
+    parser.add_argument("--path-engine", choices=["compat", "numpy"], default="compat", help="Human path generator: compat (per-call, reproduces earlier output) or numpy (batched per recording; optional dependency, pip install numpy, falls back to compat without it)")
+    parser.add_argument("--plan", type=Path, help="Only write the bundle plan (files per version, chat/DROP ONLY picks, multipliers, estimated durations) to this JSON file; no events are loaded (implies --workers 1 if not set)")
+    parser.add_argument("--from-plan", type=Path, help="Generate the bundle of a --plan file (same output as a --workers run with the plan's settings)")
     args = parser.parse_args()
+    if args.archive and args.incremental:
+        parser.error("--archive cannot be combined with --incremental (it reuses bundle folders, not ZIPs)")
+    if args.plan and (args.from_plan or args.incremental or args.archive or args.catalog_info):
+        parser.error("--plan cannot be combined with --from-plan, --incremental, --archive or --catalog-info")
+    plan = None
+    if args.from_plan:
+        try:
+            plan = read_bundle_plan(args.from_plan)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"cannot use plan {args.from_plan}: {e}")
+        # Generation settings come from the plan
+        args.bundle_id = plan["bundle_id"]
+        args.versions = plan["versions"]
+        args.target_minutes = plan["target_minutes"]
+        args.compact_json = plan["compact_json"]
+        args.path_engine = plan.get("path_engine", "compat")
+    run_started = time.perf_counter()
+    profiler = enable_profiling() if args.profile or args.cprofile else None
+    cprofiler = None
+    if args.cprofile:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+    if not args.catalog_info and ((args.output_root is None and not args.plan) or args.bundle_id is None):
+        parser.error("output_root and --bundle-id are required (unless --catalog-info, or --plan for output_root)")
+    if args.path_engine == "numpy" and not numpy_available():
+        print("⚠️  NumPy is not installed, using --path-engine compat")
+        args.path_engine = "compat"
+    if (args.incremental or args.plan or plan) and args.workers is None:
+        args.workers = 1  # Pools only have independent outputs in seeded mode
 
-    print("="*70)
-    print(f"MERGE MACROS {VERSION}")
-    print("="*70)
-    print(f"Bundle ID: {args.bundle_id}")
-    print(f"Target: {args.target_minutes} minutes per file")
-    print(f"Versions: {args.versions} normal")
-    print(f"Chat: {'DISABLED' if args.no_chat else 'ENABLED (50% chance)'}")
-    print("="*70)
+    if not args.catalog_info:
+        print("="*70)
+        print(f"MERGE MACROS {VERSION}")
+        print("="*70)
+        print(f"Bundle ID: {args.bundle_id}")
+        print(f"Target: {args.target_minutes} minutes per file")
+        print(f"Versions: {args.versions} normal")
+        print(f"Chat: {'DISABLED' if args.no_chat else 'ENABLED (50% chance)'}")
+        if args.workers is not None:
+            args.workers = max(1, args.workers)
+            print(f"Workers: {args.workers} (per-version seeds)")
+        print("="*70)
 
     search_base = Path(args.input_root).resolve()
     if not search_base.exists():
@@ -1165,6 +3983,28 @@ def main():
     if not originals_root:
         originals_root = search_base
     
+    # Parsed-event cache and folder catalog live next to originals/ (covers chat inserts too)
+    cache_root = originals_root.parent if originals_root != search_base else search_base
+    if plan:
+        changed = changed_plan_inputs(plan, cache_root)
+        if changed:
+            print(f"❌ {len(changed)} planned file(s) changed or missing since the plan was made:")
+            for name in changed[:10]:
+                print(f"   {name}")
+            print("   Make a new plan (--plan) to generate from the current library")
+            sys.exit(1)
+    configure_buffer_memo(args.prefetch_mb * 1024 * 1024)
+    event_cache = None
+    catalog = None
+    if not args.no_cache:
+        if not args.from_plan:  # Plans already hold the pools
+            catalog = FolderCatalog(cache_root / ".merge_cache" / "catalog.sqlite", cache_root)
+        if not args.catalog_info and not args.plan:
+            event_cache = configure_event_cache(cache_root / ".merge_cache", cache_root)
+            print(f"📦 Parsed-event cache: {event_cache.cache_dir}")
+    else:
+        print("📦 Parsed-event cache DISABLED (--no-cache flag)")
+    
     # Load folder whitelist (only if --use-whitelist provided with file path)
     folder_whitelist = None
     if args.use_whitelist:
@@ -1176,11 +4016,21 @@ def main():
         print("📋 Whitelist is DISABLED (--use-whitelist flag not set)")
         print("   Processing ALL folders")
     
+    if args.catalog_info:
+        pools, durations_cache, _, skipped_folders = discover_pools(originals_root, folder_whitelist, catalog)
+        if catalog:
+            catalog.close()
+        print_catalog_info(pools, durations_cache, skipped_folders)
+        return
+    
     logout_file = None
     logout_patterns = ["logout.json", "- logout.json", "-logout.json", "logout", "- logout", "-logout"]
+    if plan and plan["logout_file"]:
+        logout_file = cache_root / plan["logout_file"]
+        print(f"✓ Logout file from plan: {logout_file}")
     
     for location_dir in [originals_root, originals_root.parent, search_base]:
-        if logout_file:
+        if logout_file or plan:
             break
         for pattern in logout_patterns:
             test_file = location_dir / pattern
@@ -1192,18 +4042,25 @@ def main():
             if logout_file:
                 break
 
-    bundle_dir = args.output_root / f"merged_bundle_{args.bundle_id}"
-    bundle_dir.mkdir(parents=True, exist_ok=True)
+    bundle_dir = (args.output_root or Path(".")) / f"merged_bundle_{args.bundle_id}"
+    if not args.plan:
+        bundle_dir.mkdir(parents=True, exist_ok=True)
+    archive = None
+    if args.archive:
+        archive = configure_bundle_archive(args.output_root / f"merged_macros_{args.bundle_id}.zip", bundle_dir)
+        print(f"🗜️  Writing bundle into archive: {archive.zip_path}")
     rng = random.Random(args.bundle_id * 42)  # Seed with bundle ID for reproducibility
-    pools = {}
-    durations_cache = {}
     
     # Load chat insert files from 'chat inserts' folder (unless --no-chat is set)
     chat_files = []
-    if not args.no_chat:
+    if plan:
+        chat_files = [cache_root / name for name in plan["chat_files"]]
+        print(f"✓ {len(chat_files)} chat insert files from plan")
+    elif not args.no_chat:
         chat_dir = Path(args.input_root).parent / "chat inserts"
         if chat_dir.exists() and chat_dir.is_dir():
             chat_files = list(chat_dir.glob("*.json"))
+            chat_files += [chat_dir / name for name in packed_recording_names(chat_dir, os.listdir(chat_dir))]
             if chat_files:
                 print(f"✓ Found {len(chat_files)} chat insert files in: {chat_dir}")
             else:
@@ -1213,111 +4070,83 @@ def main():
     else:
         print(f"🔕 Chat inserts DISABLED (--no-chat flag)")
 
-    # Track skipped and processed folders for summary
-    skipped_folders = []
-    processed_folders = []
-
-
-    for root, dirs, files in os.walk(originals_root):
-        curr = Path(root)
-        if any(p in curr.parts for p in [".git", ".github", "output"]): continue
-        
-        jsons = [f for f in files if f.endswith(".json") and "click_zones" not in f.lower()]
-        non_jsons = [f for f in files if not f.endswith(".json")]
-        
-        # Check for "dont mess with me" subfolder
-        dmwm_files = []
-        dmwm_path = curr / "dont mess with me"
-        if dmwm_path.exists() and dmwm_path.is_dir():
-            dmwm_jsons = [f for f in dmwm_path.glob("*.json") if "click_zones" not in f.name.lower()]
-            if dmwm_jsons:
-                dmwm_files = list(dmwm_jsons)
-                print(f"  ⚠️  Found 'dont mess with me' folder: {len(dmwm_files)} unmodified files (added to pool)")
+    if plan:
+        # Pools, durations and chat order as planned (no discovery, optional folders decided)
+        pools, durations_cache = pools_from_plan(plan, cache_root)
+        global_chat_queue = [cache_root / name for name in plan["chat_order"]]
+        print(f"📝 Generating from plan: {args.from_plan} ({len(pools)} pools)")
+    else:
+        pools, durations_cache, processed_folders, skipped_folders = discover_pools(
+            originals_root, folder_whitelist, catalog)
+        if catalog:
+            catalog.close()
+            print(f"🗂️  Folder catalog: {catalog.dirs_reused} folders reused, {catalog.dirs_scanned} re-scanned")
         
-        if not jsons: continue
-
-        # Check whitelist before processing
-        if not should_process_folder(curr, originals_root, folder_whitelist):
-            skipped_folders.append(curr.name)
-            continue
-
-        processed_folders.append(curr.name)
-
+        # GLOBAL chat queue - persists across ALL folders and versions in this batch
+        # Ensures each merged file gets unique chat before any repeats
+        global_chat_queue = list(chat_files) if chat_files else []
+        if global_chat_queue:
+            rng.shuffle(global_chat_queue)
+            print(f"🔄 Initialized global chat queue with {len(global_chat_queue)} files (shuffled)")
         
-        macro_id = clean_identity(curr.name)
-        rel_path = curr.relative_to(originals_root)
-            
-        parent_scope = None
-        for part in curr.parts:
-            if "desktop" in part.lower() or "mobile" in part.lower():
-                parent_scope = part
-                break
-            
-        key = str(rel_path).lower()
-        if key not in pools:
-            is_ts = bool(re.search(r'time[\s-]*sens', key))
-            file_paths = [curr / f for f in jsons]
+        # NEW FEATURE 3: Detect optional folders and assign random inclusion chance
+        for key, data in pools.items():
+            folder_name = data["rel_path"].name
+            folder_number = extract_folder_number(folder_name)
             
-            # Separate DROP ONLY files from regular files (for Mining folders)
-            drop_only_files = find_drop_only_files(curr, file_paths)
+            if folder_number == 0:
+                print(f"WARNING: No number found in folder name '{folder_name}', using 0")
             
-            # Remove DROP ONLY files from regular merge pool
-            if drop_only_files:
-                file_paths = [f for f in file_paths if f not in drop_only_files]
-                print(f"  Found {len(drop_only_files)} DROP ONLY file(s), excluded from regular pool")
+            data["folder_number"] = folder_number
             
-            # Add "dont mess with me" files to regular pool
-            all_files = file_paths + dmwm_files
+            # Detect optional folders
+            is_optional, optional_chance = detect_optional_folders(folder_name, rng)
+            data["is_optional"] = is_optional
+            data["optional_chance"] = optional_chance
             
-            pools[key] = {
-                "rel_path": rel_path,
-                "files": all_files,
-                "is_ts": is_ts,
-                "macro_id": macro_id,
-                "parent_scope": parent_scope,
-                "non_json_files": [curr / f for f in non_jsons],
-                "drop_only_files": drop_only_files,
-                "dmwm_files": set(dmwm_files)  # Track which files are unmodified
-            }
-                
-            for fp in file_paths:
-                durations_cache[fp] = get_file_duration_ms(fp)
-
-    for pool_key, pool_data in pools.items():
-        all_files = pool_data["files"]
-        always_files = [f for f in all_files if is_always_first_or_last_file(Path(f).name)]
-        mergeable_files = [f for f in all_files if f not in always_files]
-        pool_data["files"] = mergeable_files
-        pool_data["always_files"] = always_files
-    
-    # GLOBAL chat queue - persists across ALL folders and versions in this batch
-    # Ensures each merged file gets unique chat before any repeats
-    global_chat_queue = list(chat_files) if chat_files else []
-    if global_chat_queue:
-        rng.shuffle(global_chat_queue)
-        print(f"🔄 Initialized global chat queue with {len(global_chat_queue)} files (shuffled)")
-    
-    # NEW FEATURE 3: Detect optional folders and assign random inclusion chance
-    for key, data in pools.items():
-        folder_name = data["rel_path"].name
-        folder_number = extract_folder_number(folder_name)
-        
-        if folder_number == 0:
-            print(f"WARNING: No number found in folder name '{folder_name}', using 0")
-        
-        data["folder_number"] = folder_number
-        
-        # Detect optional folders
-        is_optional, optional_chance = detect_optional_folders(folder_name, rng)
-        data["is_optional"] = is_optional
-        data["optional_chance"] = optional_chance
-        
-        if is_optional:
-            print(f"  🎲 Optional folder: {folder_name} ({int(optional_chance * 100)}% chance)")
+            if is_optional:
+                print(f"  🎲 Optional folder: {folder_name} ({int(optional_chance * 100)}% chance)")
     
     # NEW FEATURE 1: Track combinations at bundle level
     bundle_combinations = {}
     
+    settings = {
+        "bundle_id": args.bundle_id,
+        "versions": args.versions,
+        "target_minutes": args.target_minutes,
+        "bundle_dir": bundle_dir,
+        "originals_root": originals_root,
+        "logout_file": logout_file,
+        "durations_cache": durations_cache,
+        "chat_files": chat_files,
+        "chat_order": list(global_chat_queue),
+        "compact_json": args.compact_json,
+        "prefetch": (max(0, args.prefetch), max(0, args.prefetch_mb) * 1024 * 1024),
+        "path_engine": args.path_engine,
+    }
+    
+    def store_pool_result(result):
+        save_bundle_text(result["manifest_path"], result["manifest"])
+        # NEW FEATURE 1: Store combinations for this folder
+        if result["combinations"]:
+            bundle_combinations[result["folder_name"]] = result["combinations"]
+    
+    seeded_pools = []
+    version_jobs = []
+    chat_slot = 0
+    
+    pool_plans = []
+    
+    # NEW FEATURE 1: Combination history of all folders, loaded once
+    history = None
+    if not args.plan:
+        history = CombinationHistory(originals_root.parent if originals_root.parent.exists() else originals_root)
+    
+    incremental = None
+    file_digests = {}
+    if args.incremental:
+        incremental = IncrementalStore(cache_root / ".merge_cache" / "incremental.json")
+    
     for key, data in pools.items():
         # NEW FEATURE 3: Check if optional folder should be skipped
         if data.get("is_optional", False):
@@ -1326,469 +4155,80 @@ def main():
                 print(f"  ⏭️  Skipping optional folder: {data['rel_path'].name}")
                 continue
         
-        folder_number = data["folder_number"]
-        
         if not data["files"]:
             print(f"Skipping folder (0 files): {data['rel_path']}")
             continue
         
-        original_rel_path = data["rel_path"]
-        
-        # Remove D_ or d_ from folder name
-        cleaned_folder_name = re.sub(r'[Dd]_', '', original_rel_path.name)
-        cleaned_rel_path = original_rel_path.parent / cleaned_folder_name
-        out_f = bundle_dir / cleaned_rel_path
-        out_f.mkdir(parents=True, exist_ok=True)
-        
-        # NEW FEATURE 1: Initialize combination history tracker
-        input_root = originals_root.parent if originals_root.parent.exists() else originals_root
-        tracker = ManualHistoryTracker(
-            data["files"],
-            rng,
-            cleaned_folder_name,
-            input_root
-        )
-        
-        if logout_file:
-            try:
-                original_name = logout_file.name
-                # Simple @ prefix with UPPERCASE, no folder number: "logout.json" → "@ LOGOUT.JSON"
-                if original_name.startswith("-"):
-                    # Has dash: "- logout.json" → "@ LOGOUT.JSON"
-                    new_name = "@ " + original_name[1:].strip().upper()
-                else:
-                    # Add @ prefix: "logout.json" → "@ LOGOUT.JSON"
-                    new_name = "@ " + original_name.upper()
-                logout_dest = out_f / new_name
-                shutil.copy2(logout_file, logout_dest)
-                print(f"  ✓ Copied logout: {original_name} → {new_name}")
-            except Exception as e:
-                print(f"  ✗ Error copying {logout_file.name}: {e}")
+        if args.workers is None:
+            # Sequential mode: one RNG stream and chat queue shared by all pools
+            store_pool_result(process_pool(key, data, settings, rng, global_chat_queue, history))
         else:
-            print(f"  ⚠  Warning: No logout file found")
-        
-        if "non_json_files" in data and data["non_json_files"]:
-            for non_json_file in data["non_json_files"]:
-                try:
-                    original_name = non_json_file.name
-                    # Keep @ prefix if present
-                    if original_name.startswith("-"):
-                        new_name = f"@ {folder_number} {original_name[1:].strip()}"
-                    else:
-                        new_name = f"@ {folder_number} {original_name}"
-                    shutil.copy2(non_json_file, out_f / new_name)
-                    print(f"  ✓ Copied non-JSON file: {original_name} → {new_name}")
-                except Exception as e:
-                    print(f"  ✗ Error copying {non_json_file.name}: {e}")
-        
-        if "always_files" in data and data["always_files"]:
-            for always_file in data["always_files"]:
-                try:
-                    original_name = Path(always_file).name
-                    # Add folder number prefix
-                    if original_name.startswith("-"):
-                        new_name = f"@ {folder_number} {original_name[1:].strip()}"
-                    else:
-                        new_name = f"@ {folder_number} {original_name}"
-                    shutil.copy2(always_file, out_f / new_name)
-                    print(f"  ✓ Copied 'always' file: {original_name} → {new_name}")
-                except Exception as e:
-                    print(f"  ✗ Error copying {Path(always_file).name}: {e}")
-        
-        total_original_ms = sum(durations_cache.get(f, 0) for f in data["files"])
-        
-        manifest = [
-            f"MANIFEST FOR FOLDER: {original_rel_path}",
-            "=" * 40,
-            f"Script Version: {VERSION}",
-            f"Merged Bundle: merged_bundle_{args.bundle_id}",
-            f"Total Original Files: {len(data['files'])}",
-            f"Total Original Files Duration: {format_ms_precise(total_original_ms)}",
-            " "
-        ]
-        
-        norm_v = args.versions
-        is_ts  = data["is_ts"]
-
-        # Regular folder:  norm_v normal  +  norm_v//2 inef  +  3 raw
-        # TS folder:        norm_v TS      +  0 inef          +  3 raw
-        inef_v  = 0 if is_ts else (norm_v // 2)
-        raw_v   = 3   # always 3 raw (^ tag) for every folder type
-        total_v = norm_v + inef_v + raw_v
-
-        # NEW NAMING SCHEME: Raw gets A,B,C first, then Inefficient, then Normal
-        
-        for v_idx in range(1, total_v + 1):
-            # Determine file type based on NEW ordering
-            if v_idx <= raw_v:
-                is_raw = True
-                is_inef = False
-                is_ts_version = False
-            elif v_idx <= raw_v + inef_v:
-                is_raw = False
-                is_inef = True
-                is_ts_version = False
-            else:
-                is_raw = False
-                is_inef = False
-                is_ts_version = is_ts  # Only normal files can be TS
-            
-            v_letter = chr(64 + v_idx)
-            v_code = f"{folder_number}_{v_letter}"
-
-            if is_ts_version: mult = rng.choice([1.0, 1.2, 1.5])
-            elif is_inef:     mult = rng.choices([2, 3], weights=[50, 50], k=1)[0]
-            elif is_raw:      mult = rng.choices([1, 2, 3], weights=[50, 30, 20], k=1)[0]
-            else:             mult = rng.choices([1, 2], weights=[62.5, 37.5], k=1)[0]
-
-            movement_percentage = rng.uniform(0.40, 0.50)
-            jitter_percentage = 0.0  # Will be set per file
-            
-            total_idle_movements = 0
-            total_intra_pauses = 0
-            total_normal_pauses = 0
-            total_inter_pauses = 0
-            total_afk_pool = 0
-            total_jitter_count = 0
-            total_clicks = 0
-            file_segments = []
-            massive_pause_info = None
-            merged = []
-            timeline = 0
-            
-            paths = QueueFileSelector(rng, data["files"], durations_cache).get_sequence(args.target_minutes, is_inef, is_ts_version)
-            
-            if not paths:
+            # Seeded mode: every version of every pool is an independent job
+            # with its own RNG stream and chat queue slot (max 1 chat per version)
+            if args.plan:
+                pool_plans.append(plan_pool(key, data, settings, chat_slot, cache_root))
+                chat_slot += sum(version_counts(settings["versions"], data["is_ts"]))
                 continue
-
-            # NEW FEATURE 1: Track this combination
-            paths = tracker.get_unique_sequence(paths)
-
-            # DROP ONLY insertion for Mining folders (1 file in middle)
-            drop_only_file = None
-            if "drop_only_files" in data and data["drop_only_files"]:
-                # Select ONE random DROP file
-                drop_only_file = rng.choice(data["drop_only_files"])
-                print(f"  ℹ️  Mining folder: Will insert DROP ONLY file: {drop_only_file.name}")
-
-            # Chat - only 1 per merged file, using global queue
-            chat_used = False
-            # Insert chat in only 50% of merged files
-            should_insert_chat = rng.random() < 0.50
-            chat_insertion_point = rng.randint(1, max(1, len(paths)-1)) if len(paths) > 1 and should_insert_chat else -1
-            file_segments = []
-            
-            # Get dmwm file set for this folder
-            dmwm_file_set = data.get("dmwm_files", set())
-            
-            for i, p in enumerate(paths):
-                raw = load_json_events(p)
-                if not raw: continue
-                
-                # Filter problematic keys
-                raw = filter_problematic_keys(raw)
-                if not raw: continue
-                
-                # Check if this file is from "dont mess with me" folder
-                is_dmwm_file = p in dmwm_file_set
-                
-                # is_time_sensitive = True only for explicitly TS versions (not normal versions in TS folders)
-                is_time_sensitive = is_ts_version
-                
-                # INSERT CHAT ONCE (before the chosen file index)
-                if not chat_used and i == chat_insertion_point and global_chat_queue:
-                    try:
-                        chat_file = global_chat_queue.pop(0)  # Take from front
-                        chat_events = load_json_events(chat_file)
-                        if chat_events:
-                            chat_events = filter_problematic_keys(chat_events)
-                            if chat_events:
-                                # Normalize to current timeline
-                                chat_start = min(e.get('Time', 0) for e in chat_events)
-                                chat_file_start_idx = len(merged)
-                                for e in chat_events:
-                                    e['Time'] = e['Time'] - chat_start + timeline
-                                    merged.append(e)
-                                
-                                timeline = merged[-1]["Time"] if merged else timeline
-                                file_segments.append({
-                                    "name": chat_file.name,
-                                    "end_time": timeline,
-                                    "start_idx": chat_file_start_idx,
-                                    "end_idx": len(merged) - 1,
-                                    "is_chat": True
-                                })
-                                chat_used = True
-                                
-                                # Put used file at END of queue (ensures all files used before repeat)
-                                global_chat_queue.append(chat_file)
-                                
-                                # If queue is empty, refill and shuffle
-                                if not global_chat_queue and chat_files:
-                                    global_chat_queue = list(chat_files)
-                                    rng.shuffle(global_chat_queue)
-                    except Exception as e:
-                        print(f"  ⚠️ Error loading chat {chat_file.name}: {e}")
-                        global_chat_queue.append(chat_file)  # Return to queue
-                
-                # Step 1: Add pre-move jitter (skip for dmwm files)
-                if not is_dmwm_file:
-                    raw_with_jitter, jitter_count, click_count, jitter_pct = add_pre_click_jitter(raw, rng)
-                    total_jitter_count += jitter_count
-                    total_clicks += click_count
-                    jitter_percentage = jitter_pct
-                else:
-                    raw_with_jitter = raw
-                
-                # Step 2: Insert random intra-file pauses between actions
-                # TIME SENSITIVE and RAW: Skip (adds time)
-                # Detect rapid click sequences to protect them
-                protected_ranges = detect_rapid_click_sequences(raw_with_jitter)
-                if not is_time_sensitive and not is_raw:
-                    raw_with_pauses, intra_pause_time = insert_intra_file_pauses(raw_with_jitter, rng, protected_ranges)
-                    total_intra_pauses += intra_pause_time
-                else:
-                    raw_with_pauses = raw_with_jitter
-                
-                # Step 3: Insert idle mouse movements in gaps >= 5 seconds
-                raw_with_movements, idle_time = insert_idle_mouse_movements(raw_with_pauses, rng, movement_percentage)
-                total_idle_movements += idle_time
-                
-                
-                t_vals = [int(e["Time"]) for e in raw_with_movements]
-                base_t = min(t_vals)
-                
-                # OPTIMIZED 4-PHASE CURSOR TRANSITION (from string_macros)
-                if i > 0:
-                    # Phase 1: Pre-file pause (click release protection)
-                    # Ensures any clicks from previous file are fully released
-                    pre_file_pause = int(rng.uniform(800.0, 1500.0) * mult)
-                    timeline += pre_file_pause
-                    
-                    # Phase 2: Post-pause delay (preparation time)
-                    # Simulates player preparing for next action
-                    post_pause_delay = int(rng.uniform(500.0, 1000.0) * mult)
-                    timeline += post_pause_delay
-                    
-                    # Get cursor positions
-                    last_cursor_event = None
-                    for e in reversed(merged):
-                        if e.get('X') is not None and e.get('Y') is not None:
-                            last_cursor_event = e
-                            break
-                    
-                    first_cursor_event = None
-                    for e in raw_with_movements:
-                        if e.get('X') is not None and e.get('Y') is not None:
-                            first_cursor_event = e
-                            break
-                    
-                    # Phase 3: Fast cursor transition (200-400ms dedicated movement)
-                    if last_cursor_event and first_cursor_event:
-                        last_x, last_y = int(last_cursor_event['X']), int(last_cursor_event['Y'])
-                        first_x, first_y = int(first_cursor_event['X']), int(first_cursor_event['Y'])
-                        
-                        # Only transition if positions differ
-                        if (last_x != first_x) or (last_y != first_y):
-                            # Fast dedicated transition (more realistic than slow gradual)
-                            transition_duration = int(rng.uniform(200, 400))
-                            
-                            transition_path = generate_human_path(
-                                last_x, last_y,
-                                first_x, first_y,
-                                transition_duration,
-                                rng
-                            )
-                            
-                            # Add transition movements
-                            for rel_time, x, y in transition_path:
-                                merged.append({
-                                    'Type': 'MouseMove',
-                                    'Time': timeline + rel_time,
-                                    'X': x,
-                                    'Y': y
-                                })
-                            
-                            timeline += transition_duration
-                            
-                            # Phase 4: Explicit final position (guarantees accuracy)
-                            merged.append({
-                                'Type': 'MouseMove',
-                                'Time': timeline,
-                                'X': first_x,
-                                'Y': first_y
-                            })
-                    
-                    # Update total inter-pause tracking
-                    gap = pre_file_pause + post_pause_delay
-                else:
-                    gap = 0
-                    
-                timeline += gap
-                total_inter_pauses += gap
-                
-                file_start_idx = len(merged)  # Track where this file starts in merged array
-                
-                for e in raw_with_movements:
-                    ne = {**e}
-                    rel_offset = e["Time"] - base_t  # No rounding!
-                    ne["Time"] = timeline + rel_offset
-                    merged.append(ne)
-                
-                timeline = merged[-1]["Time"]
-                file_end_idx = len(merged) - 1
-                # Mark dmwm files in manifest
-                file_name = f"[UNMODIFIED] {p.name}" if is_dmwm_file else p.name
-                file_segments.append({
-                    "name": file_name, 
-                    "end_time": timeline,
-                    "start_idx": file_start_idx,
-                    "end_idx": file_end_idx,
-                    "is_chat": False
-                })
-
-            # INSERT DROP ONLY file in middle (Mining folders only)
-            if drop_only_file and merged and len(merged) > 10:
-                drop_events = load_json_events(drop_only_file)
-                if drop_events:
-                    drop_events = filter_problematic_keys(drop_events)
-                    if drop_events:
-                        # Random insertion point (25-75% through file)
-                        drop_start_idx = int(len(merged) * 0.25)
-                        drop_end_idx = int(len(merged) * 0.75)
-                        drop_insertion_point = rng.randint(drop_start_idx, drop_end_idx)
-                        
-                        drop_base_time = merged[drop_insertion_point].get("Time", 0)
-                        drop_start_time = min(e.get("Time", 0) for e in drop_events)
-                        normalized_drop = []
-                        for e in drop_events:
-                            ne = {**e}
-                            ne["Time"] = e["Time"] - drop_start_time + drop_base_time
-                            normalized_drop.append(ne)
-                        
-                        drop_duration = max(e.get("Time", 0) for e in normalized_drop) - drop_base_time
-                        
-                        # Shift all events AFTER insertion point by drop duration
-                        for j in range(drop_insertion_point, len(merged)):
-                            merged[j]["Time"] += drop_duration
-                        
-                        # Insert DROP events at the insertion point
-                        for idx, drop_event in enumerate(normalized_drop):
-                            merged.insert(drop_insertion_point + idx, drop_event)
-                        
-                        timeline = merged[-1]["Time"]
-                        
-                        file_segments.append({
-                            "name": f"[DROP ONLY] {drop_only_file.name}",
-                            "end_time": drop_base_time + drop_duration,
-                            "start_idx": drop_insertion_point,
-                            "end_idx": drop_insertion_point + len(normalized_drop) - 1,
-                            "is_chat": False
-                        })
-                        
-                        print(f"    ✓ Inserted DROP ONLY at {format_ms_precise(drop_base_time)}")
-
-            total_afk_pool = total_idle_movements
-            chat_inserted = chat_used  # Track if chat was used
-            
-            if is_inef and not data["is_ts"] and len(merged) > 1:
-                # Massive pause: 4-9 minutes (240000-540000ms)
-                p_ms = rng.randint(240000, 540000)
-                split = rng.randint(0, len(merged) - 2)
-                for j in range(split + 1, len(merged)): merged[j]["Time"] += p_ms
-                timeline = merged[-1]["Time"]
-                massive_pause_info = f"Massive P1: {format_ms_precise(p_ms)}"
-                
-                for seg in file_segments:
-                    if seg["end_idx"] > split:
-                        seg["end_time"] = merged[seg["end_idx"]]["Time"]
-            
-            # Calculate exact time for filename
-            total_minutes = int(timeline / 60000)
-            total_seconds = int((timeline % 60000) / 1000)
-            
-            # File prefix: ¬¬ = inefficient, ^ = raw, blank = normal/TS
-            if is_raw:        prefix = "^"
-            elif is_inef:     prefix = "¬¬"
-            else:             prefix = ""
-            
-            fname = f"{prefix}{v_code}_{total_minutes}m{total_seconds}s.json"
-            (out_f / fname).write_text(json.dumps(merged, indent=2))
-            
-            # Calculate pause time (idle movements are informational only)
-            total_pause = total_intra_pauses + total_inter_pauses + total_normal_pauses
-            
-            # Determine file type
-            if is_ts_version:
-                file_type = "Time sensitive"
-            elif is_inef:
-                file_type = "Inefficient"
-            elif is_raw:
-                file_type = "Raw"
-            else:
-                file_type = "Normal"
-            
-            # Calculate pause times
-            # Only inter-file pauses get multiplied!
-            original_intra = total_intra_pauses  # Not multiplied
-            original_inter = int(total_inter_pauses / mult) if mult > 0 else total_inter_pauses
-            original_normal = total_normal_pauses
-            original_total = original_intra + original_inter + original_normal
-            
-            # Calculate total time in minutes and seconds
-            total_min = int(timeline / 60000)
-            total_sec = int((timeline % 60000) / 1000)
-            
-            # Version label with duration and separator
-            version_label = f"Version {prefix}{v_code}_{total_min}m{total_sec}s:"
-            separator = "=" * 40
-            
-            if is_raw:
-                # Raw files: minimal manifest (only inter-file pauses, no anti-detection)
-                manifest_entry = [
-                    separator,
-                    " ",
-                    version_label,
-                    f"FILE TYPE: Raw (no time-adding features, no chat)",
-                    f"  Between files pause: {format_ms_precise(total_inter_pauses)} (x{mult} Multiplier)",
-                ]
-            else:
-                manifest_entry = [
-                    separator,
-                    " ",
-                    version_label,
-                    f"FILE TYPE: {file_type}",
-                    f"  Total PAUSE ADDED: {format_ms_precise(total_pause)} (x{mult} Multiplier)",
-                    f"BREAKDOWN",
-                    f"total before    - Within original files pauses: {format_ms_precise(original_intra)}",
-                    f"multiplier      - Between original files pauses: {format_ms_precise(original_inter)}",
-                    f"                - Normal file pause: {format_ms_precise(original_normal)}",
-                ]
-            
-            # Idle and jitter: all types (raw included, since they don't add time)
-            manifest_entry.extend([
-                f"Idle Mouse Movements: {format_ms_precise(total_idle_movements)}",
-                f"Mouse Jitter: {int(jitter_percentage * 100)}%"
-            ])
-            
-            # Add files list with chat highlighting
-            # Sort file segments by end_time for chronological order
-            file_segments.sort(key=lambda x: x["end_time"])
-            
-            manifest_entry.append("")
-            for seg in file_segments:
-                if seg.get("is_chat", False):
-                    manifest_entry.append(f"  ****** {seg['name']} (Ends at {format_ms_precise(seg['end_time'])})")
+            fingerprint = None
+            if incremental:
+                fingerprint = pool_fingerprint(key, data, settings, chat_slot, file_digests)
+                out_f = pool_output_dir(data, settings)[1]
+                record = incremental.reuse(fingerprint, bundle_dir, out_f)
+                if record:
+                    print(f"  ♻️  Unchanged, reused previous outputs: {data['rel_path']}")
+                    if record["combinations"]:
+                        bundle_combinations[record["folder_name"]] = record["combinations"]
+                    chat_slot += sum(version_counts(settings["versions"], data["is_ts"]))
+                    continue
+                incremental.release(out_f)
+            pool = prepare_pool(key, data, settings, rng, history)
+            pool["fingerprint"] = fingerprint
+            seeded_pools.append(pool)
+            job_pool = {k: v for k, v in pool.items() if k not in ("tracker", "manifest")}
+            for v_idx in range(1, pool["total_v"] + 1):
+                version_jobs.append((data, settings, job_pool, v_idx, chat_slot))
+                chat_slot += 1
+    
+    if args.plan:
+        write_bundle_plan(args.plan, settings, pool_plans, cache_root)
+        planned = sum(1 for entry in pool_plans for version in entry["versions"] if version)
+        print(f"\n📝 Plan written: {args.plan} ({len(pool_plans)} pools, {planned} versions, no events loaded)")
+        return
+    
+    if version_jobs:
+        # With several workers, version files are written by the worker processes
+        # (and moved into the --archive below)
+        staged = args.workers > 1 and len(version_jobs) > 1
+        if staged:
+            cache_args = (event_cache.cache_dir, event_cache.root) if event_cache else (None, None)
+            print(f"\n⚙️  Generating {len(version_jobs)} versions with {args.workers} workers")
+            with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_pool_worker,
+                                     initargs=cache_args + (profiler is not None, _buffer_memo.max_bytes)) as executor:
+                if profiler:
+                    results = []
+                    for result, records in executor.map(run_profiled_version, version_jobs):
+                        profiler.absorb(records)
+                        results.append(result)
                 else:
-                    manifest_entry.append(f"  * {seg['name']} (Ends at {format_ms_precise(seg['end_time'])})")
-            
-            manifest.append("\n".join(manifest_entry))
-
-        (out_f / f"!_MANIFEST_{folder_number}_!.txt").write_text("\n".join(manifest))
+                    results = list(executor.map(run_seeded_version, version_jobs))
+        else:
+            results = [run_seeded_version(job) for job in version_jobs]
         
-        # NEW FEATURE 1: Store combinations for this folder
-        if tracker.current_run_combinations:
-            bundle_combinations[cleaned_folder_name] = tracker.current_run_combinations
+        # Results come back in job order: pool by pool, version by version
+        pools_by_key = {pool["key"]: pool for pool in seeded_pools}
+        for job, result in zip(version_jobs, results):
+            record_version(pools_by_key[job[2]["key"]], result)
+            if archive and staged and result is not None:
+                archive.move_in(result["output_path"])
+        for pool in seeded_pools:
+            result = finish_pool(pool)
+            store_pool_result(result)
+            if incremental:
+                incremental.remember(pool["fingerprint"], bundle_dir, pool["out_f"], result)
+    
+    if incremental:
+        incremental.save()
+        print(f"\n♻️  Incremental: {incremental.reused} pools reused, {len(seeded_pools)} generated")
     
     # NEW FEATURE 1: Write combination history file at bundle level
     if bundle_combinations:
@@ -1809,6 +4249,28 @@ def main():
             print(f"   Total combinations: {total_combos} across {len(bundle_combinations)} folders")
         except Exception as e:
             print(f"\n❌ ERROR writing combination file: {e}")
+        
+        try:
+            history.append(bundle_combinations)
+        except Exception as e:
+            print(f"\n❌ ERROR updating combination history: {e}")
+    
+    if event_cache:
+        print(f"\n📦 Event cache: {event_cache.hits} reused, {event_cache.parsed} parsed")
+    
+    if profiler:
+        summary_path = profiler.write_reports(bundle_dir, args.bundle_id, time.perf_counter() - run_started)
+        print(f"\n⏱️  Profile report: {summary_path}")
+        if cprofiler:
+            cprofiler.disable()
+            cprofiler.dump_stats(str(bundle_dir / "!_PROFILE_!.prof"))
+            if archive:
+                archive.move_in(bundle_dir / "!_PROFILE_!.prof")
+            print(f"⏱️  cProfile dump: {bundle_dir / '!_PROFILE_!.prof'}")
+    
+    if archive:
+        archive.close()
+        print(f"\n🗜️  Archive written: {archive.zip_path} ({archive.zip_path.stat().st_size / 1e6:.1f} MB)")
     
     print("\n" + "="*70)
     print("MERGE COMPLETE!")
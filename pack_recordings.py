@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+pack_recordings.py - store recording folders as compressed columnar packs
+
+Packs the JSON recordings of every folder under ROOT into one
+recordings.mpack file per folder (see merge_macros.write_recording_pack).
+merge_macros.py reads packed recordings straight from the memory-mapped
+pack, so with --remove-json a folder is stored once, in the packed form.
+Every pack is read back and compared with the parsed JSON files. A JSON
+file is only removed once the pack rebuilds it byte for byte (same digest
+as the file on disk). The library root itself (logout file etc.) is left as is.
+
+Example:
+    python3 pack_recordings.py . --remove-json
+"""
+import argparse, hashlib, os, sys
+from pathlib import Path
+
+from merge_macros import (EventBuffer, FolderScanner, PACK_NAME, RecordingPack, events_json_text,
+                          forget_recording_pack, get_file_duration_ms, packed_recording, parse_json_events,
+                          recording_pack, write_recording_pack)
+
+
+def digest_of(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def removable(pack: RecordingPack, path: Path) -> bool:
+    """True if the read-back pack rebuilds the JSON file on disk exactly."""
+    entry = pack.entry(path.name)
+    rebuilt = pack.json_bytes(path.name) if entry else None
+    if rebuilt is None:
+        return False
+    try:
+        on_disk = digest_of(path.read_bytes())
+    except OSError:
+        return False
+    return entry["digest"] == on_disk == digest_of(rebuilt)
+
+
+def rebuild_newline(events: EventBuffer, raw: bytes):
+    """Newline with which events_json_text() gives back raw exactly, or None."""
+    text = events_json_text(events)
+    for newline in ("\r\n", "\n"):
+        if text.replace("\n", newline).encode("utf-8") == raw:
+            return newline
+    return None
+
+
+def pack_folder(folder: Path, names: list, args) -> tuple:
+    """Pack one folder; returns (json bytes, pack bytes) or None when skipped."""
+    old_pack = recording_pack(folder)
+    if old_pack and not args.force and all(packed_recording(folder / n)[1] for n in names):
+        print(f"  ✓ Up to date: {folder}")
+        return None
+
+    recordings, parsed, json_bytes = [], {}, 0
+    for name in names:
+        path = folder / name
+        raw = path.read_bytes()
+        st = path.stat()
+        try:  # Same parse as merge_macros.load_event_buffer()
+            events = EventBuffer.from_dicts(parse_json_events(raw.decode("utf-8")))
+        except UnicodeDecodeError:
+            events = EventBuffer()
+        parsed[name] = events
+        json_bytes += len(raw)
+        recordings.append((name, events, {
+            "source_size": st.st_size,
+            "source_mtime_ns": st.st_mtime_ns,
+            "digest": digest_of(raw),
+            "duration_ms": get_file_duration_ms(path),
+            "newline": rebuild_newline(events, raw),
+        }))
+    if old_pack:
+        # Keep recordings that only live in the old pack (JSON already removed)
+        for name in old_pack.names():
+            if name not in parsed and not (folder / name).exists():
+                entry = old_pack.entry(name)
+                source = {k: entry[k] for k in ("source_size", "source_mtime_ns", "digest", "duration_ms", "newline")}
+                recordings.append((name, old_pack.load(name), source))
+                parsed[name] = old_pack.load(name)
+
+    # Written next to the old pack, which may hold the only copy of removed JSON files
+    pack_path = folder / PACK_NAME
+    new_path = folder / (PACK_NAME + ".new")
+    pack_bytes = write_recording_pack(new_path, recordings)
+
+    # Verify the written pack before trusting it (decoded from disk, not from memory)
+    pack = RecordingPack(new_path)
+    bad = pack.verify(parsed)
+    pack.close()
+    if bad:
+        print(f"  ❌ {folder}: {len(bad)} recording(s) did not round-trip, new pack discarded")
+        new_path.unlink()
+        sys.exit(1)
+    forget_recording_pack(folder)
+    os.replace(new_path, pack_path)
+    pack = RecordingPack(pack_path)
+
+    kept = []
+    if args.remove_json:
+        # JSON files the pack can't rebuild byte for byte are kept (they may be copied verbatim)
+        for name in names:
+            if removable(pack, folder / name):
+                (folder / name).unlink()
+            else:
+                kept.append(name)
+    print(f"  ✓ {folder}: {len(recordings)} recordings, {json_bytes / 1e6:.2f} MB JSON → {pack_bytes / 1e6:.2f} MB"
+          + (f" (JSON removed, {len(kept)} kept)" if args.remove_json else ""))
+    return json_bytes, pack_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack recording folders into compressed columnar archives")
+    parser.add_argument("root", type=Path, help="Library root (folders below it are packed)")
+    parser.add_argument("--remove-json", action="store_true", help="Delete the JSON files once their pack is verified")
+    parser.add_argument("--force", action="store_true", help="Rewrite packs that are already up to date")
+    args = parser.parse_args()
+
+    root = args.root.resolve()
+    total_json = total_pack = folders = 0
+    for folder, _, files, _ in FolderScanner().walk(root):
+        folder = Path(folder)
+        if folder == root:
+            continue
+        names = [f for f in files if f.endswith(".json") and "click_zones" not in f.lower()]
+        if not names and PACK_NAME not in files:
+            continue
+        result = pack_folder(folder, names, args)
+        if result:
+            folders += 1
+            total_json += result[0]
+            total_pack += result[1]
+
+    print(f"\n✅ Packed {folders} folder(s): {total_json / 1e6:.1f} MB JSON → {total_pack / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# merge_macros.py and pack_recordings.py are scripts at the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
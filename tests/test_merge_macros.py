@@ -0,0 +1,206 @@
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import merge_macros
+from merge_macros import (EventBuffer, EventSpool, ParsedEventCache, RecordingPack, configure_buffer_memo,
+                          events_json_text, write_recording_pack)
+
+SCRIPT = Path(merge_macros.__file__)
+
+
+def make_events(seed: int, count: int = 300) -> list:
+    """Synthetic recording: mouse moves with a click every 50 events."""
+    rng = random.Random(seed)
+    t, events = 0, []
+    for i in range(count):
+        t += rng.randint(10, 200)
+        kind = "LeftDown" if i % 50 == 49 else "MouseMove"
+        events.append({"Type": kind, "Time": t, "X": rng.randint(0, 800), "Y": rng.randint(0, 600),
+                       "Delta": None, "KeyCode": None})
+    return events
+
+
+def dicts(buf: EventBuffer) -> list:
+    return [buf.event(i) for i in range(len(buf))]
+
+
+@pytest.fixture(autouse=True)
+def no_buffer_memo():
+    """Every load goes to disk (the memo would hide cache and pack reads)."""
+    configure_buffer_memo(0)
+    yield
+    configure_buffer_memo(256 * 1024 * 1024)
+
+
+# Parsed-event cache
+
+@pytest.fixture
+def recording(tmp_path):
+    events = make_events(1, 50) + [{"Type": "KeyDown", "Time": 99999, "KeyCode": 65, "Note": "extra"}]
+    path = tmp_path / "rec.json"
+    path.write_text(json.dumps(events, indent=2), encoding="utf-8")
+    return path
+
+
+def test_cache_round_trip(tmp_path, recording):
+    expected = dicts(EventBuffer.from_dicts(json.loads(recording.read_text(encoding="utf-8"))))
+    first = ParsedEventCache(tmp_path / "cache", tmp_path)
+    assert dicts(first.load(recording)) == expected
+    assert (first.parsed, first.hits) == (1, 0)
+
+    second = ParsedEventCache(tmp_path / "cache", tmp_path)
+    assert dicts(second.load(recording)) == expected
+    assert (second.parsed, second.hits) == (0, 1)
+
+    # New mtime, same content (fresh checkout): still a hit through the digest
+    st = recording.stat()
+    os.utime(recording, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    third = ParsedEventCache(tmp_path / "cache", tmp_path)
+    assert dicts(third.load(recording)) == expected
+    assert (third.parsed, third.hits) == (0, 1)
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:-7],                        # truncated columns
+    lambda data: b"XXXXXX" + data[6:],             # wrong magic
+    lambda data: data[:12] + b"{not json" + data[21:],  # unreadable metadata
+    lambda data: b"",                              # empty file
+])
+def test_cache_corruption_falls_back_to_parsing(tmp_path, recording, damage):
+    expected = dicts(ParsedEventCache(tmp_path / "cache", tmp_path).load(recording))
+    entry, = (tmp_path / "cache" / "events").iterdir()
+    entry.write_bytes(damage(entry.read_bytes()))
+
+    cache = ParsedEventCache(tmp_path / "cache", tmp_path)
+    assert dicts(cache.load(recording)) == expected
+    assert (cache.parsed, cache.hits) == (1, 0)
+    # The damaged entry was rewritten
+    again = ParsedEventCache(tmp_path / "cache", tmp_path)
+    again.load(recording)
+    assert again.hits == 1
+
+
+# EventSpool
+
+def test_spool_chunks_and_planned_edits():
+    spool = EventSpool()
+    spool.CHUNK_EVENTS = 16
+    reference = []
+    for k in range(7):
+        piece = EventBuffer.from_dicts(make_events(k, 5 + 3 * k))
+        offset = reference[-1]["Time"] if reference else 0
+        spool.extend(piece, offset)
+        reference += [dict(e, Time=e["Time"] + offset) for e in dicts(piece)]
+        spool.append_move(reference[-1]["Time"] + 7, k, k)
+        reference.append({"Type": "MouseMove", "Time": reference[-1]["Time"] + 7, "X": k, "Y": k})
+    assert spool.spilled > 0 and len(spool.chunk_starts) > 1
+    assert len(spool) == len(reference)
+    assert [spool.time_at(i) for i in range(len(spool))] == [e["Time"] for e in reference]
+
+    inserted = EventBuffer.from_dicts(make_events(99, 4))
+    at, time_offset, delay, shift_at, shift = 37, 1000, 500, 60, 250
+    spool.plan_insert(at, inserted, time_offset, delay)
+    spool.plan_shift(shift_at, shift)
+    expected = (reference[:at]
+                + [dict(e, Time=e["Time"] + time_offset) for e in dicts(inserted)]
+                + [dict(e, Time=e["Time"] + delay) for e in reference[at:]])
+    expected = expected[:shift_at] + [dict(e, Time=e["Time"] + shift) for e in expected[shift_at:]]
+
+    streamed = [e for piece in spool.final_pieces() for e in dicts(piece)]
+    assert streamed == expected
+    assert spool.final_len() == len(expected)
+    assert [spool.final_time_at(i) for i in range(len(expected))] == [e["Time"] for e in expected]
+    spool.close()
+
+
+# --plan / --from-plan
+
+def make_library(root: Path):
+    for n, folder in enumerate(["5- Alpha", "6- Beta- TIME SENSITIVE"]):
+        pool = root / "originals" / "desktop" / folder
+        pool.mkdir(parents=True)
+        for k in range(3):
+            (pool / f"rec{k}.json").write_text(json.dumps(make_events(10 * n + k), indent=2), encoding="utf-8")
+
+
+def run_script(*args) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, str(SCRIPT), *map(str, args)],
+                          capture_output=True, text=True, encoding="utf-8")
+
+
+def tree(root: Path) -> dict:
+    return {p.relative_to(root).as_posix(): p.read_bytes() for p in sorted(root.rglob("*")) if p.is_file()}
+
+
+def test_from_plan_matches_direct_run(tmp_path):
+    direct_lib, plan_lib = tmp_path / "direct", tmp_path / "planned"
+    make_library(direct_lib)
+    make_library(plan_lib)
+    common = ["--versions", "2", "--target-minutes", "1", "--bundle-id", "3"]
+
+    result = run_script(direct_lib, tmp_path / "out_direct", *common, "--workers", "1")
+    assert result.returncode == 0, result.stdout + result.stderr
+    result = run_script(plan_lib, *common, "--plan", tmp_path / "plan.json")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert not (tmp_path / "out_planned").exists()
+    result = run_script(plan_lib, tmp_path / "out_planned", "--bundle-id", "3", "--from-plan", tmp_path / "plan.json")
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    direct = tree(tmp_path / "out_direct")
+    assert any(name.endswith(".json") for name in direct)
+    assert tree(tmp_path / "out_planned") == direct
+
+
+def test_from_plan_refuses_changed_inputs(tmp_path):
+    make_library(tmp_path / "lib")
+    common = ["--versions", "2", "--target-minutes", "1", "--bundle-id", "3"]
+    assert run_script(tmp_path / "lib", *common, "--plan", tmp_path / "plan.json").returncode == 0
+
+    changed = tmp_path / "lib" / "originals" / "desktop" / "5- Alpha" / "rec1.json"
+    changed.write_text(json.dumps(make_events(1234), indent=2), encoding="utf-8")
+    result = run_script(tmp_path / "lib", tmp_path / "out", "--bundle-id", "3", "--from-plan", tmp_path / "plan.json")
+    assert result.returncode == 1
+    assert "originals/desktop/5- Alpha/rec1.json" in result.stdout
+    assert not (tmp_path / "out").exists()
+
+
+# Recording packs
+
+def test_recording_pack_round_trip(tmp_path):
+    recordings = {
+        "moves.json": make_events(5),
+        # Out of int16 range, nulls, an extra field and an unknown event type
+        "odd.json": [{"Type": "MouseMove", "Time": 5, "X": 70000, "Y": -40000, "Delta": None, "KeyCode": None},
+                     {"Type": "Scroll", "Time": 9, "X": None, "Y": None, "Delta": -120, "KeyCode": None},
+                     {"Type": "KeyDown", "Time": 3000000000, "KeyCode": 65, "Window": "client"}],
+        "empty.json": [],
+    }
+    items, buffers = [], {}
+    for name, events in recordings.items():
+        buf = EventBuffer.from_dicts(events)
+        buffers[name] = buf
+        source = {"source_size": 1, "source_mtime_ns": 2, "digest": name, "duration_ms": 3, "newline": "\n"}
+        items.append((name, buf, source))
+    write_recording_pack(tmp_path / merge_macros.PACK_NAME, items)
+
+    pack = RecordingPack(tmp_path / merge_macros.PACK_NAME)
+    try:
+        assert pack.names() == list(recordings)
+        assert pack.verify(buffers) == []
+        for name, buf in buffers.items():
+            assert dicts(pack.decode(name)) == dicts(buf)
+            assert dicts(pack.load(name)) == dicts(buf)
+            assert pack.entry(name)["digest"] == name
+            assert pack.json_bytes(name) == events_json_text(buf).encode("utf-8")
+        assert pack.entry("missing.json") is None
+
+        other = EventBuffer.from_dicts(make_events(6))
+        assert pack.verify({"moves.json": other, "missing.json": other}) == ["moves.json", "missing.json"]
+    finally:
+        pack.close()